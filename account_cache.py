@@ -0,0 +1,260 @@
+import hashlib
+import sqlite3
+import time
+from contextlib import contextmanager
+
+
+class AccountCache:
+    """
+    A local SQLite cache of the accounts, nicknames, withdrawal balances and positions of each login so a new
+    session doesn't have to visit the transfer and positions pages to rebuild `account_dict`.
+    Also remembers which accounts have features like penny stock trading turned on, which never expires.
+    Logins are stored as a hash of the username.
+
+    Each kind of data has its own time to live since balances go stale much faster than the list of accounts.
+    Anything older than its TTL is treated as missing.
+
+    Parameters
+    ----------
+    path (str)
+        Path of the SQLite database file. Created if missing.
+    accounts_ttl (float)
+        Seconds the list of accounts and nicknames stays valid.
+    balances_ttl (float)
+        Seconds the withdrawal balances stay valid.
+    positions_ttl (float)
+        Seconds the positions (and account balances) stay valid.
+    """
+
+    def __init__(self, path: str = "fidelity_cache.db", accounts_ttl: float = 86400, balances_ttl: float = 60, positions_ttl: float = 300) -> None:
+        self.path: str = path
+        self.accounts_ttl: float = accounts_ttl
+        self.balances_ttl: float = balances_ttl
+        self.positions_ttl: float = positions_ttl
+        with self._connect() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS accounts (
+                    login TEXT NOT NULL,
+                    account_num TEXT NOT NULL,
+                    nickname TEXT,
+                    withdrawal_balance REAL,
+                    PRIMARY KEY (login, account_num)
+                );
+                CREATE TABLE IF NOT EXISTS positions (
+                    login TEXT NOT NULL,
+                    account_num TEXT NOT NULL,
+                    nickname TEXT,
+                    ticker TEXT NOT NULL,
+                    quantity REAL NOT NULL,
+                    last_price REAL NOT NULL,
+                    value REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS positions_login ON positions (login);
+                CREATE TABLE IF NOT EXISTS features (
+                    login TEXT NOT NULL,
+                    account_num TEXT NOT NULL,
+                    feature TEXT NOT NULL,
+                    timestamp REAL NOT NULL,
+                    PRIMARY KEY (login, account_num, feature)
+                );
+                CREATE TABLE IF NOT EXISTS updated (
+                    login TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    timestamp REAL NOT NULL,
+                    PRIMARY KEY (login, kind)
+                );
+            """)
+
+    @contextmanager
+    def _connect(self):
+        """
+        Opens a connection that commits (or rolls back) and closes when the `with` block ends.
+        A connection per call keeps the cache usable from any thread or process.
+        """
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def login_key(username: str) -> str:
+        """Returns the key a login is stored under"""
+        return hashlib.sha256(username.encode("utf-8")).hexdigest()[:32]
+
+    def _is_fresh(self, conn, login: str, kind: str, ttl: float) -> bool:
+        row = conn.execute(
+            "SELECT timestamp FROM updated WHERE login = ? AND kind = ?", (login, kind)
+        ).fetchone()
+        return row is not None and time.time() - row[0] <= ttl
+
+    def _touch(self, conn, login: str, kind: str):
+        conn.execute(
+            "INSERT OR REPLACE INTO updated (login, kind, timestamp) VALUES (?, ?, ?)",
+            (login, kind, time.time())
+        )
+
+    def save_accounts(self, username: str, account_dict: dict, with_balances: bool = False):
+        """
+        Replaces the cached list of accounts for a login.
+
+        Parameters
+        ----------
+        username (str)
+            The login the accounts belong to
+        account_dict (dict)
+            Keyed by account number. Each entry needs 'nickname' and 'withdrawal_balance'. See `set_account_dict`
+        with_balances (bool)
+            If the withdrawal balances in `account_dict` are real values that should be cached too
+        """
+        login = self.login_key(username)
+        with self._connect() as conn:
+            conn.execute("DELETE FROM accounts WHERE login = ?", (login,))
+            conn.executemany(
+                "INSERT INTO accounts (login, account_num, nickname, withdrawal_balance) VALUES (?, ?, ?, ?)",
+                [
+                    (login, account_num, info["nickname"], info["withdrawal_balance"] if with_balances else None)
+                    for account_num, info in account_dict.items()
+                ]
+            )
+            self._touch(conn, login, "accounts")
+            if with_balances:
+                self._touch(conn, login, "balances")
+            else:
+                conn.execute("DELETE FROM updated WHERE login = ? AND kind = 'balances'", (login,))
+
+    def load_accounts(self, username: str, need_balances: bool = False) -> dict:
+        """
+        Gets the cached list of accounts for a login.
+
+        Parameters
+        ----------
+        username (str)
+            The login the accounts belong to
+        need_balances (bool)
+            If the withdrawal balances must be fresh too
+
+        Returns
+        -------
+        account_dict (dict)
+            Laid out like `get_list_of_accounts(set_flag=False)`. None if missing or stale.
+        """
+        login = self.login_key(username)
+        with self._connect() as conn:
+            if not self._is_fresh(conn, login, "accounts", self.accounts_ttl):
+                return None
+            if need_balances and not self._is_fresh(conn, login, "balances", self.balances_ttl):
+                return None
+            rows = conn.execute(
+                "SELECT account_num, nickname, withdrawal_balance FROM accounts WHERE login = ? ORDER BY rowid",
+                (login,)
+            ).fetchall()
+
+        return {
+            account_num: {
+                "balance": 0.0,
+                "withdrawal_balance": withdrawal_balance if withdrawal_balance is not None else 0.0,
+                "nickname": nickname,
+                "stocks": []
+            }
+            for account_num, nickname, withdrawal_balance in rows
+        }
+
+    def save_positions(self, username: str, account_dict: dict):
+        """
+        Replaces the cached positions for a login.
+
+        Parameters
+        ----------
+        username (str)
+            The login the positions belong to
+        account_dict (dict)
+            Keyed by account number. Each entry needs 'nickname' and 'stocks'. See `set_account_dict`
+        """
+        login = self.login_key(username)
+        with self._connect() as conn:
+            conn.execute("DELETE FROM positions WHERE login = ?", (login,))
+            conn.executemany(
+                "INSERT INTO positions (login, account_num, nickname, ticker, quantity, last_price, value) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (login, account_num, info["nickname"], stock["ticker"], stock["quantity"], stock["last_price"], stock["value"])
+                    for account_num, info in account_dict.items()
+                    for stock in info["stocks"]
+                ]
+            )
+            self._touch(conn, login, "positions")
+
+    def load_positions(self, username: str) -> list:
+        """
+        Gets the cached positions for a login.
+
+        Returns
+        -------
+        positions (list)
+            List of `(account_num, nickname, ticker, quantity, last_price, value)` tuples in the order they were saved.
+            None if missing or stale.
+        """
+        login = self.login_key(username)
+        with self._connect() as conn:
+            if not self._is_fresh(conn, login, "positions", self.positions_ttl):
+                return None
+            return conn.execute(
+                "SELECT account_num, nickname, ticker, quantity, last_price, value FROM positions WHERE login = ? ORDER BY rowid",
+                (login,)
+            ).fetchall()
+
+    def mark_enabled(self, username: str, accounts: list, feature: str = "pennystock"):
+        """
+        Remembers that a feature was turned on for some accounts.
+
+        Parameters
+        ----------
+        username (str)
+            The login the accounts belong to
+        accounts (list)
+            The account numbers
+        feature (str)
+            The name of the feature. Ex: 'pennystock'
+        """
+        login = self.login_key(username)
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO features (login, account_num, feature, timestamp) VALUES (?, ?, ?, ?)",
+                [(login, account_num, feature, now) for account_num in accounts]
+            )
+
+    def load_enabled(self, username: str, feature: str = "pennystock") -> set:
+        """
+        Gets the accounts of a login that a feature was turned on for.
+
+        Returns
+        -------
+        accounts (set)
+            The account numbers. Empty if none are known
+        """
+        login = self.login_key(username)
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT account_num FROM features WHERE login = ? AND feature = ?", (login, feature)
+            ).fetchall()
+        return {account_num for account_num, in rows}
+
+    def invalidate(self, username: str, kinds: tuple = ("accounts", "balances", "positions")):
+        """
+        Marks cached data for a login as stale so the next lookup goes to the browser.
+
+        Parameters
+        ----------
+        username (str)
+            The login to invalidate
+        kinds (tuple)
+            Any of 'accounts', 'balances' and 'positions'
+        """
+        login = self.login_key(username)
+        with self._connect() as conn:
+            conn.executemany(
+                "DELETE FROM updated WHERE login = ? AND kind = ?",
+                [(login, kind) for kind in kinds]
+            )
@@ -0,0 +1,55 @@
+import threading
+
+
+class BalanceLedger:
+    """
+    Tracks how much of an account's available balance is still free while several transfers out of it
+    run at the same time. Each transfer reserves its amount before submitting, then either commits it
+    once fidelity accepts it or releases it if it fails. Reservations that don't fit are refused, so
+    the transfers together can never ask for more than was available.
+
+    Parameters
+    ----------
+    available (float)
+        The available balance of the account when the transfers start
+    """
+
+    def __init__(self, available: float) -> None:
+        self.available: float = available
+        self.reserved: float = 0.0
+        self.committed: float = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def free(self) -> float:
+        """What can still be reserved"""
+        return self.available - self.reserved - self.committed
+
+    def reserve(self, amount: float) -> bool:
+        """
+        Sets aside an amount for a transfer about to be submitted.
+
+        Returns
+        -------
+        True
+            If there was enough free balance
+        False
+            If the transfer would overdraw the account
+        """
+        with self._lock:
+            # Allow for float rounding on the last cent
+            if amount > self.free + 1e-9:
+                return False
+            self.reserved += amount
+            return True
+
+    def commit(self, amount: float) -> None:
+        """Marks a reserved amount as transferred"""
+        with self._lock:
+            self.reserved -= amount
+            self.committed += amount
+
+    def release(self, amount: float) -> None:
+        """Gives back a reserved amount after the transfer failed"""
+        with self._lock:
+            self.reserved -= amount
@@ -0,0 +1,97 @@
+"""
+Benchmark for `FidelityAutomation` against the local mock of fidelity's pages in `mock_fidelity`.
+
+For each account count, logs in to a fresh mock and times:
+    getAccountInfo                    Positions csv download for every account
+    get_list_of_accounts              Transfer page dropdown with withdrawal balances
+    transaction                       One dry run order per account, reusing the order ticket
+    transfer_from_source_to_all_acc   One transfer from the first account to every other account
+
+Needs playwright's firefox (`playwright install firefox`). Nothing goes to fidelity.
+
+Usage:
+    python benchmarks/bench_automation.py [--accounts 1 10 100] [--latency-ms 50] [--show] [--profile-dir profiles]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from fidelityAPI import FidelityAutomation
+from mock_fidelity import MockFidelity
+
+
+def run(accounts: int, latency_ms: int, headless: bool, profile_dir: str) -> list:
+    """
+    Times each operation against a mock with the given number of accounts.
+
+    Returns
+    -------
+    rows (list)
+        (operation (str), steps (int), seconds (float), ok (bool)) for each operation
+    """
+    rows = []
+    with MockFidelity(accounts=accounts, latency_ms=latency_ms) as mock:
+        browser = FidelityAutomation(
+            headless=headless,
+            save_state=False,
+            block_resources="none",
+            title=f"bench_{accounts}",
+            profile_dir=profile_dir,
+        )
+        try:
+            mock.install(browser.context)
+            step_1, step_2 = browser.login("bench", "bench", save_device=False)
+            if not (step_1 and step_2):
+                raise Exception("Could not log in to the mock")
+            account_numbers = list(mock.accounts)
+
+            def timed(operation: str, steps: int, fn):
+                start = time.perf_counter()
+                ok = fn()
+                rows.append((operation, steps, time.perf_counter() - start, bool(ok)))
+
+            timed("getAccountInfo", accounts, lambda: len(browser.getAccountInfo(use_cache=False) or {}) == accounts)
+            timed(
+                "get_list_of_accounts",
+                accounts,
+                lambda: len(browser.get_list_of_accounts(get_withdrawal_bal=True, use_cache=False) or {}) == accounts
+            )
+            timed("transaction", accounts, lambda: all(
+                browser.transaction("AAPL", 1, "buy", account, dry=True, reuse_ticket=True)[0]
+                for account in account_numbers
+            ))
+            if accounts > 1:
+                timed(
+                    "transfer_from_source_to_all_acc",
+                    accounts - 1,
+                    lambda: browser.transfer_from_source_to_all_acc(account_numbers[0], 1.0)
+                    and mock.stats["transfers"] == accounts - 1
+                )
+        finally:
+            browser.close_browser()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--accounts", type=int, nargs="+", default=[1, 10, 100], help="Account counts to run with")
+    parser.add_argument("--latency-ms", type=int, default=50, help="Delay of every mock response and page action")
+    parser.add_argument("--show", action="store_true", help="Show the browser")
+    parser.add_argument("--profile-dir", default=None, help="Write the step profile of each run to this folder")
+    args = parser.parse_args()
+
+    results = []
+    for accounts in args.accounts:
+        for operation, steps, seconds, ok in run(accounts, args.latency_ms, not args.show, args.profile_dir):
+            results.append((accounts, operation, steps, seconds, ok))
+
+    print(f"{'Accounts':>8}  {'Operation':<32} {'Steps':>6} {'Seconds':>9} {'Steps/s':>8}  Result")
+    for accounts, operation, steps, seconds, ok in results:
+        print(f"{accounts:>8}  {operation:<32} {steps:>6} {seconds:>9.2f} {steps / seconds:>8.2f}  {'ok' if ok else 'FAILED'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Benchmark for parsing the positions csv downloaded by `getAccountInfo`.
+
+Compares the old approach (save to disk, csv.DictReader, str.replace and float() try/except per field)
+with `positions.parse_positions_csv` on a synthetic csv shaped like the one fidelity provides.
+
+Usage:
+    python benchmarks/bench_positions_csv.py [--rows 5000] [--repeat 5]
+"""
+import argparse
+import csv
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from positions import parse_positions_csv
+
+HEADER = [
+    "Account Number", "Account Name", "Symbol", "Description", "Quantity", "Last Price",
+    "Last Price Change", "Current Value", "Today's Gain/Loss Dollar", "Today's Gain/Loss Percent",
+    "Total Gain/Loss Dollar", "Total Gain/Loss Percent", "Percent Of Account", "Cost Basis Total",
+    "Average Cost Basis", "Type",
+]
+
+
+def make_positions_csv(rows: int, seed: int = 0) -> str:
+    """
+    Builds a positions csv with `rows` positions spread across accounts, including the cash rows,
+    pending activity and disclaimer footer fidelity adds.
+    """
+    rand = random.Random(seed)
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(HEADER)
+    accounts = [f"Z{rand.randint(10000000, 99999999)}" for _ in range(max(1, rows // 20))]
+    for i in range(rows):
+        account = accounts[i % len(accounts)]
+        if i % 25 == 0:
+            # Cash position has no quantity or price
+            writer.writerow([account, "Individual", "SPAXX**", "HELD IN MONEY MARKET", "", "", "",
+                             f"${rand.uniform(1, 5000):,.2f}", "", "", "", "", "1%", "", "", "Cash"])
+            continue
+        if i % 97 == 0:
+            writer.writerow([account, "Individual", "Pending Activity", "", "", "", "",
+                             f"${rand.uniform(1, 50):,.2f}", "", "", "", "", "", "", "", ""])
+            continue
+        quantity = rand.randint(1, 2000)
+        price = rand.uniform(0.01, 900)
+        writer.writerow([
+            account, "Individual", f"T{i % 500}", "SOME COMPANY INC", str(quantity), f"${price:,.2f}",
+            f"-${rand.uniform(0, 3):.2f}", f"${quantity * price:,.2f}", f"+${rand.uniform(0, 30):.2f}",
+            "+0.5%", f"-${rand.uniform(0, 300):,.2f}", "-2.1%", "0.3%", f"${quantity * price:,.2f}",
+            f"${price:,.2f}", "Cash",
+        ])
+    writer.writerow([])
+    writer.writerow(["The data and information in this spreadsheet is provided to you solely for your use and is not for distribution."])
+    return "\ufeff" + out.getvalue()
+
+
+def legacy_parse(text: str) -> list:
+    """
+    The parsing `getAccountInfo` used to do: write the download to the working directory,
+    read it back with DictReader and convert each field with replace and try/except.
+    """
+    path = os.path.join(tempfile.gettempdir(), "bench_positions_legacy.csv")
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        f.write(text)
+    records = []
+    csv_file = open(path, newline="", encoding="utf-8-sig")
+    reader = csv.DictReader(csv_file)
+    for row in reader:
+        if row["Account Number"] is None:
+            continue
+        if "and" in row["Account Number"]:
+            break
+        if row["Account Number"][0] == "Y":
+            continue
+        val = str(row["Current Value"]).replace("$", "").replace("-", "")
+        last_price = str(row["Last Price"]).replace("$", "").replace("-", "")
+        quantity = str(row["Quantity"]).replace("-", "")
+        ticker = str(row["Symbol"])
+        if "Pending" in ticker:
+            continue
+        if len(val) == 0:
+            continue
+        if len(last_price) == 0:
+            last_price = val
+        if len(quantity) == 0:
+            quantity = 1
+        try:
+            float(val)
+        except ValueError:
+            val = 0
+        try:
+            float(last_price)
+        except ValueError:
+            last_price = 0
+        try:
+            float(quantity)
+        except ValueError:
+            quantity = 0
+        records.append((row["Account Number"], row["Account Name"], ticker, float(quantity), float(last_price), float(val)))
+    csv_file.close()
+    os.remove(path)
+    return records
+
+
+def streaming_parse(text: str) -> list:
+    """The new parser reading from an in memory stream"""
+    return list(parse_positions_csv(io.StringIO(text, newline="")))
+
+
+def bench(fn, text: str, repeat: int) -> float:
+    """Returns the best time of `repeat` runs in seconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5000, help="Number of positions in the synthetic csv")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of runs to take the best of")
+    args = parser.parse_args()
+
+    text = make_positions_csv(args.rows)
+    legacy_count = len(legacy_parse(text))
+    streaming_count = len(streaming_parse(text))
+
+    legacy_time = bench(legacy_parse, text, args.repeat)
+    streaming_time = bench(streaming_parse, text, args.repeat)
+
+    print(f"Rows in csv: {args.rows}")
+    print(f"{'parser':<12}{'positions':>12}{'best (ms)':>12}{'rows/s':>14}")
+    print(f"{'legacy':<12}{legacy_count:>12}{legacy_time * 1000:>12.2f}{args.rows / legacy_time:>14,.0f}")
+    print(f"{'streaming':<12}{streaming_count:>12}{streaming_time * 1000:>12.2f}{args.rows / streaming_time:>14,.0f}")
+    print(f"Speedup: {legacy_time / streaming_time:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,618 @@
+"""
+A local stand-in for the parts of digital.fidelity.com that `FidelityAutomation` drives, so its methods can be
+run and timed without a brokerage login.
+
+It serves small HTML pages with the labels, selectors and loading spinners the automation looks for:
+login (with optional 2FA), the portfolio summary with the customize accounts modal, positions with the csv
+download, the transfer page, the order ticket, and the penny stock flow. Every response is delayed by the
+configured latency and every action on a page shows a spinner for that long.
+
+The browser keeps going to https://digital.fidelity.com. `install` routes those requests to this server
+so urls checked by the automation don't change.
+
+Usage:
+    python benchmarks/mock_fidelity.py [--accounts 10] [--latency-ms 50] [--two-factor none] [--port 8765]
+
+    from mock_fidelity import MockFidelity
+    with MockFidelity(accounts=10) as mock:
+        browser = FidelityAutomation(save_state=False, block_resources="none")
+        mock.install(browser.context)
+        browser.login("user", "pass")
+"""
+import argparse
+import csv
+import io
+import json
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+FIDELITY_ORIGIN = "https://digital.fidelity.com"
+
+SYMBOLS = ["AAPL", "MSFT", "VTI", "SCHD", "F", "T", "KO", "SIRI"]
+
+# Shared by every page. LATENCY is filled in when the page is served
+COMMON = """
+<style>
+  .pvd-spinner__mask-inner { display: none; width: 40px; height: 40px; background: #ccc; }
+  .hidden { display: none; }
+</style>
+<div class="pvd-spinner__mask-inner" id="spinner"></div>
+<script>
+const LATENCY = {{LATENCY}};
+// Shows the loading spinner for as long as the server takes, then runs done
+function busy(done) {
+  const spinner = document.getElementById("spinner");
+  spinner.style.display = "block";
+  setTimeout(() => { spinner.style.display = "none"; done(); }, LATENCY);
+}
+function show(id, on) { document.getElementById(id).classList.toggle("hidden", on === false); }
+function post(path, body) {
+  return fetch(path, {method: "POST", headers: {"Content-Type": "application/json"}, body: JSON.stringify(body)})
+    .then((response) => response.json());
+}
+</script>
+"""
+
+LOGIN_PAGE = """
+<h1>Log in</h1>
+<div id="login-form">
+  <label for="username">Username</label><input id="username">
+  <label for="password">Password</label><input id="password" type="password">
+  <button onclick="logIn()">Log in</button>
+</div>
+<div id="dom-widget" class="hidden">
+  <section id="widget-body">
+    <section id="totp">
+      <h2>Enter the code from your authenticator app</h2>
+      <input placeholder="XXXXXX">
+      <button onclick="finish()">Continue</button>
+    </section>
+    <section id="sms">
+      <button onclick="show('sms-code'); show('sms-start', false)" id="sms-start">Text me the code</button>
+      <section id="sms-code" class="hidden">
+        <input placeholder="XXXXXX">
+        <button onclick="finish()">Submit</button>
+      </section>
+    </section>
+    <label><input type="checkbox">Don't ask me again on this device</label>
+  </section>
+</div>
+<script>
+const TWO_FACTOR = "{{TWO_FACTOR}}";
+function finish() { busy(() => { window.location.href = "/ftgw/digital/portfolio/summary"; }); }
+function logIn() {
+  busy(() => {
+    if (TWO_FACTOR === "none") {
+      finish();
+      return;
+    }
+    // The widget only gets its content once 2FA is asked for, like on fidelity
+    document.getElementById(TWO_FACTOR === "totp" ? "sms" : "totp").remove();
+    const widget = document.createElement("div");
+    widget.appendChild(document.getElementById("widget-body"));
+    document.getElementById("dom-widget").appendChild(widget);
+    show("login-form", false);
+    show("dom-widget");
+  });
+}
+</script>
+"""
+
+SUMMARY_PAGE = """
+<h1>Summary</h1>
+<button aria-label="Customize Accounts" onclick="show('customize')">Customize</button>
+<div id="customize" class="hidden">
+  <h2>Display preferences</h2>
+  <ul id="accounts-list"></ul>
+  <button onclick="show('rename')">Rename</button>
+  <div id="rename" class="hidden">
+    <div aria-label="Accounts"><input type="text" id="nickname"></div>
+    <button onclick="save()">Save</button>
+  </div>
+</div>
+<script>
+const ACCOUNTS = {{ACCOUNTS}};
+let selected = null;
+const list = document.getElementById("accounts-list");
+for (const account of ACCOUNTS) {
+  const item = document.createElement("li");
+  item.className = "custom-modal__accounts-item";
+  item.innerText = account.acctNickname + " " + account.acctNum;
+  item.onclick = () => { selected = account.acctNum; };
+  list.appendChild(item);
+}
+function save() {
+  const nickname = document.getElementById("nickname").value;
+  busy(() => post("/ftgw/digital/portfolio/api/nickname", {account: selected, nickname: nickname})
+    .then(() => show("customize", false)));
+}
+</script>
+"""
+
+POSITIONS_PAGE = """
+<h1>Positions</h1>
+<a href="/ftgw/digital/portfolio/positions/download" download="Portfolio_Positions.csv" aria-label="Download Positions">Download</a>
+"""
+
+TRANSFER_PAGE = """
+<h1>Transfer</h1>
+<label for="from">From</label>
+<select id="from" onchange="pickFrom()"><option value="">Select</option></select>
+<label for="to">To</label>
+<select id="to" onchange="busy(() => {})"><option value="">Select</option></select>
+<table>
+  <tr class="pvd-table__row"><th>Balance</th><th>Amount</th></tr>
+  <tr class="pvd-table__row"><td>Available to withdraw</td><td id="available">$0.00</td></tr>
+</table>
+<label for="transfer-amount">Amount</label><input id="transfer-amount">
+<button onclick="busy(() => { show('review'); })">Continue</button>
+<div id="review" class="hidden"><button onclick="submitTransfer()">Submit</button></div>
+<div id="done" class="hidden">Request submitted</div>
+<div id="error" class="hidden"></div>
+<script>
+let accounts = {};
+const spinner = document.getElementById("spinner");
+spinner.style.display = "block";
+fetch("/ftgw/digital/transfer/api/accounts").then((response) => response.json()).then((payload) => {
+  for (const account of payload.accounts) {
+    accounts[account.acctNum] = account;
+    for (const id of ["from", "to"]) {
+      const option = document.createElement("option");
+      option.value = account.acctNum;
+      option.innerText = account.acctNickname + " (" + account.acctNum + ")";
+      document.getElementById(id).appendChild(option);
+    }
+  }
+  spinner.style.display = "none";
+});
+function pickFrom() {
+  busy(() => {
+    const account = accounts[document.getElementById("from").value];
+    const balance = account ? account.balances.withdrawalBalance : 0;
+    document.getElementById("available").innerText = "$" + balance.toLocaleString("en-US", {minimumFractionDigits: 2});
+  });
+}
+function submitTransfer() {
+  busy(() => post("/ftgw/digital/transfer/api/submit", {
+    from: document.getElementById("from").value,
+    to: document.getElementById("to").value,
+    amount: parseFloat(document.getElementById("transfer-amount").value),
+  }).then((result) => {
+    show("review", false);
+    if (result.ok) {
+      show("done");
+    } else {
+      document.getElementById("error").innerText = result.error;
+      show("error");
+    }
+  }));
+}
+</script>
+"""
+
+ORDER_PAGE = """
+<style>[role=option] { cursor: pointer; }</style>
+<h1>Trade</h1>
+<div id="ticket">
+  <button id="dest-acct-dropdown" onclick="show('account-options')">Account</button>
+  <div id="account-options" class="hidden" role="listbox"></div>
+  <label for="symbol">Symbol</label><input id="symbol" onkeydown="if (event.key === 'Enter') quote()">
+  <div id="quote-panel" class="hidden">
+    <div id="eq-ticket__last-price"><span class="last-price" id="last-price"></span></div>
+  </div>
+  <div class="eq-ticket-action-label" onclick="show('action-options')">Action</div>
+  <div id="action-options" class="hidden" role="listbox">
+    <div role="option" onclick="pickAction('Buy')">Buy</div>
+    <div role="option" onclick="pickAction('Sell')">Sell</div>
+  </div>
+  <div id="eqt-mts-stock-quatity"><div><label for="quantity">Quantity</label><input id="quantity"></div></div>
+  <div id="order-type-container-id" onclick="show('type-options')">
+    <button id="dest-dropdownlist-button-ordertype"><span id="order-type">Market</span></button>
+  </div>
+  <div id="type-options" class="hidden" role="listbox">
+    <div role="option" onclick="pickType(event, 'Market')">Market</div>
+    <div role="option" onclick="pickType(event, 'Limit')">Limit</div>
+  </div>
+  <div id="limit-row" class="hidden"><label for="limit-price">Limit price</label><input id="limit-price"></div>
+  <button onclick="preview()">Preview order</button>
+</div>
+<preview id="preview" class="hidden"></preview>
+<div id="error-box" class="hidden">
+  <div class="pvd-inline-alert__content"><font color="red" id="error-text"></font></div>
+  <button aria-label="Close dialog" onclick="show('error-box', false)">Close</button>
+</div>
+<div id="received" class="hidden">Order received</div>
+<script>
+const ACCOUNTS = {{ACCOUNTS}};
+let order = {account: null, action: null, type: "Market"};
+const options = document.getElementById("account-options");
+for (const account of ACCOUNTS) {
+  const option = document.createElement("div");
+  option.setAttribute("role", "option");
+  option.innerText = account.acctNickname + " (" + account.acctNum + ")";
+  option.onclick = () => {
+    order.account = account.acctNum;
+    document.getElementById("dest-acct-dropdown").innerText = option.innerText;
+    show("account-options", false);
+  };
+  options.appendChild(option);
+}
+function quote() {
+  const symbol = document.getElementById("symbol").value.toUpperCase();
+  show("quote-panel", false);
+  busy(() => fetch("/ftgw/digital/trade-equity/api/quote?symbol=" + encodeURIComponent(symbol))
+    .then((response) => response.json())
+    .then((result) => {
+      document.getElementById("last-price").innerText = "$" + result.lastPrice.toFixed(2);
+      show("quote-panel");
+    }));
+}
+function pickAction(action) {
+  order.action = action;
+  document.querySelector(".eq-ticket-action-label").innerText = action;
+  show("action-options", false);
+}
+function pickType(event, type) {
+  event.stopPropagation();
+  order.type = type;
+  document.getElementById("order-type").innerText = type;
+  show("limit-row", type === "Limit");
+  show("type-options", false);
+}
+function current() {
+  return {
+    account: order.account,
+    symbol: document.getElementById("symbol").value.toUpperCase(),
+    action: order.action,
+    quantity: document.getElementById("quantity").value,
+    limit: order.type === "Limit" ? document.getElementById("limit-price").value : null,
+  };
+}
+function preview() {
+  show("received", false);
+  show("preview", false);
+  busy(() => {
+    const ticket = current();
+    let error = null;
+    if (!ticket.account) error = "Select an account";
+    else if (!ticket.action) error = "Select buy or sell";
+    else if (!(parseFloat(ticket.quantity) > 0)) error = "Quantity must be greater than 0";
+    if (error) {
+      document.getElementById("error-text").innerText = error;
+      show("error-box");
+      return;
+    }
+    const panel = document.getElementById("preview");
+    panel.innerHTML = "";
+    const lines = ["Account" + ticket.account, "Symbol" + ticket.symbol, "Action" + ticket.action, "Quantity" + ticket.quantity];
+    for (const line of lines) {
+      const div = document.createElement("div");
+      div.innerText = line;
+      panel.appendChild(div);
+    }
+    for (const [name, handler] of [["Place order", place], ["Edit order", () => show("preview", false)]]) {
+      const button = document.createElement("button");
+      button.innerText = name;
+      button.onclick = handler;
+      panel.appendChild(button);
+    }
+    show("preview");
+  });
+}
+function place() {
+  busy(() => post("/ftgw/digital/trade-equity/api/place", current()).then(() => {
+    show("preview", false);
+    show("received");
+  }));
+}
+</script>
+"""
+
+FEATURES_PAGE = """
+<h1>Features</h1>
+<a aria-label="Manage Penny Stock Trading" href="/ftgw/digital/easy/hrt/pst/accountselection">Penny stock trading</a>
+"""
+
+PENNYSTOCK_PAGE = """
+<button onclick="this.disabled = true">Start</button>
+<h2>Select an account</h2>
+<label for="eligible">Your eligible accounts</label>
+<select id="eligible"><option value="">Select</option></select>
+<button onclick="pick()">Continue</button>
+<script>
+const ACCOUNTS = {{ACCOUNTS}};
+for (const account of ACCOUNTS) {
+  const option = document.createElement("option");
+  option.value = account.acctNum;
+  option.innerText = account.acctNickname + " (" + account.acctNum + ")";
+  document.getElementById("eligible").appendChild(option);
+}
+function pick() {
+  sessionStorage.setItem("pennystock", document.getElementById("eligible").value);
+  busy(() => { window.location.href = "/ftgw/digital/easy/hrt/pst/termsandconditions"; });
+}
+</script>
+"""
+
+TERMS_PAGE = """
+<h2>Terms and conditions</h2>
+<label class="pvd-checkbox__label"><input type="checkbox" id="accept">I understand the risks</label>
+<button onclick="enable()">Submit</button>
+<div id="enabled" class="hidden">Your account is now enabled.</div>
+<script>
+function enable() {
+  busy(() => post("/ftgw/digital/easy/hrt/pst/api/enable", {account: sessionStorage.getItem("pennystock")})
+    .then(() => show("enabled")));
+}
+</script>
+"""
+
+POSITIONS_HEADER = [
+    "Account Number", "Account Name", "Symbol", "Description", "Quantity", "Last Price",
+    "Last Price Change", "Current Value", "Type",
+]
+
+
+def last_price(symbol: str) -> float:
+    """The made up last price of a symbol. Always the same for the same symbol"""
+    return round(1 + zlib.crc32(symbol.upper().encode("utf-8")) % 50000 / 100, 2)
+
+
+class MockFidelity:
+    """
+    Serves the mock pages on a local port from a background thread. Use as a context manager or call
+    `start` and `stop`.
+
+    What the automation does is kept in `self.stats` and changes the served accounts: transfers move
+    balances, orders are counted, nicknames are saved and penny stock trading is marked enabled.
+
+    Parameters
+    ----------
+    accounts (int)
+        How many accounts the login has
+    positions_per_account (int)
+        How many stock positions each account holds, besides cash
+    latency_ms (int)
+        How long every response and every action on a page takes
+    two_factor (str)
+        "none" goes straight to the summary after logging in, "totp" asks for an authenticator code,
+        "sms" asks to text a code
+    port (int)
+        The port to listen on. 0 picks a free one
+    """
+
+    def __init__(self, accounts: int = 10, positions_per_account: int = 3, latency_ms: int = 0, two_factor: str = "none", port: int = 0) -> None:
+        if two_factor not in ("none", "totp", "sms"):
+            raise Exception(f"Unknown two factor mode: {two_factor}")
+        self.latency_ms: int = latency_ms
+        self.two_factor: str = two_factor
+        self.port: int = port
+        self.accounts: dict = {}
+        for i in range(accounts):
+            account_number = f"Z{10000000 + i * 7919:08d}"
+            self.accounts[account_number] = {
+                "nickname": f"Individual {i + 1}",
+                "withdrawal_balance": 10000.0 if i == 0 else 100.0,
+                "positions": [
+                    (SYMBOLS[(i + j) % len(SYMBOLS)], float(j + 1))
+                    for j in range(positions_per_account)
+                ],
+                "pennystock": False,
+            }
+        self.stats: dict = {
+            "requests": 0,
+            "orders": 0,
+            "transfers": 0,
+            "renames": 0,
+            "pennystock": 0,
+        }
+        self._lock = threading.Lock()
+        self._server: ThreadingHTTPServer = None
+        self._thread: threading.Thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    @property
+    def base_url(self) -> str:
+        """The url of the running server. Ex: `http://127.0.0.1:8765`"""
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def start(self) -> "MockFidelity":
+        """Starts serving from a background thread"""
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                mock._handle(self, None)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                mock._handle(self, json.loads(self.rfile.read(length) or b"{}"))
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", self.port), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stops the server"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def install(self, context) -> None:
+        """
+        Sends every request a sync `BrowserContext` makes to digital.fidelity.com to this server instead.
+        Install after `ResourceBlocker.install` so this route is tried first.
+        """
+        def handle(route):
+            route.fulfill(response=route.fetch(url=self._local_url(route.request.url)))
+
+        context.route(f"{FIDELITY_ORIGIN}/**", handle)
+
+    async def install_async(self, context) -> None:
+        """Same as `install` for an async `BrowserContext`"""
+        async def handle(route):
+            await route.fulfill(response=await route.fetch(url=self._local_url(route.request.url)))
+
+        await context.route(f"{FIDELITY_ORIGIN}/**", handle)
+
+    def _local_url(self, url: str) -> str:
+        return self.base_url + url[len(FIDELITY_ORIGIN):]
+
+    def _handle(self, request: BaseHTTPRequestHandler, body: dict) -> None:
+        """Answers one request after the latency"""
+        time.sleep(self.latency_ms / 1000)
+        with self._lock:
+            self.stats["requests"] += 1
+        url = urlsplit(request.path)
+        path = url.path.rstrip("/")
+        query = parse_qs(url.query)
+
+        pages = {
+            "/prgw/digital/login/full-page": LOGIN_PAGE,
+            "/ftgw/digital/portfolio/summary": SUMMARY_PAGE,
+            "/ftgw/digital/portfolio/positions": POSITIONS_PAGE,
+            "/ftgw/digital/transfer": TRANSFER_PAGE,
+            "/ftgw/digital/trade-equity/index/orderEntry": ORDER_PAGE,
+            "/ftgw/digital/portfolio/features": FEATURES_PAGE,
+            "/ftgw/digital/easy/hrt/pst/accountselection": PENNYSTOCK_PAGE,
+            "/ftgw/digital/easy/hrt/pst/termsandconditions": TERMS_PAGE,
+        }
+        if body is None and path in pages:
+            self._send(request, 200, "text/html", self._render(pages[path]))
+        elif path == "/ftgw/digital/transfer/api/accounts":
+            self._send_json(request, {"accounts": self._account_payload()})
+        elif path == "/ftgw/digital/trade-equity/api/quote":
+            symbol = query.get("symbol", [""])[0]
+            self._send_json(request, {"symbol": symbol.upper(), "lastPrice": last_price(symbol)})
+        elif path == "/ftgw/digital/portfolio/positions/download":
+            self._send(request, 200, "text/csv", self._positions_csv(), {
+                "Content-Disposition": 'attachment; filename="Portfolio_Positions.csv"'
+            })
+        elif body is not None and path == "/ftgw/digital/trade-equity/api/place":
+            with self._lock:
+                self.stats["orders"] += 1
+            self._send_json(request, {"ok": True})
+        elif body is not None and path == "/ftgw/digital/transfer/api/submit":
+            self._send_json(request, self._transfer(body))
+        elif body is not None and path == "/ftgw/digital/portfolio/api/nickname":
+            with self._lock:
+                if body.get("account") in self.accounts:
+                    self.accounts[body["account"]]["nickname"] = body.get("nickname") or ""
+                    self.stats["renames"] += 1
+            self._send_json(request, {"ok": True})
+        elif body is not None and path == "/ftgw/digital/easy/hrt/pst/api/enable":
+            with self._lock:
+                if body.get("account") in self.accounts:
+                    self.accounts[body["account"]]["pennystock"] = True
+                    self.stats["pennystock"] += 1
+            self._send_json(request, {"ok": True})
+        else:
+            self._send(request, 404, "text/plain", "Not found")
+
+    def _render(self, page: str) -> str:
+        html = "<!DOCTYPE html><html><head><title>Mock Fidelity</title></head><body>" + COMMON + page + "</body></html>"
+        return (
+            html.replace("{{LATENCY}}", str(self.latency_ms))
+            .replace("{{TWO_FACTOR}}", self.two_factor)
+            .replace("{{ACCOUNTS}}", json.dumps(self._account_payload()))
+        )
+
+    def _account_payload(self) -> list:
+        """
+        The accounts as JSON, using field names `extract_account_payload` looks for. These are guesses, not
+        fidelity's confirmed payload, so this only exercises the parsing and says nothing about the real site
+        """
+        with self._lock:
+            return [
+                {
+                    "acctNum": account_number,
+                    "acctNickname": account["nickname"],
+                    "balances": {"withdrawalBalance": account["withdrawal_balance"]},
+                }
+                for account_number, account in self.accounts.items()
+            ]
+
+    def _transfer(self, body: dict) -> dict:
+        """Moves money between two accounts if the first has enough"""
+        try:
+            amount = float(body.get("amount"))
+        except (TypeError, ValueError):
+            return {"ok": False, "error": "Enter an amount"}
+        with self._lock:
+            source = self.accounts.get(body.get("from"))
+            destination = self.accounts.get(body.get("to"))
+            if source is None or destination is None or source is destination:
+                return {"ok": False, "error": "Select two different accounts"}
+            if amount <= 0 or amount > source["withdrawal_balance"] + 1e-9:
+                return {"ok": False, "error": "Amount is more than is available"}
+            source["withdrawal_balance"] -= amount
+            destination["withdrawal_balance"] += amount
+            self.stats["transfers"] += 1
+        return {"ok": True}
+
+    def _positions_csv(self) -> str:
+        """The positions csv, with the cash rows and disclaimer footer fidelity adds"""
+        out = io.StringIO()
+        writer = csv.writer(out)
+        writer.writerow(POSITIONS_HEADER)
+        with self._lock:
+            for account_number, account in self.accounts.items():
+                writer.writerow([account_number, account["nickname"], "SPAXX**", "HELD IN MONEY MARKET", "", "", "",
+                                 f"${account['withdrawal_balance']:,.2f}", "Cash"])
+                for symbol, quantity in account["positions"]:
+                    price = last_price(symbol)
+                    writer.writerow([account_number, account["nickname"], symbol, f"{symbol} INC", f"{quantity:g}",
+                                     f"${price:,.2f}", "+$0.10", f"${quantity * price:,.2f}", "Cash"])
+        writer.writerow([])
+        writer.writerow(["The data and information in this spreadsheet is provided to you solely for your use and is not for distribution."])
+        return "\ufeff" + out.getvalue()
+
+    def _send(self, request: BaseHTTPRequestHandler, status: int, content_type: str, text: str, headers: dict = None) -> None:
+        data = text.encode("utf-8")
+        request.send_response(status)
+        request.send_header("Content-Type", f"{content_type}; charset=utf-8")
+        request.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            request.send_header(name, value)
+        request.end_headers()
+        request.wfile.write(data)
+
+    def _send_json(self, request: BaseHTTPRequestHandler, payload) -> None:
+        self._send(request, 200, "application/json", json.dumps(payload))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--accounts", type=int, default=10, help="Number of accounts")
+    parser.add_argument("--positions", type=int, default=3, help="Number of positions per account")
+    parser.add_argument("--latency-ms", type=int, default=50, help="Delay of every response and page action")
+    parser.add_argument("--two-factor", choices=["none", "totp", "sms"], default="none", help="2FA asked for after logging in")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on")
+    args = parser.parse_args()
+
+    mock = MockFidelity(args.accounts, args.positions, args.latency_ms, args.two_factor, args.port).start()
+    print(f"Serving mock fidelity on {mock.base_url}/prgw/digital/login/full-page (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        mock.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+import time
+
+from playwright.sync_api import sync_playwright, BrowserContext, Error as PlaywrightError
+
+
+class BrowserPool:
+    """
+    Keeps a single Firefox process running and leases out isolated browser contexts from it so
+    repeated sessions skip the browser launch cost.
+    Contexts are kept per key (usually one per login) after they are released, so the next lease for the
+    same key gets the same cookies back. Contexts and the browser itself are closed after sitting idle.
+
+    Like the rest of the sync playwright API, a pool must only be used from the thread that created it.
+
+    Parameters
+    ----------
+    headless (bool)
+        If False the browser will be headless.
+    idle_timeout (float)
+        Seconds a released context (and the browser once nothing is leased) can sit idle before it is closed.
+    max_idle_contexts (int)
+        The max number of released contexts to keep. The oldest is closed when this is exceeded.
+    """
+
+    def __init__(self, headless: bool = True, idle_timeout: float = 300, max_idle_contexts: int = 8) -> None:
+        self.headless: bool = headless
+        self.idle_timeout: float = idle_timeout
+        self.max_idle_contexts: int = max_idle_contexts
+        self.playwright = None
+        self.browser = None
+        # key: (context, time released)
+        self._idle: dict = {}
+        # key: context
+        self._leased: dict = {}
+        self._browser_idle_since: float = None
+        self.stats: dict = {
+            "browser_launches": 0,
+            "contexts_created": 0,
+            "contexts_reused": 0,
+            "contexts_evicted": 0,
+        }
+
+    def _ensure_browser(self):
+        """
+        Starts playwright and launches the browser if it isn't running or has disconnected.
+        """
+        if self.browser is not None and self.browser.is_connected():
+            return
+        # Anything from a dead browser is unusable
+        self._idle.clear()
+        if self.playwright is None:
+            self.playwright = sync_playwright().start()
+        self.browser = self.playwright.firefox.launch(
+            headless=self.headless,
+            args=["--disable-webgl", "--disable-software-rasterizer"],
+        )
+        self.stats["browser_launches"] += 1
+
+    def _is_healthy(self, context: BrowserContext) -> bool:
+        """
+        Checks that a context can still be used.
+        """
+        try:
+            context.cookies()
+            return True
+        except PlaywrightError:
+            return False
+
+    def _close_context(self, context: BrowserContext):
+        try:
+            context.close()
+        except PlaywrightError:
+            pass
+
+    def lease(self, key: str, storage_state=None) -> BrowserContext:
+        """
+        Gets a context for the given key. An idle context for the key is reused if it's still healthy,
+        otherwise a new one is created with the given storage state.
+
+        Parameters
+        ----------
+        key (str)
+            Identifies who the context is for. Use something unique per login.
+        storage_state (str or dict)
+            Storage state to create a new context with. Ignored when an idle context is reused.
+
+        Returns
+        -------
+        context (BrowserContext)
+        """
+        if key in self._leased:
+            raise Exception(f"A context for '{key}' is already leased")
+        self.evict_idle()
+        self._ensure_browser()
+        self._browser_idle_since = None
+
+        if key in self._idle:
+            context, _ = self._idle.pop(key)
+            if self._is_healthy(context):
+                self.stats["contexts_reused"] += 1
+                self._leased[key] = context
+                return context
+            self._close_context(context)
+
+        context = self.browser.new_context(storage_state=storage_state)
+        self.stats["contexts_created"] += 1
+        self._leased[key] = context
+        return context
+
+    def release(self, key: str, keep: bool = True):
+        """
+        Returns a leased context to the pool.
+
+        Parameters
+        ----------
+        key (str)
+            The key the context was leased under.
+        keep (bool)
+            If False the context is closed instead of kept for the next lease.
+        """
+        context = self._leased.pop(key, None)
+        if context is None:
+            return
+        if keep and self._is_healthy(context):
+            self._idle[key] = (context, time.monotonic())
+            # Drop the oldest idle contexts if there are too many
+            while len(self._idle) > self.max_idle_contexts:
+                oldest = min(self._idle, key=lambda k: self._idle[k][1])
+                self._close_context(self._idle.pop(oldest)[0])
+                self.stats["contexts_evicted"] += 1
+        else:
+            self._close_context(context)
+        if not self._leased:
+            self._browser_idle_since = time.monotonic()
+
+    def evict_idle(self):
+        """
+        Closes contexts that have been idle longer than `idle_timeout`, and the browser if nothing
+        has been leased for that long.
+        """
+        now = time.monotonic()
+        for key in list(self._idle):
+            context, released = self._idle[key]
+            if now - released > self.idle_timeout:
+                self._close_context(context)
+                del self._idle[key]
+                self.stats["contexts_evicted"] += 1
+
+        if (self.browser is not None and not self._leased and not self._idle and
+            self._browser_idle_since is not None and now - self._browser_idle_since > self.idle_timeout
+        ):
+            self._close_browser()
+
+    def _close_browser(self):
+        try:
+            self.browser.close()
+        except PlaywrightError:
+            pass
+        self.browser = None
+        self._browser_idle_since = None
+
+    def close(self):
+        """
+        Closes every context, the browser and stops playwright.
+        Use when you are completely done with the pool.
+        """
+        for context in list(self._leased.values()):
+            self._close_context(context)
+        for context, _ in self._idle.values():
+            self._close_context(context)
+        self._leased.clear()
+        self._idle.clear()
+        if self.browser is not None:
+            self._close_browser()
+        if self.playwright is not None:
+            self.playwright.stop()
+            self.playwright = None
@@ -1,18 +1,45 @@
 import os
 import traceback
-import json
+import time
 
 import pyotp
 import typing
 from typing import Literal
 import re
-from time import sleep
 
 from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
 from playwright_stealth import StealthConfig, stealth_sync
-import csv
+from browser_pool import BrowserPool
+from account_cache import AccountCache
+from readiness import READY_PREDICATE, get_readiness_profile, ready_predicate_args
+from positions import parse_positions_csv
+from models import Account, Position
+from portfolio import PortfolioIndex
+from session_manager import write_private_json
+from resource_blocking import ResourceBlocker
+from orders import plan_orders, new_order_result
+from quote_cache import QuoteCache
+from operation_journal import OperationJournal, JournalRun
+from profiling import Profiler, timed
 from enum import Enum
 
+# Responses on the transfer page that may hold account info
+ACCOUNT_API_PATTERN = re.compile(r"digital\.fidelity\.com/.*(account|balance|transfer).*", re.IGNORECASE)
+# Field names fidelity likely uses in its JSON for account numbers and nicknames (lowercase).
+# Not confirmed against a real payload, which is why reading balances from the JSON is opt-in
+ACCOUNT_NUMBER_KEYS = {"acctnum", "acctnumber", "accountnum", "accountnumber", "accountid", "acctid"}
+ACCOUNT_NICKNAME_KEYS = {"nickname", "acctnickname", "accountnickname", "preferencename", "acctname", "accountname"}
+ACCOUNT_NUMBER_PATTERN = re.compile(r"^(Z|\d)\d{6,}$")
+# Responses while an account is being opened, and the confirmation text that holds its number
+ACCOUNT_OPENING_PATTERN = re.compile(r"digital\.fidelity\.com/.*aox/", re.IGNORECASE)
+NEW_ACCOUNT_TEXT_PATTERN = re.compile(r"account number is:?\s*((?:Z|\d)\d{6,})", re.IGNORECASE)
+# Where enabling penny stock trading starts, and the pages it can end up on after picking an account
+FEATURES_URL = "https://digital.fidelity.com/ftgw/digital/portfolio/features"
+PENNYSTOCK_TERMS_URLS = [
+    "https://digital.fidelity.com/ftgw/digital/easy/hrt/pst/termsandconditions",
+    "https://digital.fidelity.com/ftgw/digital/brokerage-host/psta/TermsAndCondtions",
+]
+
 # Needed for the download_prev_statement function
 class fid_months(Enum):
     """
@@ -31,7 +58,262 @@ class fid_months(Enum):
     Nov = 11
     Dec = 12
 
-class FidelityAutomation:
+class FidelityAccountData:
+    """
+    Stores and organizes the account information gathered from Fidelity.
+    Shared by the sync and async automation classes so both keep `account_dict` the same way.
+    Subclasses must set `self.account_dict` to a dict, `self.portfolio` to a `PortfolioIndex`, and `self.cache`
+    and `self.username` (either can be None) before use.
+
+    `self.portfolio` is kept up to date as positions are added. Use it for lookups across accounts.
+    Ex: `self.portfolio.accounts_holding("NVDA")` or `self.portfolio.exposure("NVDA")`
+    """
+
+    def _file_suffix(self) -> str:
+        """
+        Ends the names of trace and profile files so sessions running at the same time don't overwrite each
+        other's. Uses the hashed login and the process id, never the username itself.
+        """
+        login = AccountCache.login_key(self.username)[:12] if self.username is not None else f"session{id(self):x}"
+        return f"_{login}_{os.getpid()}"
+
+    def get_stocks_in_account(self, account_number: str) -> dict:
+        """
+        `self.getAccountInfo() must be called before this to work
+
+        Returns
+        -------
+        all_stock_dict (dict)
+            A dict of stocks that the account has.
+        """
+        if account_number in self.account_dict:
+            all_stock_dict = self.portfolio.holdings(account_number)
+            return all_stock_dict if all_stock_dict is not None else {}
+
+        return None
+
+    def set_account_dict(self, account_num: str, balance: float = None, withdrawal_balance: float = None, nickname: str = None, stocks: list = None, overwrite: bool = False):
+        """
+        Create or rewrite (if overwrite=True) an entry in the account_dict.
+        The dictionary is keyed with account numbers and holds an `Account` that can be read like a dict:
+        ```
+        account_dict["12345678"] = Account(
+            balance=balance if balance is not None else 0.0,
+            withdrawal_balance=withdrawal_balance if withdrawal_balance is not None else 0.0,
+            nickname=nickname,
+            stocks=stocks if stocks is not None else []
+        )
+        account_dict["12345678"]["stocks"]  # List of Position
+        ```
+
+        Parameters
+        ----------
+        account_num (str)
+            The account number of a Fidelity account with no parenthesis. Ex: Z12345678
+        balance (float)
+            The balance of the account if present.
+        withdrawal_balance (float)
+            The available balance that can be withdrawn from the account as cash
+        nickname (str)
+            The nickname of the account. Ex: Individual
+        stocks (list)
+            A list of `Position` or dictionaries that contain stock info. Each dictionary is defined as:
+            ```
+            {
+                'ticker': str,
+                'quantity': float,
+                'last_price': float,
+                'value': float
+            }
+            ```
+            Dictionaries are validated and converted to `Position`.
+        overwrite (bool)
+            Whether to overwrite an existing entry if found.
+
+        Returns
+        -------
+        True
+            If successful
+
+        False
+            If entry exists and overwrite=False or stock list is incorrect
+        """
+        # Overwrite or create new entry
+        if overwrite or account_num not in self.account_dict:
+            # Check stocks first. Positions were already checked when they were made
+            if stocks is not None:
+                stocks = to_positions(stocks)
+                if stocks is None:
+                    return False
+
+            # Use the info given
+            self.account_dict[account_num] = Account(
+                balance=balance if balance is not None else 0.0,
+                withdrawal_balance=withdrawal_balance if withdrawal_balance is not None else 0.0,
+                nickname=nickname,
+                stocks=stocks
+            )
+            self.portfolio.remove_account(account_num)
+            for stock in self.account_dict[account_num]["stocks"]:
+                self.portfolio.add(account_num, stock)
+            return True
+        
+        return False
+
+    def add_stock_to_account_dict(self, account_num: str, stock: Position, overwrite: bool = False):
+        """
+        Add a stock to the account dict under an account.
+        Takes a `Position`, or a dictionary which you can use/import `create_stock_dict` for help with.
+
+        Returns
+        -------
+        True
+            If successful
+        False
+            If account doesn't yet exist in account_dict
+        """
+        if not isinstance(stock, Position):
+            stocks = to_positions([stock])
+            if stocks is None:
+                return False
+            stock = stocks[0]
+        if account_num in self.account_dict:
+            if overwrite:
+                self.account_dict[account_num]["stocks"] = [stock]
+                self.account_dict[account_num]["balance"] = stock["value"]
+                self.portfolio.remove_account(account_num)
+            else:
+                self.account_dict[account_num]["stocks"].append(stock)
+                self.account_dict[account_num]["balance"] += stock["value"]
+            self.portfolio.add(account_num, stock)
+            return True
+        return False
+
+    def add_withdrawal_bal_to_account_dict(self, account_num: str, withdrawal_balance: float, overwrite: bool = False):
+        """
+        Add the cash available to withdrawal to the account_dict if it is 0 or overwriting
+
+        Returns
+        -------
+        True
+            If successful
+        False
+            If account doesn't yet exist in account_dict
+        """
+        if (account_num in self.account_dict and
+           (overwrite or self.account_dict[account_num]["withdrawal_balance"] == 0.0)
+        ):
+            self.account_dict[account_num]["withdrawal_balance"] = withdrawal_balance
+            return True
+        return False
+
+    def add_nickname_to_account_dict(self, account_num: str, nickname: str, overwrite: bool = False):
+        """
+        Add the nickname to the account_dict if it is not set or overwriting
+
+        Returns
+        -------
+        True
+            If successful
+        False
+            If account doesn't yet exist in account_dict
+        """
+        if (account_num in self.account_dict and
+           (overwrite or self.account_dict[account_num]["nickname"] is None)
+        ):
+            self.account_dict[account_num]["nickname"] = nickname
+            return True
+        return False
+
+    def add_positions(self, records):
+        """
+        Adds each position to `self.account_dict`. Accounts are created as they are first seen.
+
+        Parameters
+        ----------
+        records (Iterable[PositionRecord])
+            The positions to add. See `positions.parse_positions_csv`
+        """
+        for record in records:
+            stock = Position(record.ticker, record.quantity, record.last_price, record.value)
+            # Try setting in the account dict without overwrite
+            if not self.set_account_dict(
+                account_num=record.account_number,
+                balance=record.value,
+                nickname=record.account_name,
+                stocks=[stock],
+                overwrite=False,
+            ):
+                # If the account exists already, add to it
+                self.add_stock_to_account_dict(record.account_number, stock)
+
+    def add_positions_from_csv(self, positions_csv: str):
+        """
+        Reads a positions csv downloaded from fidelity and adds each position to `self.account_dict`.
+        See `FidelityAutomation.getAccountInfo`
+
+        Parameters
+        ----------
+        positions_csv (str)
+            The path to the positions csv
+        """
+        with open(positions_csv, newline="", encoding="utf-8-sig") as csv_file:
+            self.add_positions(parse_positions_csv(csv_file))
+
+    def load_cached_positions(self) -> bool:
+        """
+        Adds the positions saved in `self.cache` for the logged in user to `self.account_dict`.
+
+        Returns
+        -------
+        True
+            If fresh positions were found in the cache and loaded
+        False
+            If there is no cache, no one is logged in, or the cached positions are missing or stale
+        """
+        if self.cache is None or self.username is None:
+            return False
+        positions = self.cache.load_positions(self.username)
+        if positions is None:
+            return False
+        for account_num, nickname, ticker, quantity, last_price, value in positions:
+            stock = Position(ticker, quantity, last_price, value)
+            if not self.set_account_dict(account_num=account_num, balance=value, nickname=nickname, stocks=[stock]):
+                self.add_stock_to_account_dict(account_num, stock)
+        return True
+
+    def _invalidate_cache(self, *kinds):
+        """Marks the given kinds of cached data for the logged in user as stale. See `AccountCache.invalidate`"""
+        if self.cache is not None and self.username is not None:
+            self.cache.invalidate(self.username, kinds)
+
+    def summary_holdings(self) -> dict:
+        """
+        The getAccountInfo function `MUST` be called before this, otherwise an empty dictionary will be returned.
+        The exception is when fresh positions for the logged in user are in `self.cache`, those are used instead.
+        The keys of the outer dictionary are the tickers of the stocks owned.
+        Ex: `unique_stocks['NVDA'] = {'quantity': 2.0, 'last_price': 120.23, 'value': 240.46}`
+        
+        Returns
+        -------
+        unique_stocks (dict)
+            A dictionary containing dictionaries for each stock owned across all accounts.
+            ```
+            {
+                'quantity': float: The number of stocks held of 'ticker'
+                'last_price': float: The last price of the stock
+                'value': float: The total value of the stocks held
+            }
+            ```
+        """
+
+        # Nothing gathered this session, try the cache
+        if len(self.portfolio) == 0:
+            self.load_cached_positions()
+
+        return self.portfolio.summary()
+
+class FidelityAutomation(FidelityAccountData):
     """
     A class to manage and control a playwright webdriver with Fidelity.
     If you have multiple login sets and want to use cookies, make sure "title" is unique each time you create this class,
@@ -51,10 +333,31 @@ class FidelityAutomation:
         Determine whether to save cookies in a json file.
     profile_path (str)
         Path used to store browser session data.
+    browser_pool (BrowserPool)
+        If given, a context is leased from this pool's already running browser instead of launching a new one.
+        The context is kept per "title", so use a unique title per login when sharing a pool.
+    cache (AccountCache)
+        If given, accounts and positions are looked up here before going to the browser and saved here after.
+    storage_state (dict)
+        Storage state to start the context with. Overrides the cookies file. Use with `SessionManager` to
+        resume a saved session instead of logging in again.
+    block_resources (str)
+        The `RESOURCE_PROFILES` name of what to keep pages from loading. "none" (the default) loads everything.
+        "lean" skips images, fonts, media and third party hosts, which is faster but can break pages that
+        need them.
+    quote_cache (QuoteCache)
+        Last prices shared between orders. A new one with a 5 second ttl is made if not given.
+    journal (OperationJournal)
+        If given, each step of bulk orders, transfers to all accounts and penny stock enablement is recorded here,
+        and an operation that didn't finish last time skips the steps that already went through.
+    profiler (Profiler)
+        Where the time of each step, wait and page load is recorded. A new one is made if not given.
+    profile_dir (str)
+        If given, the profile is printed and written as json and csv to this directory when the browser is closed.
 
     """
 
-    def __init__(self, headless: bool = True, debug: bool = False, title: str = None, source_account: str = None, save_state: bool = True, profile_path: str = ".") -> None:
+    def __init__(self, headless: bool = True, debug: bool = False, title: str = None, source_account: str = None, save_state: bool = True, profile_path: str = ".", browser_pool: BrowserPool = None, cache: AccountCache = None, storage_state: dict = None, block_resources: str = "none", quote_cache: QuoteCache = None, journal: OperationJournal = None, profiler: Profiler = None, profile_dir: str = None) -> None:
         """
         Setup the class, create the driver, and apply stealth settings.
         """
@@ -64,30 +367,45 @@ class FidelityAutomation:
         self.save_state: bool = save_state
         self.debug = debug
         self.profile_path: str = profile_path
+        self.browser_pool: BrowserPool = browser_pool
+        self.storage_state: dict = storage_state
+        self.resource_blocker: ResourceBlocker = ResourceBlocker(block_resources)
+        self.profiler: Profiler = profiler if profiler is not None else Profiler()
+        self.profile_dir: str = profile_dir
         self.stealth_config = StealthConfig(
             navigator_languages=False,
             navigator_user_agent=False,
             navigator_vendor=False,
         )
+        # The browser that run_async drives several pages in. Started on first use
+        self._async_session = None
         self.getDriver()
         # Some class variables
         self.account_dict: dict = {}
+        self.portfolio: PortfolioIndex = PortfolioIndex()
         self.source_account = source_account
         self.new_account_number = None
+        # The order ticket left on the page by `transaction`. See reuse_ticket
+        self._ticket: dict = None
+        # The penny stock account selection page, found by `enable_all_pennystock_trading`
+        self._pennystock_url: str = None
+        self.cache: AccountCache = cache
+        self.quotes: QuoteCache = quote_cache if quote_cache is not None else QuoteCache()
+        self.journal: OperationJournal = journal
+        # Set by login. Used as the key for the cache
+        self.username: str = None
 
     def getDriver(self):
         """
         Initializes the playwright webdriver for use in subsequent functions.
         Creates and applies stealth settings to playwright context wrapper.
         If self.save_state is set to True, create a storage path for cookies and data
+        If self.browser_pool is set, the context is leased from the pool instead of launching a browser
 
         Returns
         -------
         None
         """
-        # Set the context wrapper
-        self.playwright = sync_playwright().start()
-
         # Create or load cookies if save_state is set
         if self.save_state:
             self.profile_path = os.path.abspath(self.profile_path)
@@ -103,28 +421,59 @@ class FidelityAutomation:
             # If the path supplied doesn't exist, make it
             if not os.path.exists(self.profile_path):
                 os.makedirs(os.path.dirname(self.profile_path), exist_ok=True)
-                with open(self.profile_path, "w") as f:
-                    json.dump({}, f)
+                write_private_json(self.profile_path, {})
+
+        # A given storage state wins over the cookies file
+        if self.storage_state is not None:
+            storage_state = self.storage_state
+        # Cookies are only loaded from the file when one was set up above
+        elif self.save_state and self.title is not None:
+            storage_state = self.profile_path
+        else:
+            storage_state = None
+
+        if self.browser_pool is not None:
+            # Reuse the pool's browser. The pool owns playwright and the browser
+            self.playwright = None
+            self.context = self.browser_pool.lease(self._pool_key(), storage_state=storage_state)
+            self.browser = self.browser_pool.browser
+        else:
+            # Set the context wrapper
+            self.playwright = sync_playwright().start()
+
+            # Launch the browser
+            self.browser = self.playwright.firefox.launch(
+                headless=self.headless,
+                args=["--disable-webgl", "--disable-software-rasterizer"],
+            )
 
-        # Launch the browser
-        self.browser = self.playwright.firefox.launch(
-            headless=self.headless,
-            args=["--disable-webgl", "--disable-software-rasterizer"],
-        )
+            self.context = self.browser.new_context(storage_state=storage_state)
 
-        self.context = self.browser.new_context(
-            storage_state=self.profile_path if self.title is not None else None
-        )
+        # Skip what the pages don't need to work
+        self.resource_blocker.install(self.context)
+        # Time page loads. Removed again in close_browser so a pooled context doesn't keep timing for old sessions
+        self._navigation_listener = self.profiler.watch_navigations(self.context)
 
-        # Take screenshots on actions
+        # Take screenshots on actions. Stopped in close_browser before a pooled context is handed back
+        self._tracing = False
         if self.debug:
             self.context.tracing.start(name="fidelity_trace", screenshots=True, snapshots=True)
-
-        self.page = self.context.new_page()
-        # Apply stealth settings
-        stealth_sync(self.page, self.stealth_config)
-
-    def get_list_of_accounts(self, set_flag: bool = True, get_withdrawal_bal: bool = False):
+            self._tracing = True
+
+        # A reused context already has a page with stealth settings applied
+        if self.context.pages:
+            self.page = self.context.pages[0]
+        else:
+            self.page = self.context.new_page()
+            # Apply stealth settings
+            stealth_sync(self.page, self.stealth_config)
+
+    def _pool_key(self) -> str:
+        """The key used to lease a context from the browser pool"""
+        return self.title if self.title is not None else "default"
+
+    @timed()
+    def get_list_of_accounts(self, set_flag: bool = True, get_withdrawal_bal: bool = False, use_network: bool = False, use_cache: bool = True):
         """
         Uses the transfers page's dropdown to obtain the list of accounts.
         Separates the account number and nickname and places them into `self.account_dict`
@@ -136,6 +485,14 @@ class FidelityAutomation:
             If set_flag is false, `self.account_dict` will not be updated
         get_withdrawal_bal (bool) = False
             If set to true, the function will provide the available balance that can be withdrawn from the account
+        use_network (bool) = False
+            Read the withdrawal balances out of the JSON the transfer page fetches while loading instead of
+            selecting each account in the dropdown. If the JSON doesn't have a balance for every account, all of
+            them are read from the dropdown. `NOTE` The JSON field names are not confirmed against fidelity's
+            real payload (see `extract_account_payload`), so leave this off when the balances decide what money moves.
+        use_cache (bool) = True
+            Use the accounts in `self.cache` if they (and the balances, if asked for) are still fresh.
+            Set to False when the list must come from fidelity, like right after opening an account.
 
         Post conditions
         ---------------
@@ -147,66 +504,88 @@ class FidelityAutomation:
             A dictionary of the account information using account numbers as keys. See set_account_dict
             for more info on how to use this dictionary.
         """
+        # See if the cache can answer this
+        if use_cache and self.cache is not None and self.username is not None:
+            cached = self.cache.load_accounts(self.username, need_balances=get_withdrawal_bal)
+            if cached is not None:
+                if not set_flag:
+                    return cached
+                for account_number, info in cached.items():
+                    self._merge_account(account_number, info["nickname"], info["withdrawal_balance"])
+                return self.account_dict
+
+        # Keep the JSON responses the page fetches while loading
+        responses = []
+        def capture(response):
+            if ("json" in response.headers.get("content-type", "") and
+                ACCOUNT_API_PATTERN.search(response.url)
+            ):
+                responses.append(response)
+        listening = get_withdrawal_bal and use_network
+        if listening:
+            self.page.on("response", capture)
+
         try:
             # Go to the transfers page
             self.page.wait_for_load_state(state="load")
             self.page.goto(url="https://digital.fidelity.com/ftgw/digital/transfer/?quicktransfer=cash-shares")
-            self.wait_for_loading_sign()
+            self.wait_for_loading_sign(profile="transfer")
+
+            # Read what was captured. Bodies can only be read outside of the event handler
+            network_accounts = {}
+            if listening:
+                self.page.remove_listener("response", capture)
+                listening = False
+                for response in responses:
+                    try:
+                        network_accounts.update(extract_account_payload(response.json()))
+                    except Exception:
+                        # Not JSON or the body is gone
+                        continue
 
             # Select the source account from the 'From' dropdown
             from_select = self.page.get_by_label("From")
-            options = from_select.locator("option").all()
+            # Get every option's value and text at once
+            options = from_select.locator("option").evaluate_all(
+                "options => options.map(option => [option.value, option.innerText])"
+            )
+
+            # The balances in the JSON are only used if it has one for every account
+            if get_withdrawal_bal:
+                network_accounts = complete_network_balances(network_accounts, options)
 
             local_dict = {}
             # Get account number and nickname
-            for option in options:
-                # Try to find accounts by using a regular expression
-                # This regex matches a string of numbers starting with a Z or a digit that
-                # has a '(' in front of it and a ')' at the end. Must have at least 6 digits after the
-                # Z or first digit.
-                account_number = re.search(r'(?<=\()(Z|\d)\d{6,}(?=\))', option.inner_text())
-                nickname = re.search(r'^.+?(?=\()', option.inner_text())
+            for acc_drpdwn_value, option_text in options:
+                account_number, nickname = parse_account_option(option_text)
                 with_bal = None
 
                 # Get withdrawal balance once we find a valid account
                 if get_withdrawal_bal and account_number and nickname:
+                    with_bal = network_accounts.get(account_number, {}).get("withdrawal_balance")
+                if get_withdrawal_bal and account_number and nickname and with_bal is None:
                     # Select the account in the dropdown
-                    acc_drpdwn_value = option.get_attribute("value")
                     from_select.select_option(acc_drpdwn_value)
                     # Wait for balance info to update. This is very fast but there is a delay
                     self.page.wait_for_timeout(100)
                     # Find the balance
-                    with_bal = self.page.locator("tr.pvd-table__row:nth-child(2) > td:nth-child(2)").inner_text()
-                    with_bal = float(with_bal.replace("$", "").replace(",", ""))
+                    with_bal = parse_balance(self.page.locator("tr.pvd-table__row:nth-child(2) > td:nth-child(2)").inner_text())
 
-                # Add to the account dict
-                if set_flag and account_number and nickname:
-                    # Create entry if not already there
-                    if not self.set_account_dict(
-                        account_num=account_number.group(0),
-                        nickname=nickname.group(0),
-                        withdrawal_balance=with_bal if with_bal is not None else 0.0
-                    ):
-                        # If entry exists, overwrite withdrawal balance
-                        self.add_withdrawal_bal_to_account_dict(
-                            account_num=account_number.group(0),
-                            withdrawal_balance=with_bal if with_bal is not None else 0.0,
-                            overwrite=True
-                        )
-                        # Same with nickname
-                        self.add_nickname_to_account_dict(
-                            account_num=account_number.group(0),
-                            nickname=nickname.group(0),
-                            overwrite=True
-                        )
-                # Or to local copy
-                elif not set_flag and account_number and nickname:
-                    local_dict[account_number.group(0)] = {
+                # Keep a local copy
+                if account_number and nickname:
+                    local_dict[account_number] = {
                         "balance": 0.0,
                         "withdrawal_balance": with_bal if with_bal is not None else 0.0,
-                        "nickname": nickname.group(0),
+                        "nickname": nickname,
                         "stocks": []
                     }
+                # Add to the account dict
+                if set_flag and account_number and nickname:
+                    self._merge_account(account_number, nickname, with_bal if with_bal is not None else 0.0)
+
+            if self.cache is not None and self.username is not None:
+                self.cache.save_accounts(self.username, local_dict, with_balances=get_withdrawal_bal)
+
             if not set_flag:
                 return local_dict
             
@@ -215,35 +594,47 @@ class FidelityAutomation:
         except Exception as e:
             print(f"An error occurred in get_list_of_accounts: {str(e)}")
             return None
+        finally:
+            if listening:
+                self.page.remove_listener("response", capture)
 
-    def get_stocks_in_account(self, account_number: str) -> dict:
+    def _merge_account(self, account_number: str, nickname: str, withdrawal_balance: float):
         """
-        `self.getAccountInfo() must be called before this to work
-
-        Returns
-        -------
-        all_stock_dict (dict)
-            A dict of stocks that the account has.
+        Adds an account found in the dropdown to `self.account_dict`, or updates the withdrawal balance and nickname
+        if it is already there.
         """
-        if account_number in self.account_dict:
-            all_stock_dict = {}
-            for single_stock_dict in self.account_dict[account_number]["stocks"]:
-                stock = single_stock_dict.get("ticker", None)
-                quantity = single_stock_dict.get("quantity", None)
-                if stock is not None and quantity is not None:
-                    all_stock_dict[stock] = quantity
-
-            return all_stock_dict
-
-        return None
+        # Create entry if not already there
+        if not self.set_account_dict(
+            account_num=account_number,
+            nickname=nickname,
+            withdrawal_balance=withdrawal_balance
+        ):
+            # If entry exists, overwrite withdrawal balance
+            self.add_withdrawal_bal_to_account_dict(
+                account_num=account_number,
+                withdrawal_balance=withdrawal_balance,
+                overwrite=True
+            )
+            # Same with nickname
+            self.add_nickname_to_account_dict(
+                account_num=account_number,
+                nickname=nickname,
+                overwrite=True
+            )
 
-    def getAccountInfo(self):
+    @timed()
+    def getAccountInfo(self, use_cache: bool = True):
         """
         Gets account numbers, account names, and account totals by downloading the csv of positions
         from fidelity.
         `Note` This will miss accounts that have no holdings! The positions csv doesn't show accounts
         with only pending activity either. Use `self.get_list_of_accounts` for a full list of accounts.
 
+        Parameters
+        ----------
+        use_cache (bool) = True
+            Use the positions in `self.cache` instead of downloading them if they are still fresh.
+
         Post Conditions:
             self.account_dict is populated with holdings for each account
 
@@ -265,6 +656,9 @@ class FidelityAutomation:
             }
             ```
         """
+        if use_cache and self.load_cached_positions():
+            return self.account_dict
+
         # Go to positions page
         self.page.wait_for_load_state(state="load")
         self.page.goto("https://digital.fidelity.com/ftgw/digital/portfolio/positions")
@@ -274,216 +668,17 @@ class FidelityAutomation:
         with self.page.expect_download() as download_info:
             self.page.get_by_label("Download Positions").click()
         download = download_info.value
-        cur = os.getcwd()
-        positions_csv = os.path.join(cur, download.suggested_filename)
-        # Create a copy to work on with the proper file name known
-        download.save_as(positions_csv)
-
-        csv_file = open(positions_csv, newline="", encoding="utf-8-sig")
-
-        reader = csv.DictReader(csv_file)
-        # Ensure all fields we want are present
-        required_elements = [
-            "Account Number",
-            "Account Name",
-            "Symbol",
-            "Description",
-            "Quantity",
-            "Last Price",
-            "Current Value",
-        ]
-        intersection_set = set(reader.fieldnames).intersection(set(required_elements))
-        if len(intersection_set) != len(required_elements):
-            raise Exception("Not enough elements in fidelity positions csv")
-
-        for row in reader:
-            # Skip empty rows
-            if row["Account Number"] is None:
-                continue
-            # Last couple of rows have some disclaimers, filter those out
-            if "and" in row["Account Number"]:
-                break
-            # Skip accounts that start with 'Y' (Fidelity managed)
-            if row["Account Number"][0] == "Y":
-                continue
-            # Get the value and remove '$' from it
-            val = str(row["Current Value"]).replace("$", "").replace("-", "")
-            # Get the last price
-            last_price = str(row["Last Price"]).replace("$", "").replace("-", "")
-            # Get quantity
-            quantity = str(row["Quantity"]).replace("-", "")
-            # Get ticker
-            ticker = str(row["Symbol"])
-
-            # Don't include this if present
-            if "Pending" in ticker:
-                continue
-            # If the value isn't present, move to next row
-            if len(val) == 0:
-                continue
-            # If the last price isn't available, just use the current value
-            if len(last_price) == 0:
-                last_price = val
-            # If the quantity is missing set it to 1 (For SPAXX or any other cash position)
-            if len(quantity) == 0:
-                quantity = 1
-            
-            # Check for anything that isn't a number 
-            try:
-                float(val)
-            except ValueError:
-                val = 0
-            try:
-                float(last_price)
-            except ValueError:
-                last_price = 0
-            try:
-                float(quantity)
-            except ValueError:
-                quantity = 0
-
-            # Create list of dictionary for stock found
-            stock_list = [create_stock_dict(ticker, float(quantity), float(last_price), float(val))]
-            # Try setting in the account dict without overwrite
-            if not self.set_account_dict(
-                account_num=row["Account Number"],
-                balance=float(val),
-                nickname=row["Account Name"],
-                stocks=stock_list,
-                overwrite=False,
-            ):
-                # If the account exists already, add to it
-                self.add_stock_to_account_dict(row["Account Number"], stock_list[0])
+        # Stream the rows straight out of playwright's copy of the download instead of saving
+        # another one to the working directory
+        self.add_positions_from_csv(download.path())
+        # Delete playwright's copy
+        download.delete()
 
-        # Close the file
-        csv_file.close()
-        # Delete the file
-        os.remove(positions_csv)
+        if self.cache is not None and self.username is not None:
+            self.cache.save_positions(self.username, self.account_dict)
 
         return self.account_dict
 
-    def set_account_dict(self, account_num: str, balance: float = None, withdrawal_balance: float = None, nickname: str = None, stocks: list = None, overwrite: bool = False):
-        """
-        Create or rewrite (if overwrite=True) an entry in the account_dict.
-        The dictionary is keyed with account numbers such that:
-        ```
-        account_dict["12345678"] = 
-        {
-            "balance": balance if balance is not None else 0.0,
-            "withdrawal_balance": withdrawal_balance if withdrawal_balance is not None else 0.0,
-            "nickname": nickname,
-            "stocks": stocks if stocks is not None else []
-        }
-        ```
-
-        Parameters
-        ----------
-        account_num (str)
-            The account number of a Fidelity account with no parenthesis. Ex: Z12345678
-        balance (float)
-            The balance of the account if present.
-        withdrawal_balance (float)
-            The available balance that can be withdrawn from the account as cash
-        nickname (str)
-            The nickname of the account. Ex: Individual
-        stocks (list)
-            A list of dictionaries that contain stock info. Each dictionary is defined as:
-            ```
-            {
-                'ticker': str,
-                'quantity': float,
-                'last_price': float,
-                'value': float
-            }
-            ```
-        overwrite (bool)
-            Whether to overwrite an existing entry if found.
-
-        Returns
-        -------
-        True
-            If successful
-
-        False
-            If entry exists and overwrite=False or stock list is incorrect
-        """
-        # Overwrite or create new entry
-        if overwrite or account_num not in self.account_dict:
-            # Check stocks first. This returns true is stocks is None
-            if not validate_stocks(stocks):
-                return False
-
-            # Use the info given
-            self.account_dict[account_num] = {
-                "balance": balance if balance is not None else 0.0,
-                "withdrawal_balance": withdrawal_balance if withdrawal_balance is not None else 0.0,
-                "nickname": nickname,
-                "stocks": stocks if stocks is not None else []
-            }
-            return True
-        
-        return False
-
-    def add_stock_to_account_dict(self, account_num: str, stock: dict, overwrite: bool = False):
-        """
-        Add a stock to the account dict under an account.
-        You can use/import `create_stock_dict` for help.
-
-        Returns
-        -------
-        True
-            If successful
-        False
-            If account doesn't yet exist in account_dict
-        """
-        if not validate_stocks([stock]):
-            return False
-        if account_num in self.account_dict:
-            if overwrite:
-                self.account_dict[account_num]["stocks"] = [stock]
-                self.account_dict[account_num]["balance"] = stock["value"]
-            else:
-                self.account_dict[account_num]["stocks"].append(stock)
-                self.account_dict[account_num]["balance"] += stock["value"]
-            return True
-        return False
-
-    def add_withdrawal_bal_to_account_dict(self, account_num: str, withdrawal_balance: float, overwrite: bool = False):
-        """
-        Add the cash available to withdrawal to the account_dict if it is 0 or overwriting
-
-        Returns
-        -------
-        True
-            If successful
-        False
-            If account doesn't yet exist in account_dict
-        """
-        if (account_num in self.account_dict and
-           (overwrite or self.account_dict["withdrawal_balance"] == 0.0)
-        ):
-            self.account_dict[account_num]["withdrawal_balance"] = withdrawal_balance
-            return True
-        return False
-
-    def add_nickname_to_account_dict(self, account_num: str, nickname: str, overwrite: bool = False):
-        """
-        Add the nickname to the account_dict if it is not set or overwriting
-
-        Returns
-        -------
-        True
-            If successful
-        False
-            If account doesn't yet exist in account_dict
-        """
-        if (account_num in self.account_dict and
-           (overwrite or self.account_dict["nickname"] is None)
-        ):
-            self.account_dict[account_num]["nickname"] = nickname
-            return True
-        return False
-
     def save_storage_state(self):
         """
         Saves the storage state of the browser to a file.
@@ -493,25 +688,50 @@ class FidelityAutomation:
         """
         if self.save_state:
             storage_state = self.page.context.storage_state()
-            with open(self.profile_path, "w") as f:
-                json.dump(storage_state, f)
+            write_private_json(self.profile_path, storage_state)
 
     def close_browser(self):
         """
         Closes the playwright browser.
         Use when you are completely done with this class.
         """
+        # Close the browser run_async used
+        if self._async_session is not None:
+            try:
+                self._async_session.close()
+            except Exception as e:
+                print(f"Error closing the async session: {e}")
+            self._async_session = None
         # Save cookies
         self.save_storage_state()
-        # Save screenshots if debugging
+        # Report what was blocked and cached if debugging
         if self.debug:
-            self.context.tracing.stop(path=f'./fidelity_trace{self.title if self.title is not None else ""}.zip')
+            print(self.resource_blocker.summary())
+            print(f"Quote cache: {self.quotes.stats['hits']} hits, {self.quotes.stats['misses']} misses")
+        # Stop tracing and timing page loads before the context can go back to the pool
+        if self._tracing:
+            self.context.tracing.stop(path=f"./fidelity_trace{self._file_suffix()}.zip")
+            self._tracing = False
+        if self._navigation_listener is not None:
+            self.context.remove_listener("requestfinished", self._navigation_listener)
+            self._navigation_listener = None
+        # Report where the time went
+        if self.debug or self.profile_dir is not None:
+            print(self.profiler.summary())
+        if self.profile_dir is not None:
+            json_path, csv_path = self.profiler.write(self.profile_dir, f"fidelity_profile{self._file_suffix()}")
+            print(f"Profile written to {json_path} and {csv_path}")
+        # Hand the context back to the pool for the next session instead of closing everything
+        if self.browser_pool is not None:
+            self.browser_pool.release(self._pool_key())
+            return
         # Close context before browser as directed by documentation
         self.context.close()
         self.browser.close()
         # Stop the instance of playwright
         self.playwright.stop()
 
+    @timed()
     def login(self, username: str, password: str, totp_secret: str = None, save_device: bool = True) -> bool:
         """
         Logs into fidelity using the supplied username and password.
@@ -545,6 +765,11 @@ class FidelityAutomation:
         False, False
             Initial login attempt failed.
         """
+        self.username = username
+        # Let the login page's own scripts load
+        resource_profile = self.resource_blocker.profile
+        if self.resource_blocker.profile != "none":
+            self.resource_blocker.profile = "login"
         try:
             # Go to the login page
             self.page.goto(url="https://digital.fidelity.com/prgw/digital/login/full-page")
@@ -557,11 +782,9 @@ class FidelityAutomation:
             self.page.get_by_role("button", name="Log in").click()
 
             # Wait for loading spinner to go away
-            self.wait_for_loading_sign()
-            # The first spinner goes away then another one appears
-            # This has been tested many times and this is necessary
-            self.page.wait_for_timeout(1000)
-            self.wait_for_loading_sign()
+            # The first spinner goes away then another one appears. The login profile waits for the
+            # summary page or 2FA widget instead of a fixed delay between the two
+            self.wait_for_loading_sign(profile="login")
 
             if "summary" in self.page.url:
                 return (True, True)
@@ -640,7 +863,10 @@ class FidelityAutomation:
             print(f"An error occurred: {str(e)}")
             traceback.print_exc()
             return (False, False)
+        finally:
+            self.resource_blocker.profile = resource_profile
 
+    @timed()
     def login_2FA(self, code: str, save_device: bool = True):
         """
         Completes the 2FA portion of the login using a phone text code.
@@ -659,6 +885,10 @@ class FidelityAutomation:
         False (bool)
             If login failed, return false.
         """
+        # Let the login page's own scripts load
+        resource_profile = self.resource_blocker.profile
+        if self.resource_blocker.profile != "none":
+            self.resource_blocker.profile = "login"
         try:
             self.page.get_by_placeholder("XXXXXX").fill(code)
 
@@ -688,53 +918,16 @@ class FidelityAutomation:
             print(f"An error occurred: {str(e)}")
             traceback.print_exc()
             return False
+        finally:
+            self.resource_blocker.profile = resource_profile
 
-    def summary_holdings(self) -> dict:
-        """
-        The getAccountInfo function `MUST` be called before this, otherwise an empty dictionary will be returned.
-        The keys of the outer dictionary are the tickers of the stocks owned.
-        Ex: `unique_stocks['NVDA'] = {'quantity': 2.0, 'last_price': 120.23, 'value': 240.46}`
-        
-        Returns
-        -------
-        unique_stocks (dict)
-            A dictionary containing dictionaries for each stock owned across all accounts.
-            ```
-            {
-                'quantity': float: The number of stocks held of 'ticker'
-                'last_price': float: The last price of the stock
-                'value': float: The total value of the stocks held
-            }
-            ```
-        """
-
-        unique_stocks = {}
-
-        for account_number in self.account_dict:
-            for stock_dict in self.account_dict[account_number]["stocks"]:
-                # Create a list of unique holdings
-                if stock_dict["ticker"] not in unique_stocks:
-                    unique_stocks[stock_dict["ticker"]] = {
-                        "quantity": float(stock_dict["quantity"]),
-                        "last_price": float(stock_dict["last_price"]),
-                        "value": float(stock_dict["value"]),
-                    }
-                else:
-                    unique_stocks[stock_dict["ticker"]]["quantity"] += float(
-                        stock_dict["quantity"]
-                    )
-                    unique_stocks[stock_dict["ticker"]]["value"] += float(
-                        stock_dict["value"]
-                    )
-
-        return unique_stocks
-
-    def transaction(self, stock: str, quantity: float, action: str, account: str, dry: bool = True) -> bool:
+    @timed()
+    def transaction(self, stock: str, quantity: float, action: str, account: str, dry: bool = True, reuse_ticket: bool = False, limit_price: float = None) -> bool:
         """
         Process an order (transaction) using the dedicated trading page.
 
         `NOTE`: If you use this function repeatedly but change the stock between ANY call,
-        RELOAD the page before calling this
+        RELOAD the page before calling this. Not needed with reuse_ticket=True, which checks the ticket first
 
         For buying:
             If the price of the security is below $1, it will choose limit order and go off of the last price + a little
@@ -753,6 +946,12 @@ class FidelityAutomation:
             The account number to trade under.
         dry (bool)
             True for dry (test) run, False for real run.
+        reuse_ticket (bool)
+            Keep the symbol, action and order type from the last order placed with reuse_ticket=True and only
+            change the account and quantity. Falls back to filling the whole ticket if the page doesn't
+            show the same ticket anymore. Use when placing the same order in many accounts.
+        limit_price (float)
+            Place a limit order at this price instead of choosing the order type from the last price.
 
         Returns
         -------
@@ -761,10 +960,14 @@ class FidelityAutomation:
             returned and Error_message will be None. Otherwise, False will be returned and Error_message will not be None
         """
         try:
-            # Go to the trade page
-            self.page.wait_for_load_state(state="load")
-            if (self.page.url != "https://digital.fidelity.com/ftgw/digital/trade-equity/index/orderEntry"):
-                self.page.goto("https://digital.fidelity.com/ftgw/digital/trade-equity/index/orderEntry")
+            # See if the last ticket can be used as is
+            fast = reuse_ticket and self._ticket_ready(stock, action)
+            if not fast:
+                self._ticket = None
+                # Go to the trade page
+                self.page.wait_for_load_state(state="load")
+                if (self.page.url != "https://digital.fidelity.com/ftgw/digital/trade-equity/index/orderEntry"):
+                    self.page.goto("https://digital.fidelity.com/ftgw/digital/trade-equity/index/orderEntry")
 
             # Click on the drop down
             self.page.query_selector("#dest-acct-dropdown").click()
@@ -774,52 +977,67 @@ class FidelityAutomation:
                 # This is to prevent a rare case where the drop down is empty
                 print("Reloading...")
                 self.page.reload()
+                fast = False
                 # Click on the drop down
                 self.page.query_selector("#dest-acct-dropdown").click()
             # Find the account to trade under
             self.page.get_by_role("option").filter(has_text=account.upper()).click()
 
-            # Enter the symbol
-            self.page.get_by_label("Symbol").click()
-            # Fill in the ticker
-            self.page.get_by_label("Symbol").fill(stock)
-            # Force the search to use exactly what was entered
-            self.page.get_by_label("Symbol").press("Enter")
-
-            # Wait for quote panel to show up
-            self.page.locator("#quote-panel").wait_for(timeout=5000)
-            last_price = self.page.query_selector("#eq-ticket__last-price > span.last-price").text_content()
-            last_price = last_price.replace("$", "")
-
-            # Ensure we are in the expanded ticket
-            if self.page.get_by_role("button", name="View expanded ticket").is_visible():
-                self.page.get_by_role("button", name="View expanded ticket").click()
-                # Wait for it to take effect
-                self.page.get_by_role("button", name="Calculate shares").wait_for(timeout=5000)
-
-            # When enabling extended hour trading
-            extended = False
-            precision = 3
-            # Enable extended hours trading if available
-            if self.page.get_by_text("Extended hours trading").is_visible():
-                if self.page.get_by_text("Extended hours trading: OffUntil 8:00 PM ET").is_visible():
-                    self.page.get_by_text("Extended hours trading: OffUntil 8:00 PM ET").check()
-                extended = True
-                precision = 2
-
-            # Press the buy or sell button. Title capitalizes the first letter so 'buy' -> 'Buy'
-            self.page.query_selector(".eq-ticket-action-label").click()
-            self.page.get_by_role("option", name=action.lower().title(), exact=True).wait_for()
-            self.page.get_by_role("option", name=action.lower().title(), exact=True).click()
+            # Switching accounts can clear the ticket
+            if fast and not self._ticket_ready(stock, action):
+                fast = False
+
+            if fast:
+                extended = self._ticket["extended"]
+                precision = self._ticket["precision"]
+                # Only the price might have moved
+                last_price = self._get_last_price(stock)
+            else:
+                # Enter the symbol
+                self.page.get_by_label("Symbol").click()
+                # Fill in the ticker
+                self.page.get_by_label("Symbol").fill(stock)
+                # Force the search to use exactly what was entered
+                self.page.get_by_label("Symbol").press("Enter")
+
+                # Wait for quote panel to show up
+                with self.profiler.step("transaction quote"):
+                    self.page.locator("#quote-panel").wait_for(timeout=5000)
+                last_price = self._get_last_price(stock)
+
+                # Ensure we are in the expanded ticket
+                if self.page.get_by_role("button", name="View expanded ticket").is_visible():
+                    self.page.get_by_role("button", name="View expanded ticket").click()
+                    # Wait for it to take effect
+                    self.page.get_by_role("button", name="Calculate shares").wait_for(timeout=5000)
+
+                # When enabling extended hour trading
+                extended = False
+                precision = 3
+                # Enable extended hours trading if available
+                if self.page.get_by_text("Extended hours trading").is_visible():
+                    if self.page.get_by_text("Extended hours trading: OffUntil 8:00 PM ET").is_visible():
+                        self.page.get_by_text("Extended hours trading: OffUntil 8:00 PM ET").check()
+                    extended = True
+                    precision = 2
+
+                # Press the buy or sell button. Title capitalizes the first letter so 'buy' -> 'Buy'
+                self.page.query_selector(".eq-ticket-action-label").click()
+                self.page.get_by_role("option", name=action.lower().title(), exact=True).wait_for()
+                self.page.get_by_role("option", name=action.lower().title(), exact=True).click()
 
             # Press the shares text box
             self.page.locator("#eqt-mts-stock-quatity div").filter(has_text="Quantity").click()
             self.page.get_by_text("Quantity", exact=True).fill(str(quantity))
 
             # If it should be limit
-            if float(last_price) < 1 or extended:
+            limit = limit_price is not None or float(last_price) < 1 or extended
+            if limit:
+                # Use the price given
+                if limit_price is not None:
+                    wanted_price = limit_price
                 # Buy above
-                if action.lower() == "buy":
+                elif action.lower() == "buy":
                     difference_price = 0.01 if float(last_price) > 0.1 else 0.0001
                     wanted_price = round(float(last_price) + difference_price, precision)
                 # Sell below
@@ -827,30 +1045,43 @@ class FidelityAutomation:
                     difference_price = 0.01 if float(last_price) > 0.1 else 0.0001
                     wanted_price = round(float(last_price) - difference_price, precision)
 
-                # Click on the limit default option when in extended hours
-                self.page.query_selector("#dest-dropdownlist-button-ordertype > span:nth-child(1)").click()
-                self.page.get_by_role("option", name="Limit", exact=True).click()
+                # The order type is already limit on a reused ticket
+                if not fast or not self._ticket["limit"]:
+                    # Click on the limit default option when in extended hours
+                    self.page.query_selector("#dest-dropdownlist-button-ordertype > span:nth-child(1)").click()
+                    self.page.get_by_role("option", name="Limit", exact=True).click()
                 # Enter the limit price
                 self.page.get_by_text("Limit price", exact=True).click()
                 self.page.get_by_label("Limit price").fill(str(wanted_price))
             # Otherwise its market
-            else:
+            elif not fast or self._ticket["limit"]:
                 # Click on the market
                 self.page.locator("#order-type-container-id").click()
                 self.page.get_by_role("option", name="Market", exact=True).click()
 
+            # The ticket is set up for this stock and action now
+            self._ticket = None
+            if reuse_ticket:
+                self._ticket = {
+                    "stock": stock.upper(),
+                    "action": action.lower(),
+                    "limit": limit,
+                    "extended": extended,
+                    "precision": precision,
+                }
+
             # Continue with the order
             self.page.get_by_role("button", name="Preview order").click()
             self.wait_for_loading_sign()
 
             # If error occurred
             try:
-                self.page.get_by_role("button", name="Place order", exact=False).wait_for(timeout=5000, state="visible")
+                with self.profiler.step("transaction preview"):
+                    self.page.get_by_role("button", name="Place order", exact=False).wait_for(timeout=5000, state="visible")
             except PlaywrightTimeoutError:
                 # Error must be present (or really slow page for some reason)
                 # Try to report on error
                 error_message = ""
-                filtered_error = ""
                 error_box_closed = False
                 try:
                     error_message = (self.page.get_by_label("Error").locator("div").filter(has_text="critical").nth(2).text_content(timeout=2000))
@@ -867,22 +1098,14 @@ class FidelityAutomation:
                         pass
                 # Return with error and trim it down (it contains many spaces for some reason)
                 if error_message != "":
-                    for i, character in enumerate(error_message):
-                        if (
-                            (character == " " and error_message[i - 1] == " ")
-                            or character == "\n"
-                            or character == "\t"
-                        ):
-                            continue
-                        filtered_error += character
-
-                    error_message = filtered_error.replace("critical", "").strip().replace("\n", "")
+                    error_message = clean_error_message(error_message)
                 else:
                     error_message = "Could not retrieve error message from popup"
 
                 # If the error box is still open, reload the page
                 if not error_box_closed:
                     self.page.reload()
+                    self._ticket = None
                 return (False, error_message)
 
             # If no error occurred, continue with checking the order preview
@@ -895,28 +1118,265 @@ class FidelityAutomation:
 
             # If its a real run
             if not dry:
-                self.page.get_by_role("button", name="Place order", exact=False).first.click()
-                try:
-                    self.wait_for_loading_sign()
-                    # See that the order goes through
-                    self.page.get_by_text("Order received", exact=True).wait_for(timeout=10000, state="visible")
-                    # If no error, return with success
-                    return (True, None)
-                except PlaywrightTimeoutError as toe:
-                    # Order didn't go through for some reason, go to the next and say error
-                    return (False, f"Timed out waiting for 'Order received': {toe}")
+                return self.place_previewed_order()
             # If its a dry run, report back success
             return (True, None)
         except PlaywrightTimeoutError as toe:
+            self._ticket = None
             return (False, f"Driver timed out. Order not complete: {toe}")
         except Exception as e:
+            self._ticket = None
             return (False, f"Some error occurred: {e}")
         
 
+    @timed()
+    def place_previewed_order(self):
+        """
+        Places the order whose preview is open on the page. Used by `transaction` and by `batch_orders`
+        to place an order that was previewed earlier.
+
+        Returns
+        -------
+        (Success (bool), Error_message (str))
+        """
+        try:
+            self.page.get_by_role("button", name="Place order", exact=False).first.click()
+            self.wait_for_loading_sign()
+            # See that the order goes through
+            self.page.get_by_text("Order received", exact=True).wait_for(timeout=10000, state="visible")
+            self._invalidate_cache("balances", "positions")
+            # If no error, return with success
+            return (True, None)
+        except PlaywrightTimeoutError as toe:
+            # Order didn't go through for some reason, go to the next and say error
+            return (False, f"Timed out waiting for 'Order received': {toe}")
+        except Exception as e:
+            return (False, f"Some error occurred: {e}")
+
+    def _get_last_price(self, stock: str) -> float:
+        """
+        Gets the last price of a stock from `self.quotes`, or reads it off the order ticket if it isn't
+        cached. The quote panel must be showing the stock.
+        """
+        last_price = self.quotes.get(stock)
+        if last_price is None:
+            last_price = parse_balance(self.page.query_selector("#eq-ticket__last-price > span.last-price").text_content())
+            self.quotes.put(stock, last_price)
+        return last_price
+
+    def _ticket_ready(self, stock: str, action: str) -> bool:
+        """
+        Checks if the order ticket on the page still has the symbol and action of the last order placed with
+        reuse_ticket=True, going back from the order preview if needed.
+
+        Returns
+        -------
+        True
+            If only the account and quantity need to be filled in
+        """
+        ticket = self._ticket
+        if ticket is None or ticket["stock"] != stock.upper() or ticket["action"] != action.lower():
+            return False
+        if self.page.url != "https://digital.fidelity.com/ftgw/digital/trade-equity/index/orderEntry":
+            return False
+        try:
+            # Leave the preview of the last order
+            edit = self.page.get_by_role("button", name="Edit order")
+            if edit.is_visible():
+                edit.click()
+                self.page.get_by_label("Symbol").wait_for(timeout=5000)
+            # Check what the ticket shows
+            return (
+                self.page.locator("#quote-panel").is_visible()
+                and self.page.get_by_label("Symbol").input_value(timeout=1000).strip().upper() == ticket["stock"]
+                and action.lower().title() in (self.page.locator(".eq-ticket-action-label").text_content(timeout=1000) or "")
+            )
+        except Exception:
+            # Anything missing or unexpected means a full reset
+            return False
+
+    @timed()
+    def bulk_transaction(self, stock: str, quantity: float, action: str, accounts: list, dry: bool = True, max_pages: int = 1) -> dict:
+        """
+        Places the same order in every account given.
+        With max_pages > 1 the orders are spread across that many pages of a second browser that shares this
+        session's cookies. See `AsyncFidelityAutomation.bulk_transaction`
+
+        Parameters
+        ----------
+        stock (str)
+            The ticker that represents the security to be traded
+        quantity (float)
+            The amount to buy or sell of the security in each account
+        action (str)
+            'buy' or 'sell'
+        accounts (list)
+            The account numbers to trade under
+        dry (bool)
+            True for dry (test) run, False for real run.
+        max_pages (int)
+            The max number of orders to work on at the same time
+
+        Returns
+        -------
+        results (dict)
+            `(Success (bool), Error_message (str))` from `transaction` for each account, keyed by account number
+        """
+        # Dry runs can always be repeated
+        if dry:
+            run = JournalRun.disabled()
+        else:
+            run = self._begin_journal("bulk_transaction", stock=stock.upper(), quantity=quantity, action=action.lower(), accounts=list(accounts))
+        pending = run.pending(list(accounts))
+
+        if max_pages <= 1:
+            results = {}
+            for account in pending:
+                run.intent(account)
+                results[account] = self.transaction(stock=stock, quantity=quantity, action=action, account=account, dry=dry, reuse_ticket=True)
+                run.record(account, *results[account])
+        else:
+            async def place_orders(browser):
+                return await browser.bulk_transaction(stock, quantity, action, pending, dry=dry, max_pages=max_pages, journal=run)
+
+            results = self.run_async(place_orders)
+
+        if all(success for success, _ in results.values()):
+            run.finish()
+        return {account: results.get(account, run.earlier_outcome(account)) for account in accounts}
+
+    @timed()
+    def batch_orders(self, legs: list, dry: bool = False, confirm=None, max_pages: int = 1) -> list:
+        """
+        Places a batch of orders in two passes. Every order is previewed first, then the ones that passed
+        preview are placed. Nothing is placed if `confirm` says no, so the whole batch can be called off
+        after seeing the previews.
+
+        A market order's preview can go stale while `confirm` waits, so those are filled in again and placed
+        from a new preview. The last order previewed is placed straight from its preview if it has a limit
+        price, or if `confirm` is None. With max_pages > 1 the batch runs on that many pages of a second
+        browser, and every order with a limit price can keep its preview open on a page of its own.
+        See `AsyncFidelityAutomation.batch_orders`
+
+        Parameters
+        ----------
+        legs (list)
+            `OrderLeg` or dictionaries with account, symbol, side, quantity and (optional) limit
+        dry (bool)
+            Stop after the previews
+        confirm (callable)
+            Called with the results after the previews. Return True to place the orders that passed.
+            None places them without asking. See `orders.format_order_preview` to show them
+        max_pages (int)
+            The max number of orders to work on at the same time
+
+        Returns
+        -------
+        results (list)
+            A dict for each leg, in the order they were run. See `orders.new_order_result`
+        """
+        legs = plan_orders(legs)
+        if max_pages > 1:
+            async def run_batch(browser):
+                return await browser.batch_orders(legs, dry=dry, confirm=confirm, max_pages=max_pages)
+
+            return self.run_async(run_batch)
+
+        results = [new_order_result(leg) for leg in legs]
+
+        # Preview everything
+        parked = None
+        for result in results:
+            leg = result["leg"]
+            success, error = self.transaction(
+                stock=leg.symbol,
+                quantity=leg.quantity,
+                action=leg.side,
+                account=leg.account,
+                dry=True,
+                reuse_ticket=True,
+                limit_price=leg.limit
+            )
+            result["previewed"] = success
+            result["error"] = error
+            # The page still shows the last preview that passed
+            parked = result if success else None
+
+        accepted = [result for result in results if result["previewed"]]
+        if dry or not accepted or (confirm is not None and not confirm(results)):
+            return results
+
+        # The order still open on the page doesn't need to be filled in again, unless it is a market
+        # order that sat there while confirm waited, since its quote may be stale by now
+        if parked is not None and (confirm is None or parked["leg"].limit is not None):
+            accepted = [result for result in accepted if result is not parked]
+            parked["placed"], parked["error"] = self.place_previewed_order()
+        for result in accepted:
+            leg = result["leg"]
+            result["placed"], result["error"] = self.transaction(
+                stock=leg.symbol,
+                quantity=leg.quantity,
+                action=leg.side,
+                account=leg.account,
+                dry=False,
+                reuse_ticket=True,
+                limit_price=leg.limit
+            )
+        return results
+
+    def _begin_journal(self, kind: str, **params) -> JournalRun:
+        """
+        Starts (or resumes) journaling an operation for the logged in user. See `OperationJournal.begin`
+        Returns a run that records nothing if there is no journal.
+        """
+        if self.journal is None:
+            return JournalRun.disabled()
+        return self.journal.begin(kind, self.username, **params)
+
+    def run_async(self, fn):
+        """
+        Runs `await fn(browser)` with an `AsyncFidelityAutomation`. Use this to drive several pages at once from this
+        sync class. `self.account_dict`, `self.portfolio`, `self.quotes` and `self.profiler` are shared with it.
+
+        Sync playwright can only drive one page at a time, and only from the thread that started it, so the pages live
+        in a second browser running on its own thread (a `BackgroundSession`). It is launched on the first call and
+        reused until `close_browser`. Cookies are copied into it before each call and back afterwards, so both
+        contexts stay on the same fidelity session. This thread waits while it works, so only one of them is in use
+        at a time.
+
+        Returns
+        -------
+        The return value of `fn`
+        """
+        # Imported here since the async module builds on this one
+        from fidelityAsyncAPI import BackgroundSession
+        cookies = self.context.cookies()
+        if self._async_session is None:
+            self._async_session = BackgroundSession(
+                self.context.storage_state(),
+                headless=self.headless,
+                quote_cache=self.quotes,
+                profiler=self.profiler,
+                block_resources=self.resource_blocker.profile
+            )
+        try:
+            return self._async_session.run(fn, cookies=cookies, account_dict=self.account_dict, portfolio=self.portfolio)
+        finally:
+            # Keep this context on whatever the pages refreshed
+            self.context.add_cookies(self._async_session.cookies())
+
+    @timed()
     def open_account(self, type: typing.Optional[Literal["roth", "brokerage"]]) -> bool:
         """
-        Opens either a brokerage or roth account. If a roth account is opened, the new account number is stored in
-        `self.new_account_number`
+        Opens either a brokerage or roth account. The new account number is stored in `self.new_account_number`
+        and added to `self.account_dict`.
+
+        The number is read from the confirmation page. For a brokerage account the accounts from the transfer
+        dropdown are needed from before opening, since it has every account (unlike positions, which leave out
+        empty ones). The cached list is used while it is fresh, it comes from the same dropdown and is dropped
+        after every opening. Otherwise the dropdown is listed. If the
+        confirmation page doesn't have the number, it is taken from the responses fidelity sent while opening
+        the account, checked against that list, and only then are the accounts listed again to find it.
 
         `NOTE` Use login(save_device=False) when logging in.
         If you do not authenticate with 2FA when creating this session and the device is remembered from a pervious
@@ -932,26 +1392,26 @@ class FidelityAutomation:
         success (bool)
             If the account was successfully opened
         """
+        # Reset new account number in case this was set before
+        self.new_account_number = None
+        if type not in ("roth", "brokerage"):
+            return False
         try:
+            # A complete list of the accounts that are already there, cached or from the dropdown. Only
+            # needed for brokerage accounts, whose confirmation page may not show the number
+            known = None
+            if type == "brokerage":
+                before = self.get_list_of_accounts(set_flag=False)
+                if before is None:
+                    print("Could not list the accounts before opening one")
+                    return False
+                known = set(before)
+
             if type == "roth":
                 # Go to open roth page
                 self.page.goto(url="https://digital.fidelity.com/ftgw/digital/aox/RothIRAccountOpening/PersonalInformation")
                 self.wait_for_loading_sign()
-
-                # Open an account
-                self.page.get_by_role("button", name="Open account").click()
-                self.wait_for_loading_sign(timeout=60000)
-                congrats_message = self.page.get_by_role("heading", name="Congratulations, your account")
-                congrats_message.wait_for(state="visible")
-
-                # Get the account number
-                self.new_account_number = self.page.get_by_role("heading", name="Your account number is").text_content()
-                self.new_account_number = self.new_account_number.replace("Your account number is ", "")
-                return True
-            if type == "brokerage":
-                # Get list of accounts first
-                old_dict = self.get_list_of_accounts(set_flag=False)
-
+            else:
                 # Go to individual brokerage page
                 self.page.goto(url="https://digital.fidelity.com/ftgw/digital/aox/BrokerageAccountOpening/JointSelectionPage")
                 self.wait_for_loading_sign()
@@ -964,37 +1424,125 @@ class FidelityAutomation:
                 # If application is already started, then there will only be 1 "Next" button
                 self.page.get_by_role("button", name="Next").click()
                 self.wait_for_loading_sign()
-                
-                # Open account
+
+            # Keep the JSON responses sent while the account is opened
+            responses = []
+            def capture(response):
+                if "json" in response.headers.get("content-type", "") and ACCOUNT_OPENING_PATTERN.search(response.url):
+                    responses.append(response)
+
+            self.page.on("response", capture)
+            try:
+                # Open an account. Can take a while
                 self.page.get_by_role("button", name="Open account").click()
-                self.wait_for_loading_sign(timeout=60000)   # Can take a while to open sometimes
+                self.wait_for_loading_sign(timeout=60000)
+                if type == "roth":
+                    self.page.get_by_role("heading", name="Congratulations, your account").wait_for(state="visible")
+                else:
+                    # Wait for page to load completely
+                    self.page.wait_for_load_state(state='load')
+                    self.wait_for_loading_sign()
+            finally:
+                self.page.remove_listener("response", capture)
 
-                # Wait for page to load completely
-                self.page.wait_for_load_state(state='load')
-                self.wait_for_loading_sign()
+            ## Getting the account number ##
+            # Bodies can only be read outside of the event handler
+            payloads = []
+            for response in responses:
+                try:
+                    payloads.append(response.json())
+                except Exception:
+                    pass
+            self.new_account_number = find_new_account_number(payloads, self.page.locator("body").inner_text(), known)
 
-                ## Getting the account number ##
-                # Get new list of accounts
-                new_dict = self.get_list_of_accounts(set_flag=False)
-                # Reset new account number in case this was set before
-                self.new_account_number = None
-                # Compare old and new list
-                for new_dict_acc in new_dict:
-                    # If new account is found, collect and return
-                    if new_dict_acc not in old_dict:
-                        self.new_account_number = new_dict_acc
-                        print(self.new_account_number)
-                        return True
-                
-                # No new account number was found, return false
+            # Otherwise the new account is the one that wasn't there before
+            if self.new_account_number is None and type == "brokerage":
+                for account_number in self.get_list_of_accounts(set_flag=False, use_cache=False) or {}:
+                    if account_number not in known:
+                        self.new_account_number = account_number
+                        break
+
+            # No new account number was found
+            if self.new_account_number is None:
                 return False
 
-            return False
+            print(self.new_account_number)
+            self.set_account_dict(account_num=self.new_account_number)
+            self._invalidate_cache("accounts")
+            return True
         except Exception as e:
             print(e)
             self.page.pause()
             return False
 
+    @timed()
+    def provision_accounts(self, type: typing.Optional[Literal["roth", "brokerage"]], count: int, transfer_amount: float = None, source_account: str = None, nicknames: list = None) -> list:
+        """
+        Opens `count` accounts and funds, enables penny stock trading on and nicknames each one.
+        The four stages run on separate pages as a pipeline, so the next account is being opened while
+        the last one is being funded. Prints the new account numbers and how long each stage took.
+
+        `NOTE` See the note on `open_account` about logging in.
+
+        Parameters
+        ----------
+        type (str)
+            'roth' or 'brokerage'
+        count (int)
+            How many accounts to open
+        transfer_amount (float)
+            How much to move into each new account. None or 0 skips funding
+        source_account (str)
+            The account to fund from. Defaults to `self.source_account`
+        nicknames (list)
+            The nickname for each new account, in the order they are opened. None skips nicknaming
+
+        Returns
+        -------
+        results (list)
+            One dict per account. See `AsyncFidelityAutomation.provision_accounts`
+        """
+        source_account = source_account or self.source_account
+        # The cached accounts save listing the dropdown again while they are fresh
+        known_accounts = None
+        if self.cache is not None and self.username is not None:
+            cached = self.cache.load_accounts(self.username)
+            if cached is not None:
+                known_accounts = set(cached)
+
+        async def provision(browser):
+            return await browser.provision_accounts(type, count, transfer_amount, source_account, nicknames, known_accounts=known_accounts)
+
+        try:
+            results = self.run_async(provision)
+        except Exception as e:
+            print(f"Error provisioning accounts: {e}")
+            return []
+        self._invalidate_cache("accounts", "balances", "positions")
+
+        enabled = [result["account"] for result in results if result["enabled"]]
+        if enabled and self.cache is not None and self.username is not None:
+            self.cache.mark_enabled(self.username, enabled)
+        opened = [result for result in results if result["opened"]]
+        if opened:
+            self.new_account_number = opened[-1]["account"]
+
+        # Report on every account and stage
+        def mark(value):
+            return "-" if value is None else ("✓" if value else "✗")
+        print(f"\nOpened {len(opened)} of {count} {type} accounts")
+        print(f"{'Account':<12} {'Opened':>7} {'Funded':>7} {'Enabled':>8} {'Named':>6}")
+        for result in results:
+            print(f"{result['account'] or '-':<12} {mark(result['opened']):>7} {mark(result['funded']):>7} "
+                  f"{mark(result['enabled'] if result['opened'] else None):>8} {mark(result['nicknamed']):>6}")
+        print(f"\n{'Stage':<10} {'Count':>6} {'Total s':>9} {'Avg s':>8}")
+        for stage in ("open", "fund", "enable", "nickname"):
+            times = [result["timings"][stage] for result in results if stage in result["timings"]]
+            if times:
+                print(f"{stage:<10} {len(times):>6} {sum(times):>9.2f} {sum(times) / len(times):>8.2f}")
+        return results
+
+    @timed()
     def transfer_acc_to_acc(self, source_account: str, destination_account: str, transfer_amount: float) -> bool:
         """
         Transfers requested amount from source account to destination account.
@@ -1076,15 +1624,19 @@ class FidelityAutomation:
                 print("Transfer submission failed")
                 return False
 
+            self._invalidate_cache("balances", "positions")
             return True
 
         except Exception as e:
             print(f"An error occurred during the transfer: {str(e)}")
             return False
         
-    def transfer_from_source_to_all_acc(self, source_account: str, transfer_amount: float) -> bool:
+    @timed()
+    def transfer_from_source_to_all_acc(self, source_account: str, transfer_amount: float, max_pages: int = 1) -> bool:
         """
         Transfers specified amount from source account to all eligible destination accounts.
+        With max_pages > 1 the transfers are submitted from that many pages of a second browser at the same time.
+        See `AsyncFidelityAutomation.transfer_from_source_to_all_acc`
         
         Parameters
         ----------
@@ -1092,12 +1644,28 @@ class FidelityAutomation:
             The account number to transfer from
         transfer_amount : float
             The amount to transfer to each account
+        max_pages : int
+            The max number of transfers to work on at the same time
             
         Returns
         -------
         bool
             True if all transfers were successful
         """
+        run = self._begin_journal("transfer_from_source_to_all_acc", source_account=source_account, transfer_amount=transfer_amount)
+        if max_pages > 1:
+            async def fan_out(browser):
+                return await browser.transfer_from_source_to_all_acc(source_account, transfer_amount, max_pages=max_pages, journal=run)
+
+            try:
+                success = self.run_async(fan_out)
+                if success:
+                    run.finish()
+                return success and not run.held
+            finally:
+                # Some may have gone through even if others failed
+                self._invalidate_cache("balances", "positions")
+
         try:
             # Navigate to the transfer page
             self.page.wait_for_load_state(state="load")
@@ -1131,7 +1699,6 @@ class FidelityAutomation:
             
             success_count = 0
             fail_count = 0
-            total_needed = 0
             dest_accounts = []
 
             # First pass: count eligible accounts and total amount needed
@@ -1140,7 +1707,10 @@ class FidelityAutomation:
                 acc_text = option.inner_text()
                 if acc_num and acc_num != source_value:  # Skip empty options and source account
                     dest_accounts.append((acc_num, acc_text))
-                    total_needed += transfer_amount
+            # Leave out the accounts funded by an earlier run that didn't finish
+            pending = run.pending([acc_num for acc_num, _ in dest_accounts])
+            dest_accounts = [(acc_num, acc_text) for acc_num, acc_text in dest_accounts if acc_num in pending]
+            total_needed = transfer_amount * len(dest_accounts)
 
             # Check if enough balance available
             if total_needed > available_balance:
@@ -1168,6 +1738,7 @@ class FidelityAutomation:
                 self.page.locator("#transfer-amount").fill(str(transfer_amount))
 
                 # Submit transfer
+                run.intent(acc_num)
                 self.page.get_by_role("button", name="Continue").click()
                 self.wait_for_loading_sign()
                 self.page.get_by_role("button", name="Submit").click()
@@ -1177,6 +1748,7 @@ class FidelityAutomation:
                     # Check if transfer was successful
                     self.page.get_by_text("Request submitted").wait_for(state='visible')
                     print(f"✓ Success")
+                    run.done(acc_num)
                     success_count += 1
                     
                     # Go back to transfer page for next transaction
@@ -1189,59 +1761,74 @@ class FidelityAutomation:
                     self.wait_for_loading_sign()
                     
                 except Exception as e:
+                    # Submit was pressed so it may have gone through. The journal is left without an outcome
                     print(f"✗ Failed: {str(e)}")
                     fail_count += 1
 
+            if success_count > 0:
+                self._invalidate_cache("balances", "positions")
+
             # Print final summary
             print(f"\nTransfer Summary:")
             print(f"Successful: {success_count}")
             print(f"Failed: {fail_count}")
             
-            return fail_count == 0
+            if fail_count == 0:
+                run.finish()
+            # Transfers left out with an unknown outcome still need checking
+            return fail_count == 0 and not run.held
 
         except Exception as e:
             print(f"An error occurred during transfers: {str(e)}")
             return False
         
-    def transfer_from_all_to_source(self, source_account: str, transfer_amount: float) -> bool:
+    @timed()
+    def transfer_from_all_to_source(self, source_account: str, transfer_amount: float, max_pages: int = 1) -> bool:
         """
         Transfers specified amount from eligible accounts to the source account.
+        Runs in three phases, timing each one:
+            discovery: The withdrawal balance of every account is read in one pass. See `get_list_of_accounts`
+            confirmation: The eligible accounts are shown and the user is asked to go ahead
+            sweep: The transfers are submitted. With max_pages > 1 this happens from that many pages at the same time
+
+        Parameters
+        ----------
+        source_account (str)
+            The account number to transfer to
+        transfer_amount (float)
+            The amount to transfer from each account
+        max_pages (int)
+            The max number of transfers to work on at the same time
+
+        Returns
+        -------
+        bool
+            True if all transfers were successful
         """
+        timings = {}
         try:
-            # Navigate to the transfer page
-            self.page.wait_for_load_state(state="load")
-            self.page.goto(url="https://digital.fidelity.com/ftgw/digital/transfer/?quicktransfer=cash-shares")
-            self.wait_for_loading_sign()
+            # Discovery. Balances come from the page's own data instead of selecting every account.
+            # Never from the cache since money is moved based on them
+            start = time.perf_counter()
+            accounts = self.get_list_of_accounts(set_flag=False, get_withdrawal_bal=True, use_cache=False)
+            timings["discovery"] = time.perf_counter() - start
+            if not accounts:
+                print("No accounts found")
+                return False
 
-            # Get all source accounts from 'From' dropdown
-            from_select = self.page.get_by_label("From")
-            source_options = from_select.locator("option").all()
-            
-            success_count = 0
-            fail_count = 0
-            total_transferred = 0
             source_accounts = []
             skipped_accounts = []
-
-            # First pass: collect eligible accounts and check balances
-            for option in source_options:
-                acc_num = option.get_attribute("value")
-                acc_text = option.inner_text()
-                if acc_num and acc_num != source_account:
-                    # Select account to check balance
-                    from_select.select_option(acc_num)
-                    self.wait_for_loading_sign()
-                    
-                    # Get available balance
-                    available_balance = self.page.locator("tr.pvd-table__row:nth-child(2) > td:nth-child(2)").inner_text()
-                    available_balance = float(available_balance.replace("$", "").replace(",", ""))
-                    
-                    if available_balance >= transfer_amount:
-                        source_accounts.append((acc_num, acc_text, available_balance))
-                    else:
-                        skipped_accounts.append((acc_text, available_balance))
+            for acc_num, info in accounts.items():
+                if acc_num == source_account:
+                    continue
+                acc_text = f"{acc_num} ({info['nickname']})" if info["nickname"] else acc_num
+                if info["withdrawal_balance"] >= transfer_amount:
+                    source_accounts.append((acc_num, acc_text, info["withdrawal_balance"]))
+                else:
+                    skipped_accounts.append((acc_text, info["withdrawal_balance"]))
 
             # Show transfer summary and get confirmation
+            start = time.perf_counter()
             print(f"\nTransfer Summary:")
             print(f"To Account: {source_account}")
             print(f"Amount per account: ${transfer_amount:.2f}")
@@ -1258,74 +1845,105 @@ class FidelityAutomation:
                 return False
 
             confirm = input("\nProceed with transfers? (y/n): ")
+            timings["confirmation"] = time.perf_counter() - start
             if confirm.lower() != 'y':
                 print("Transfers cancelled")
                 return False
 
             print("\nProcessing transfers:")
 
-                   # Process each source account
-            for acc_num, acc_text, available_balance in source_accounts:
-                print(f"\nTransferring from account {acc_text}:")
-                
-                try:
-                    # Go back to transfer page for fresh start
-                    self.page.goto(url="https://digital.fidelity.com/ftgw/digital/transfer/?quicktransfer=cash-shares")
-                    self.wait_for_loading_sign()
-                    sleep(3)
-
-                    # Select the source account from 'From' dropdown
-                    from_select = self.page.get_by_label("From")
-                    from_select.select_option(acc_num)
-                    self.wait_for_loading_sign()
-                    sleep(3)
-
-                    # Force click on 'To' dropdown to ensure it's active
-                    to_select = self.page.get_by_label("To", exact=True)
-                    to_select.click()
-                    sleep(2)
-
-                    # Select the destination account
-                    to_select.select_option(source_account)
-                    self.wait_for_loading_sign()
-                    sleep(2)
+            # Sweep
+            start = time.perf_counter()
+            if max_pages > 1:
+                eligible = [acc_num for acc_num, _, _ in source_accounts]
 
-                    # Enter transfer amount
-                    self.page.locator("#transfer-amount").fill(str(transfer_amount))
-                    sleep(1)
+                async def sweep(browser):
+                    return await browser.sweep_to_account(eligible, source_account, transfer_amount, max_pages=max_pages)
 
-                    # Submit transfer
-                    continue_button = self.page.get_by_role("button", name="Continue")
-                    continue_button.click()
-                    self.wait_for_loading_sign()
-                    
-                    submit_button = self.page.get_by_role("button", name="Submit")
-                    submit_button.click()
-                    self.wait_for_loading_sign()
+                results = self.run_async(sweep)
+            else:
+                results = {}
+                for acc_num, acc_text, available_balance in source_accounts:
+                    print(f"\nTransferring from account {acc_text}:")
+                    results[acc_num] = self._submit_transfer_to(acc_num, source_account, transfer_amount)
+            timings["sweep"] = time.perf_counter() - start
 
-                    # Check if transfer was successful
-                    self.page.get_by_text("Request submitted").wait_for(state='visible')
-                    print(f"✓ Success - Transferred ${transfer_amount:.2f}")
-                    success_count += 1
-                    total_transferred += transfer_amount
-                    
-                except Exception as e:
-                    print(f"✗ Failed: {str(e)}")
-                    fail_count += 1
+            success_count = sum(1 for success in results.values() if success)
+            fail_count = len(results) - success_count
+            if success_count > 0:
+                self._invalidate_cache("balances", "positions")
 
             # Print final summary
             print(f"\nFinal Transfer Summary:")
             print(f"Successful transfers: {success_count}")
             print(f"Failed transfers: {fail_count}")
-            print(f"Total amount transferred: ${total_transferred:.2f}")
+            print(f"Total amount transferred: ${success_count * transfer_amount:.2f}")
             
             return fail_count == 0
 
         except Exception as e:
             print(f"An error occurred during transfers: {str(e)}")
             return False
-    
+        finally:
+            if timings:
+                print("\nPhase timings: " + ", ".join(f"{phase} {seconds:.1f}s" for phase, seconds in timings.items()))
+
+    @timed()
+    def _submit_transfer_to(self, from_account: str, to_account: str, transfer_amount: float) -> bool:
+        """
+        Submits one transfer starting from a fresh transfer page. Used by `transfer_from_all_to_source`
+
+        Returns
+        -------
+        bool
+            If the transfer was submitted
+        """
+        try:
+            # Go back to transfer page for fresh start
+            self.page.goto(url="https://digital.fidelity.com/ftgw/digital/transfer/?quicktransfer=cash-shares")
+            self.wait_for_loading_sign(profile="transfer")
+
+            # Select the source account from 'From' dropdown and wait for its balance to replace the last one
+            balance_cell = self.page.locator("tr.pvd-table__row:nth-child(2) > td:nth-child(2)")
+            previous = balance_cell.all_inner_texts()
+            from_select = self.page.get_by_label("From")
+            from_select.select_option(from_account)
+            try:
+                self.wait_for_loading_sign(timeout=5000, profile="transfer_balance", previous=previous[0] if previous else "")
+            except PlaywrightTimeoutError:
+                # Two accounts can have the same balance, then the text never changes
+                self.wait_for_loading_sign()
+
+            # Force click on 'To' dropdown to ensure it's active
+            to_select = self.page.get_by_label("To", exact=True)
+            to_select.click()
+
+            # Select the destination account. The balance shown is still the source account's
+            to_select.select_option(to_account)
+            self.wait_for_loading_sign()
+
+            # Enter transfer amount
+            self.page.locator("#transfer-amount").fill(str(transfer_amount))
+
+            # Submit transfer
+            continue_button = self.page.get_by_role("button", name="Continue")
+            continue_button.click()
+            self.wait_for_loading_sign()
+            
+            submit_button = self.page.get_by_role("button", name="Submit")
+            submit_button.click()
+            self.wait_for_loading_sign()
+
+            # Check if transfer was successful
+            self.page.get_by_text("Request submitted").wait_for(state='visible')
+            print(f"✓ Success - Transferred ${transfer_amount:.2f}")
+            return True
+            
+        except Exception as e:
+            print(f"✗ Failed: {str(e)}")
+            return False
 
+    @timed()
     def enable_pennystock_trading(self, account: str) -> bool:
         """
         Enables penny stock trading for the account given.
@@ -1424,6 +2042,8 @@ class FidelityAutomation:
             except PlaywrightTimeoutError:
                 print(f"Couldn't verify penny stock enabled. Error: {e}")
                 return False
+            if self.cache is not None and self.username is not None:
+                self.cache.mark_enabled(self.username, [account])
             # Return with success
             return True
 
@@ -1431,115 +2051,167 @@ class FidelityAutomation:
             print(f"Error: {e}")
             return False
         
-    def enable_all_pennystock_trading(self) -> bool:
+    @timed()
+    def enable_all_pennystock_trading(self, max_pages: int = 1) -> dict:
         """
         Enables penny stock trading for all eligible accounts shown in the dropdown.
+        Accounts `self.cache` knows are enabled are skipped, and a failed account doesn't stop the others.
+        After the first account, each one starts straight from the account selection page.
+        With max_pages > 1 the accounts are enabled from that many pages of a second browser at the same time.
+        See `AsyncFidelityAutomation.enable_pennystock_trading_for`
 
         NOTE: Use login(save_device=False) when logging in.
         If you do not authenticate with 2FA when creating this session and the device is remembered from a previous
         login, fidelity can attempt to authenticate again which causes this function to fail.
 
+        Parameters
+        ----------
+        max_pages (int)
+            The max number of accounts to work on at the same time
+
         Returns
         -------
-        bool
-            True if all accounts were successfully enabled, False otherwise
+        results (dict)
+            `(Success (bool), Error_message (str))` for each account, keyed by account number.
+            Empty if the account selection page couldn't be reached
         """
+        enabled = set()
+        if self.cache is not None and self.username is not None:
+            enabled = self.cache.load_enabled(self.username)
+        # Nothing to do if every known account is enabled already
+        if self.account_dict and all(account in enabled for account in self.account_dict):
+            print("Penny stock trading is already enabled for every account")
+            return {account: (True, "Already enabled") for account in self.account_dict}
+
+        run = self._begin_journal("enable_all_pennystock_trading")
         try:
-            self.page.wait_for_load_state(state="load")
-            self.page.goto(url="https://digital.fidelity.com/ftgw/digital/portfolio/features")
-            sleep(1)
-            self.page.get_by_label("Manage Penny Stock Trading").click()
-            sleep(1)
-            self.page.wait_for_load_state(state="load", timeout=30000)
-            self.wait_for_loading_sign()
-            sleep(4)
-            self.page.reload()
-        
-            # Wait for and click the Start button
-            startbtn = self.page.get_by_role("button", name="Start")
-            if startbtn:
-                startbtn.wait_for(timeout=15000)
-                startbtn.click()
-            else:
-                pass
-            self.page.reload()
-            self.wait_for_loading_sign()
-            sleep(3)
+            self._open_pennystock_selection()
+            dropdown = self.page.get_by_label("Your eligible accounts")
+            if not dropdown.is_visible():
+                print("Dropdown menu not found")
+                return {}
+            # Get all accounts from dropdown, skipping empty/placeholder options
+            account_numbers = dropdown.locator("option").evaluate_all("options => options.map(option => option.value)")
+            account_numbers = [account_number for account_number in account_numbers if account_number]
+        except Exception as e:
+            print(f"Error: {e}")
+            return {}
+
+        # Leave out what is known to be done. Enabling again is harmless, so unknown outcomes are retried
+        pending = [account_number for account_number in run.pending(account_numbers, retry_unknown=True) if account_number not in enabled]
+
+        if max_pages <= 1:
+            results = {}
+            for account_number in pending:
+                run.intent(account_number)
+                results[account_number] = self._enable_pennystock_for(account_number)
+                run.record(account_number, *results[account_number])
+        else:
+            selection_url = self._pennystock_url
+            async def enable(browser):
+                return await browser.enable_pennystock_trading_for(pending, selection_url, max_pages=max_pages, journal=run)
+
+            results = self.run_async(enable)
+
+        newly_enabled = [account_number for account_number, (success, _) in results.items() if success]
+        if newly_enabled and self.cache is not None and self.username is not None:
+            self.cache.mark_enabled(self.username, newly_enabled)
+        if all(success for success, _ in results.values()):
+            run.finish()
+
+        results = {
+            account_number: results.get(
+                account_number,
+                (True, "Already enabled") if account_number in enabled else run.earlier_outcome(account_number)
+            )
+            for account_number in account_numbers
+        }
+        # Report on every account
+        print(f"\nPenny stock trading: {len(newly_enabled)} enabled, {len(account_numbers) - len(pending)} skipped, "
+              f"{len(pending) - len(newly_enabled)} failed")
+        for account_number, (success, error) in results.items():
+            if not success:
+                print(f"✗ {account_number}: {error}")
+        return results
+
+    def _open_pennystock_selection(self):
+        """
+        Goes from the features page to the penny stock account selection page, pressing Start if it is shown.
+        The url is kept in `self._pennystock_url` so later accounts can go straight there.
+        """
+        self.page.wait_for_load_state(state="load")
+        self.page.goto(url=FEATURES_URL)
+        self.wait_for_loading_sign(profile="features")
+        self.page.get_by_label("Manage Penny Stock Trading").click()
+        self.page.wait_for_load_state(state="load", timeout=30000)
+        self.wait_for_loading_sign(profile="pennystock")
+
+        # Either the Start button or the accounts show up
+        start = self.page.get_by_role("button", name="Start")
+        title = self.page.get_by_role("heading", name="Select an account")
+        start.or_(title).first.wait_for(timeout=30000, state="visible")
+        if start.is_visible():
+            start.click()
+            # The accounts only show after a reload
             self.page.reload()
+            self.wait_for_loading_sign(profile="pennystock")
+        title.wait_for(timeout=30000, state="visible")
+        self._pennystock_url = self.page.url
 
-            # Ensure the page is loaded
-            select_account_title = self.page.get_by_role("heading", name="Select an account")
-            select_account_title.wait_for(timeout=30000, state="visible")
-            self.page.reload()
+    def _enable_pennystock_for(self, account: str) -> tuple:
+        """
+        Enables penny stock trading for one account, starting from the account selection page.
+        Goes back through the features page if the selection page can't be opened directly.
 
-            # Get the dropdown if it exists
-            dropdown = self.page.get_by_label("Your eligible accounts")
-            if dropdown.is_visible():
-                # Get all options from dropdown
-                options = dropdown.locator("option").all()
-                
-                # Enable for each account
-                for option in options:
-                    account_number = option.get_attribute("value")
-                    if not account_number:  # Skip empty/placeholder options
-                        continue
-                    
-                    # Select the account
-                    dropdown.select_option(account_number)
-                    sleep(1)
-                    
-                    # Continue with enabling
-                    self.page.get_by_role("button", name="Continue").click()
-                    self.wait_for_loading_sign(timeout=60000)
-                    
-                    # Wait for terms page
-                    self.page.wait_for_load_state(state="load")
-                    self.wait_for_loading_sign()
-                    
-                    # Verify we're on terms page
-                    if ("https://digital.fidelity.com/ftgw/digital/easy/hrt/pst/termsandconditions" not in self.page.url and 
-                        "https://digital.fidelity.com/ftgw/digital/brokerage-host/psta/TermsAndCondtions" not in self.page.url
-                    ):
-                        print(f"Failed to enable penny stock trading for account {account_number}")
-                        return False
-
-                    # Accept the risks
-                    self.page.query_selector(".pvd-checkbox__label").click()
-                    sleep(1)
-                    self.page.get_by_role("button", name="Submit").click()
-                    sleep(1)
-                    self.wait_for_loading_sign()
-                    self.page.wait_for_load_state(state="load")
-                    self.wait_for_loading_sign()
+        Returns
+        -------
+        (Success (bool), Error_message (str))
+        """
+        try:
+            title = self.page.get_by_role("heading", name="Select an account")
+            if self.page.url != self._pennystock_url or not title.is_visible():
+                try:
+                    self.page.goto(url=self._pennystock_url)
+                    self.wait_for_loading_sign(profile="pennystock")
+                    title.wait_for(timeout=10000, state="visible")
+                except PlaywrightTimeoutError:
+                    self._open_pennystock_selection()
 
-                    # Verify success
-                    try:
-                        success_ribbon = self.page.get_by_text("Your account is now enabled.")
-                        success_ribbon.wait_for(state="visible", timeout=15000)
-                        print(f"Successfully enabled penny stock trading for account {account_number}")
-                    except PlaywrightTimeoutError:
-                        print(f"Could not verify penny stock enabled for account {account_number}")
-                        return False
-
-                    # Go back to features page to enable for next account
-                    self.page.reload()
-                    self.page.goto(url="https://digital.fidelity.com/ftgw/digital/portfolio/features")
-                    self.page.get_by_label("Manage Penny Stock Trading").click()
-                    self.wait_for_loading_sign()
-                    self.page.get_by_role("button", name="Start").click(timeout=15000)
-                    self.page.reload()
-                    self.wait_for_loading_sign()
+            # Checkbox version
+            if self.page.locator("label").filter(has_text=account).is_visible():
+                self.page.locator("label").filter(has_text=account).click()
+            # Dropdown version
+            elif self.page.get_by_label("Your eligible accounts").is_visible():
+                self.page.get_by_label("Your eligible accounts").select_option(account)
+            else:
+                return (False, "Account selection not found")
 
-                return True
+            # Continue with enabling
+            self.page.get_by_role("button", name="Continue").click()
+            self.wait_for_loading_sign(timeout=60000)
+            self.page.wait_for_load_state(state="load")
+            self.wait_for_loading_sign()
+            # Verify we're on terms page
+            if not any(url in self.page.url for url in PENNYSTOCK_TERMS_URLS):
+                return (False, "Terms page not shown")
 
-            else:
-                print("Dropdown menu not found")
-                return False
+            # Accept the risks
+            self.page.query_selector(".pvd-checkbox__label").click()
+            self.page.get_by_role("button", name="Submit").click()
+            self.wait_for_loading_sign()
+            self.page.wait_for_load_state(state="load")
+            self.wait_for_loading_sign()
 
+            # Verify success
+            self.page.get_by_text("Your account is now enabled.").wait_for(state="visible", timeout=15000)
+            print(f"Successfully enabled penny stock trading for account {account}")
+            return (True, None)
+        except PlaywrightTimeoutError as toe:
+            return (False, f"Timed out: {toe}")
         except Exception as e:
-            print(f"Error: {e}")
-            return False
-    
+            return (False, f"Some error occurred: {e}")
+
+    @timed()
     def download_prev_statement(self, date: str):
         """
         Downloads the multi-account statement for the given month.
@@ -1582,28 +2254,36 @@ class FidelityAutomation:
         page1.close()
         return statement
 
-    def wait_for_loading_sign(self, timeout: int = 30000):
+    def wait_for_loading_sign(self, timeout: int = 30000, profile: str = "default", previous: str = None):
         """
-        Waits for known loading signs present in Fidelity by looping through a list of discovered types.
-        Each iteration uses the timeout given.
+        Waits until the page is ready. That is when none of the known loading signs in Fidelity are visible and
+        the readiness profile's condition is met. Everything is checked together in a single wait inside the page
+        so this returns as soon as the page is ready. See `readiness.READINESS_PROFILES`
 
         Parameters
         ----------
         timeout (int)
             The number of milliseconds to wait before throwing a PlaywrightTimeoutError exception
+        profile (str)
+            The name of the readiness profile for the page being waited on
+        previous (str)
+            For profiles that wait for content to change, the text it had before. See `readiness.READINESS_PROFILES`
         """
+        ready_profile = get_readiness_profile(profile)
+        with self.profiler.step(f"wait_for_loading_sign {profile}"):
+            if ready_profile["load_state"] is not None:
+                self.page.wait_for_load_state(state=ready_profile["load_state"], timeout=timeout)
+            self.page.wait_for_function(
+                READY_PREDICATE,
+                arg=ready_predicate_args(ready_profile, previous),
+                timeout=timeout,
+                polling=50
+            )
 
-        # Wait for all kinds of loading signs
-        signs = [self.page.locator("div:nth-child(2) > .loading-spinner-mask-after").first,
-                 self.page.locator(".pvd-spinner__mask-inner").first,
-                 self.page.locator("pvd-loading-spinner").first,
-                ]
-        for sign in signs:
-            sign.wait_for(timeout=timeout, state="hidden")
-
+    @timed()
     def nickname_account(self, account_number: str, nickname: str):
         """
-        Nicknames an account with the provided string.
+        Nicknames an account with the provided string. See `nickname_accounts` to rename several at once.
 
         Parameters
         ----------
@@ -1612,59 +2292,307 @@ class FidelityAutomation:
         nickname (str)
             The nickname to use
         """
+        success, _ = self.nickname_accounts({account_number: nickname})[account_number]
+        return success
+
+    @timed()
+    def nickname_accounts(self, mapping: dict) -> dict:
+        """
+        Nicknames several accounts in one visit to the customize accounts window. The accounts are found from
+        a single read of the window's list rather than checking each entry in turn.
+
+        Parameters
+        ----------
+        mapping (dict)
+            The nickname for each account number. Ex: `{'Z12345678': 'Roth 3'}`
+
+        Returns
+        -------
+        results (dict)
+            `(success, error)` for each account number, in the order given
+        """
+        items = self.page.locator(".custom-modal__accounts-item")
         try:
-            # Get to summary page
+            new_view = self._open_customize_accounts()
+            index = index_account_texts(items.all_inner_texts(), mapping)
+        except Exception as e:
+            print(f"Could not open the customize accounts window: {e}")
+            return {account_number: (False, str(e)) for account_number in mapping}
+
+        results = {}
+        for account_number, nickname in mapping.items():
+            try:
+                # Saving can close the window. Its list is read again in case it changed
+                if not self.page.get_by_text("Display preferences").is_visible():
+                    new_view = self._open_customize_accounts(navigate=False)
+                    index = index_account_texts(items.all_inner_texts(), mapping)
+
+                # Make sure the entry is still this account, the list can change after a rename
+                if account_number in index and account_number not in items.nth(index[account_number]).inner_text():
+                    index = index_account_texts(items.all_inner_texts(), mapping)
+
+                # See if we found something
+                if account_number not in index:
+                    results[account_number] = (False, "Account not found")
+                    continue
+
+                # Click it, then the rename button
+                items.nth(index[account_number]).click()
+                self.page.get_by_role("button", name="Rename").click()
+
+                # Enter the new name
+                if new_view:
+                    self.page.get_by_test_id("ap143528-account-customize-account-input").get_by_role("textbox").fill(nickname)
+                else:
+                    self.page.get_by_label("Accounts", exact=True).get_by_role("textbox").fill(nickname)
+
+                self.page.get_by_role("button", name="save").click()
+                # 2 loading signs follow this
+                self.wait_for_loading_sign()
+                self.wait_for_loading_sign()
+
+                if account_number in self.account_dict:
+                    self.add_nickname_to_account_dict(account_number, nickname, overwrite=True)
+                results[account_number] = (True, None)
+            except Exception as e:
+                results[account_number] = (False, str(e))
+
+        renamed = [account_number for account_number, (success, _) in results.items() if success]
+        if renamed:
+            self._invalidate_cache("accounts", "positions")
+
+        # Report on every account
+        if len(mapping) > 1:
+            print(f"\nNicknames: {len(renamed)} of {len(mapping)} renamed")
+        for account_number, (success, error) in results.items():
+            if not success:
+                print(f"✗ {account_number}: {error}")
+        return results
+
+    def _open_customize_accounts(self, navigate: bool = True) -> bool:
+        """
+        Opens the customize accounts window on the summary page.
+
+        Parameters
+        ----------
+        navigate (bool)
+            Go to the summary page first. Not needed if already there
+
+        Returns
+        -------
+        new_view (bool)
+            If the newer layout of the window is shown
+        """
+        # Get to summary page
+        if navigate:
             self.page.wait_for_load_state(state='load')
             self.page.goto(url="https://digital.fidelity.com/ftgw/digital/portfolio/summary")
             self.wait_for_loading_sign()
 
-            # Wait for customize button
-            self.page.get_by_label("Customize Accounts", exact=True).wait_for(state='visible')
-            new_view = False
-
-            # Check for newer customize button
-            if self.page.get_by_test_id("ap143528-account-customize-open-button").get_by_label("Customize Accounts").is_visible():
-                # New view detected
-                new_view = True
-            # Click customize button
-            self.page.get_by_label("Customize Accounts", exact=True).click()
-            self.page.get_by_text("Display preferences").wait_for(state='visible')
-
-            entries = self.page.locator(".custom-modal__accounts-item").first.wait_for(state='visible')
-            entries = self.page.locator(".custom-modal__accounts-item").all()
-            selected_entry = None
-            for item in entries:
-                if account_number in item.inner_text():
-                    selected_entry = item
-                    break
+        # Wait for customize button
+        self.page.get_by_label("Customize Accounts", exact=True).wait_for(state='visible')
 
-            # See if we found something
-            if selected_entry is None:
-                return False
+        # Check for newer customize button
+        new_view = self.page.get_by_test_id("ap143528-account-customize-open-button").get_by_label("Customize Accounts").is_visible()
 
-            # Click it
-            selected_entry.click()
+        # Click customize button
+        self.page.get_by_label("Customize Accounts", exact=True).click()
+        self.page.get_by_text("Display preferences").wait_for(state='visible')
+        self.page.locator(".custom-modal__accounts-item").first.wait_for(state='visible')
+        return new_view
 
-            # Click the rename button
-            self.page.get_by_role("button", name="Rename").click()
 
-            # Enter the new name
-            if new_view:
-                self.page.get_by_test_id("ap143528-account-customize-account-input").get_by_role("textbox").fill(nickname)
-            else:
-                self.page.get_by_label("Accounts", exact=True).get_by_role("textbox").fill(nickname)
+def index_account_texts(texts: list, account_numbers) -> dict:
+    """
+    Finds which of a list of texts (Ex: the entries of the customize accounts window) each account number is in.
 
-            self.page.get_by_role("button", name="save").click()
-            # 2 loading signs follow this
-            self.wait_for_loading_sign()
-            self.wait_for_loading_sign()
+    Returns
+    -------
+    index (dict)
+        The position of the first text holding each account number that was found
+    """
+    index = {}
+    for account_number in account_numbers:
+        for position, text in enumerate(texts):
+            if account_number in text:
+                index[account_number] = position
+                break
+    return index
 
-            return True
+def parse_account_option(text: str):
+    """
+    Finds the account number and nickname in the text of a dropdown option. Ex: `Individual (Z12345678)`
 
-        except Exception as e:
-            print(e)
-            return False
+    Returns
+    -------
+    (account_number (str), nickname (str))
+        Either will be None if not found
+    """
+    # This regex matches a string of numbers starting with a Z or a digit that
+    # has a '(' in front of it and a ')' at the end. Must have at least 6 digits after the
+    # Z or first digit.
+    account_number = re.search(r'(?<=\()(Z|\d)\d{6,}(?=\))', text)
+    nickname = re.search(r'^.+?(?=\()', text)
+    return (
+        account_number.group(0) if account_number else None,
+        nickname.group(0) if nickname else None
+    )
+
+def extract_account_payload(payload) -> dict:
+    """
+    Searches a JSON payload from fidelity for account entries. Any object with a field holding an account number
+    is treated as an account. Its nickname and withdrawal balance are taken from the fields with likely names,
+    looking into nested objects (that aren't accounts themselves) for the balance. The names are guesses that
+    haven't been checked against fidelity's real payload, so don't move money based on these alone.
+
+    Returns
+    -------
+    accounts (dict)
+        Keyed by account number. Each entry has 'nickname' (str) and 'withdrawal_balance' (float), either can be None
+        ```
+        {
+            'Z12345678': {'nickname': 'Individual', 'withdrawal_balance': 100.0}
+        }
+        ```
+    """
+    accounts = {}
+    # Walk the payload without recursion since these can be deeply nested
+    stack = [payload]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, list):
+            stack.extend(item)
+            continue
+        if not isinstance(item, dict):
+            continue
+
+        stack.extend(value for value in item.values() if isinstance(value, (dict, list)))
+        account_number = _find_account_number(item)
+        if account_number is None:
+            continue
+
+        entry = accounts.setdefault(account_number, {"nickname": None, "withdrawal_balance": None})
+        for key, value in item.items():
+            if key.lower() in ACCOUNT_NICKNAME_KEYS and isinstance(value, str):
+                entry["nickname"] = value
+                break
+        withdrawal_balance = _find_withdrawal_balance(item)
+        if withdrawal_balance is not None:
+            entry["withdrawal_balance"] = withdrawal_balance
+
+    return accounts
+
+def find_new_account_number(payloads: list, text: str = None, known: set = None) -> str:
+    """
+    Finds the number of a just opened account. The confirmation text is checked first (Ex: `Your account number
+    is Z12345678`), then the JSON responses fidelity sent while opening it.
+
+    Parameters
+    ----------
+    payloads (list)
+        The JSON responses
+    text (str)
+        The text of the confirmation page
+    known (set)
+        Every account number that existed before opening, from the transfer dropdown. The responses are only
+        searched when this is given, since without a complete list an existing account could be taken as new
+
+    Returns
+    -------
+    account_number (str)
+        None if it wasn't found, or the responses held more than one account that isn't known
+    """
+    if text:
+        match = NEW_ACCOUNT_TEXT_PATTERN.search(text)
+        if match and (known is None or match.group(1) not in known):
+            return match.group(1)
+    if known is None:
+        return None
+
+    candidates = set()
+    for payload in payloads:
+        candidates.update(account_number for account_number in extract_account_payload(payload) if account_number not in known)
+    if len(candidates) == 1:
+        return candidates.pop()
+    return None
+
+def complete_network_balances(network_accounts: dict, options: list) -> dict:
+    """
+    Checks that the accounts found in the JSON responses have a withdrawal balance for every account in the
+    transfer dropdown. If any is missing, the JSON is likely not the payload the balances should come from,
+    so none of its balances are trusted and every balance has to be read from the page.
+
+    Parameters
+    ----------
+    network_accounts (dict)
+        See `extract_account_payload`
+    options (list)
+        [value, text] of each dropdown option
+
+    Returns
+    -------
+    network_accounts (dict)
+        The given accounts, or an empty dict if they don't cover every account
+    """
+    for _, option_text in options:
+        account_number, nickname = parse_account_option(option_text)
+        if account_number and nickname and network_accounts.get(account_number, {}).get("withdrawal_balance") is None:
+            return {}
+    return network_accounts
+
+def _find_account_number(item: dict):
+    """Returns the account number field of a JSON object, None if it doesn't have one"""
+    for key, value in item.items():
+        if key.lower() in ACCOUNT_NUMBER_KEYS and isinstance(value, str) and ACCOUNT_NUMBER_PATTERN.match(value):
+            return value
+    return None
+
+def _find_withdrawal_balance(item: dict, depth: int = 3):
+    """
+    Returns the first field with 'withdraw' in its name that holds a number. Nested objects are searched
+    up to `depth` levels, skipping any that belong to another account.
+    """
+    nested = []
+    for key, value in item.items():
+        if isinstance(value, dict):
+            nested.append(value)
+        elif isinstance(value, list):
+            nested.extend(entry for entry in value if isinstance(entry, dict))
+        elif "withdraw" in key.lower() and value is not None and not isinstance(value, bool):
+            try:
+                return parse_balance(str(value))
+            except ValueError:
+                pass
+    if depth > 0:
+        for value in nested:
+            if _find_account_number(value) is None:
+                withdrawal_balance = _find_withdrawal_balance(value, depth - 1)
+                if withdrawal_balance is not None:
+                    return withdrawal_balance
+    return None
+
+def parse_balance(text: str) -> float:
+    """
+    Converts a dollar amount shown on the page to a float. Ex: `$1,234.56` -> 1234.56
+    """
+    return float(text.replace("$", "").replace(",", ""))
+
+def clean_error_message(error_message: str) -> str:
+    """
+    Trims down an error message from an order popup. They contain many repeated spaces,
+    newlines and the word 'critical'.
+    """
+    filtered_error = ""
+    for i, character in enumerate(error_message):
+        if (
+            (character == " " and error_message[i - 1] == " ")
+            or character == "\n"
+            or character == "\t"
+        ):
+            continue
+        filtered_error += character
 
+    return filtered_error.replace("critical", "").strip().replace("\n", "")
 
 def create_stock_dict(ticker: str, quantity: float, last_price: float, value: float, stock_list: list = None):
     """
@@ -1687,6 +2615,22 @@ def create_stock_dict(ticker: str, quantity: float, last_price: float, value: fl
         stock_list.append(stock_dict)
     return stock_dict
 
+def to_positions(stocks: list) -> list:
+    """
+    Converts a list of stocks (`Position` or dictionaries) to a list of `Position`.
+    Dictionaries are checked with `validate_stocks` first.
+
+    Returns
+    -------
+    positions (list)
+        The list of `Position`. None if any dictionary is invalid
+    """
+    if all(isinstance(stock, Position) for stock in stocks):
+        return list(stocks)
+    if not validate_stocks([stock for stock in stocks if not isinstance(stock, Position)]):
+        return None
+    return [Position.from_dict(stock) for stock in stocks]
+
 def validate_stocks(stocks: list):
     """
     Checks a list of stocks (which are dictionaries) for valid fields
@@ -0,0 +1,1722 @@
+import os
+import traceback
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pyotp
+
+from playwright.async_api import async_playwright, Page, TimeoutError as PlaywrightTimeoutError
+from playwright_stealth import StealthConfig, stealth_async
+
+from fidelityAPI import (
+    FidelityAccountData,
+    ACCOUNT_API_PATTERN,
+    ACCOUNT_OPENING_PATTERN,
+    FEATURES_URL,
+    PENNYSTOCK_TERMS_URLS,
+    extract_account_payload,
+    complete_network_balances,
+    find_new_account_number,
+    index_account_texts,
+    parse_account_option,
+    parse_balance,
+    clean_error_message,
+)
+from readiness import READY_PREDICATE, get_readiness_profile, ready_predicate_args
+from portfolio import PortfolioIndex
+from session_manager import write_private_json
+from resource_blocking import ResourceBlocker
+from orders import plan_orders, new_order_result
+from quote_cache import QuoteCache
+from balance_ledger import BalanceLedger
+from operation_journal import JournalRun
+from profiling import Profiler, timed
+
+
+class AsyncFidelityAutomation(FidelityAccountData):
+    """
+    An asyncio version of `FidelityAutomation` built on `playwright.async_api`.
+    Every browser method is awaitable and accepts an optional `page` so many pages of the same
+    logged in context can be driven at once from one event loop.
+
+    The driver is not started when the class is created. Use `await start()` or `async with`:
+    ```
+    async with AsyncFidelityAutomation(headless=True) as browser:
+        await browser.login(username, password, totp_secret)
+        page = await browser.new_page()
+        await browser.transaction("AAPL", 1, "buy", "Z12345678", page=page)
+    ```
+
+    Parameters
+    ----------
+    headless (bool)
+        If False the browser will be headless.
+    debug (bool)
+        If the driver should print debug info.
+    title (str)
+        The title of this session. Used for cookies file is present.
+    source_account (str)
+        Account to use as the "From" account for transfers.
+    save_state (bool)
+        Determine whether to save cookies in a json file.
+    profile_path (str)
+        Path used to store browser session data.
+    storage_state (dict)
+        Storage state to start the context with. Overrides the cookies file. Used to continue a session
+        that was logged in somewhere else, like a `FidelityAutomation` instance.
+    block_resources (str)
+        What to keep pages from loading. See `FidelityAutomation`
+    quote_cache (QuoteCache)
+        Last prices shared between orders. A new one is made if not given.
+    profiler (Profiler)
+        Where the time of each step, wait and page load is recorded. A new one is made if not given.
+    """
+
+    def __init__(self, headless: bool = True, debug: bool = False, title: str = None, source_account: str = None, save_state: bool = True, profile_path: str = ".", storage_state: dict = None, block_resources: str = "none", quote_cache: QuoteCache = None, profiler: Profiler = None) -> None:
+        """
+        Setup the class. The driver is created by `start`
+        """
+        self.headless: bool = headless
+        self.title: str = title
+        self.save_state: bool = save_state
+        self.debug = debug
+        self.profile_path: str = profile_path
+        self.storage_state: dict = storage_state
+        self.resource_blocker: ResourceBlocker = ResourceBlocker(block_resources)
+        self.profiler: Profiler = profiler if profiler is not None else Profiler()
+        self.stealth_config = StealthConfig(
+            navigator_languages=False,
+            navigator_user_agent=False,
+            navigator_vendor=False,
+        )
+        self.playwright = None
+        self.browser = None
+        self.context = None
+        self.page: Page = None
+        # Some class variables
+        self.account_dict: dict = {}
+        self.portfolio: PortfolioIndex = PortfolioIndex()
+        self.source_account = source_account
+        self.new_account_number = None
+        # The order ticket left on each page by `transaction`. See reuse_ticket
+        self._tickets: dict = {}
+        # The async class doesn't use the account cache
+        self.cache = None
+        self.quotes: QuoteCache = quote_cache if quote_cache is not None else QuoteCache()
+        self.username: str = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close_browser()
+
+    async def start(self):
+        """
+        Starts the driver. See `getDriver`
+
+        Returns
+        -------
+        self
+        """
+        await self.getDriver()
+        return self
+
+    async def getDriver(self):
+        """
+        Initializes the async playwright webdriver for use in subsequent functions.
+        Creates and applies stealth settings to the first page.
+        If self.save_state is set to True, create a storage path for cookies and data
+
+        Returns
+        -------
+        None
+        """
+        self.playwright = await async_playwright().start()
+
+        # Create or load cookies if save_state is set
+        if self.save_state:
+            self.profile_path = os.path.abspath(self.profile_path)
+            if self.title is not None:
+                self.profile_path = os.path.join(
+                    self.profile_path, f"Fidelity_{self.title}.json"
+                )
+            else:
+                self.profile_path = os.path.join(self.profile_path, "Fidelity.json")
+            if not os.path.exists(self.profile_path):
+                os.makedirs(os.path.dirname(self.profile_path), exist_ok=True)
+                write_private_json(self.profile_path, {})
+
+        # Launch the browser
+        self.browser = await self.playwright.firefox.launch(
+            headless=self.headless,
+            args=["--disable-webgl", "--disable-software-rasterizer"],
+        )
+
+        # A given storage state wins over the cookies file
+        if self.storage_state is not None:
+            storage_state = self.storage_state
+        elif self.save_state and self.title is not None:
+            storage_state = self.profile_path
+        else:
+            storage_state = None
+        self.context = await self.browser.new_context(storage_state=storage_state)
+
+        # Skip what the pages don't need to work
+        await self.resource_blocker.install_async(self.context)
+        # Time page loads
+        self.profiler.watch_navigations(self.context)
+
+        # Take screenshots on actions
+        if self.debug:
+            await self.context.tracing.start(name="fidelity_trace", screenshots=True, snapshots=True)
+
+        self.page = await self.new_page()
+
+    async def new_page(self) -> Page:
+        """
+        Opens a new page in the logged in context with stealth settings applied.
+        Use this to get extra pages to run methods on at the same time.
+
+        Returns
+        -------
+        page (Page)
+        """
+        page = await self.context.new_page()
+        await stealth_async(page, self.stealth_config)
+        return page
+
+    async def save_storage_state(self):
+        """
+        Saves the storage state of the browser to a file.
+        This will do nothing if the class object was initialized with save_state=False
+        """
+        if self.save_state:
+            storage_state = await self.context.storage_state()
+            write_private_json(self.profile_path, storage_state)
+
+    async def close_browser(self):
+        """
+        Closes the playwright browser.
+        Use when you are completely done with this class.
+        """
+        if self.playwright is None:
+            return
+        await self.save_storage_state()
+        if self.debug:
+            print(self.resource_blocker.summary())
+            print(f"Quote cache: {self.quotes.stats['hits']} hits, {self.quotes.stats['misses']} misses")
+            print(self.profiler.summary())
+            await self.context.tracing.stop(path=f"./fidelity_trace{self._file_suffix()}.zip")
+        await self.context.close()
+        await self.browser.close()
+        await self.playwright.stop()
+        self.playwright = None
+
+    async def wait_for_loading_sign(self, timeout: int = 30000, profile: str = "default", page: Page = None, previous: str = None):
+        """
+        Waits until the page is ready. See `FidelityAutomation.wait_for_loading_sign`
+
+        Parameters
+        ----------
+        timeout (int)
+            The number of milliseconds to wait before throwing a PlaywrightTimeoutError exception
+        profile (str)
+            The name of the readiness profile for the page being waited on
+        page (Page)
+            The page to wait on. Defaults to `self.page`
+        previous (str)
+            For profiles that wait for content to change, the text it had before
+        """
+        page = page or self.page
+        ready_profile = get_readiness_profile(profile)
+        with self.profiler.step(f"wait_for_loading_sign {profile}"):
+            if ready_profile["load_state"] is not None:
+                await page.wait_for_load_state(state=ready_profile["load_state"], timeout=timeout)
+            await page.wait_for_function(
+                READY_PREDICATE,
+                arg=ready_predicate_args(ready_profile, previous),
+                timeout=timeout,
+                polling=50
+            )
+
+    @timed()
+    async def login(self, username: str, password: str, totp_secret: str = None, save_device: bool = True) -> bool:
+        """
+        Logs into fidelity using the supplied username and password. See `FidelityAutomation.login`
+
+        Returns
+        -------
+        True, True
+            If completely logged in
+
+        True, False
+            If 2FA is needed. Call login_2FA with the code sent by text.
+
+        False, False
+            Initial login attempt failed.
+        """
+        self.username = username
+        page = self.page
+        # Let the login page's own scripts load
+        resource_profile = self.resource_blocker.profile
+        if self.resource_blocker.profile != "none":
+            self.resource_blocker.profile = "login"
+        try:
+            await page.goto(url="https://digital.fidelity.com/prgw/digital/login/full-page")
+
+            # Login page
+            await page.get_by_label("Username", exact=True).click()
+            await page.get_by_label("Username", exact=True).fill(username)
+            await page.get_by_label("Password", exact=True).click()
+            await page.get_by_label("Password", exact=True).fill(password)
+            await page.get_by_role("button", name="Log in").click()
+
+            # The first spinner goes away then another one appears
+            await self.wait_for_loading_sign(profile="login")
+
+            if "summary" in page.url:
+                return (True, True)
+
+            # Check to see if TOTP secret is blank or "NA"
+            totp_secret = None if totp_secret == "NA" else totp_secret
+
+            # If we hit the 2fA page after trying to login
+            if "login" in page.url:
+                await self.wait_for_loading_sign()
+                widget = page.locator("#dom-widget div").first
+                await widget.wait_for(timeout=5000, state='visible')
+                if (totp_secret is not None and
+                    await page.get_by_role("heading", name="Enter the code from your").is_visible()
+                ):
+                    code = pyotp.TOTP(totp_secret).now()
+                    await page.get_by_placeholder("XXXXXX").click()
+                    await page.get_by_placeholder("XXXXXX").fill(code)
+
+                    # Prevent future OTP requirements
+                    if save_device:
+                        await self._check_save_device(page)
+
+                    await page.get_by_role("button", name="Continue").click()
+                    await self.wait_for_loading_sign()
+                    await page.wait_for_url(
+                        "https://digital.fidelity.com/ftgw/digital/portfolio/summary",
+                        timeout=20000,
+                    )
+                    return (True, True)
+
+                # If the authenticator code is the only way but we don't have the secret, return error
+                if await page.get_by_text(
+                    "Enter the code from your authenticator app This security code will confirm the"
+                ).is_visible():
+                    raise Exception(
+                        "Fidelity needs code from authenticator app but TOTP secret is not provided"
+                    )
+
+                # If the app push notification page is present
+                if await page.get_by_role("link", name="Try another way").is_visible():
+                    if save_device:
+                        await self._check_save_device(page)
+                    await page.get_by_role("link", name="Try another way").click()
+
+                # Press the Text me button
+                await page.get_by_role("button", name="Text me the code").click()
+                await page.get_by_placeholder("XXXXXX").click()
+
+                return (True, False)
+
+            raise Exception("Cannot get to login page. Maybe other 2FA method present")
+
+        except PlaywrightTimeoutError:
+            print("Timeout waiting for login page to load or navigate.")
+            return (False, False)
+        except Exception as e:
+            print(f"An error occurred: {str(e)}")
+            traceback.print_exc()
+            return (False, False)
+        finally:
+            self.resource_blocker.profile = resource_profile
+
+    @timed()
+    async def login_2FA(self, code: str, save_device: bool = True):
+        """
+        Completes the 2FA portion of the login using a phone text code. See `FidelityAutomation.login_2FA`
+
+        Returns
+        -------
+        bool
+            If login succeeded
+        """
+        page = self.page
+        # Let the login page's own scripts load
+        resource_profile = self.resource_blocker.profile
+        if self.resource_blocker.profile != "none":
+            self.resource_blocker.profile = "login"
+        try:
+            await page.get_by_placeholder("XXXXXX").fill(code)
+            if save_device:
+                await self._check_save_device(page)
+            await page.get_by_role("button", name="Submit").click()
+            await page.wait_for_url(
+                "https://digital.fidelity.com/ftgw/digital/portfolio/summary",
+                timeout=5000,
+            )
+            return True
+
+        except PlaywrightTimeoutError:
+            print("Timeout waiting for login page to load or navigate.")
+            return False
+        except Exception as e:
+            print(f"An error occurred: {str(e)}")
+            traceback.print_exc()
+            return False
+        finally:
+            self.resource_blocker.profile = resource_profile
+
+    async def _check_save_device(self, page: Page):
+        """Checks the 'Don't ask me again on this device' box"""
+        await page.locator("label").filter(has_text="Don't ask me again on this").check()
+        if not await page.locator("label").filter(has_text="Don't ask me again on this").is_checked():
+            raise Exception("Cannot check 'Don't ask me again on this device' box")
+
+    @timed()
+    async def get_list_of_accounts(self, set_flag: bool = True, get_withdrawal_bal: bool = False, use_network: bool = False, page: Page = None):
+        """
+        Uses the transfers page's dropdown to obtain the list of accounts.
+        See `FidelityAutomation.get_list_of_accounts`
+
+        Returns
+        -------
+        account_dict
+            A dictionary of the account information using account numbers as keys.
+        """
+        page = page or self.page
+        responses = []
+        def capture(response):
+            if ("json" in response.headers.get("content-type", "") and
+                ACCOUNT_API_PATTERN.search(response.url)
+            ):
+                responses.append(response)
+        listening = get_withdrawal_bal and use_network
+        if listening:
+            page.on("response", capture)
+
+        try:
+            await page.goto(url="https://digital.fidelity.com/ftgw/digital/transfer/?quicktransfer=cash-shares")
+            await self.wait_for_loading_sign(profile="transfer", page=page)
+
+            network_accounts = {}
+            if listening:
+                page.remove_listener("response", capture)
+                listening = False
+                for response in responses:
+                    try:
+                        network_accounts.update(extract_account_payload(await response.json()))
+                    except Exception:
+                        continue
+
+            from_select = page.get_by_label("From")
+            options = await from_select.locator("option").evaluate_all(
+                "options => options.map(option => [option.value, option.innerText])"
+            )
+
+            # The balances in the JSON are only used if it has one for every account
+            if get_withdrawal_bal:
+                network_accounts = complete_network_balances(network_accounts, options)
+
+            local_dict = {}
+            for option_value, option_text in options:
+                account_number, nickname = parse_account_option(option_text)
+                with_bal = None
+                if not (account_number and nickname):
+                    continue
+
+                if get_withdrawal_bal:
+                    with_bal = network_accounts.get(account_number, {}).get("withdrawal_balance")
+                if get_withdrawal_bal and with_bal is None:
+                    await from_select.select_option(option_value)
+                    # Wait for balance info to update. This is very fast but there is a delay
+                    await page.wait_for_timeout(100)
+                    with_bal = parse_balance(await page.locator("tr.pvd-table__row:nth-child(2) > td:nth-child(2)").inner_text())
+
+                if set_flag:
+                    if not self.set_account_dict(
+                        account_num=account_number,
+                        nickname=nickname,
+                        withdrawal_balance=with_bal if with_bal is not None else 0.0
+                    ):
+                        self.add_withdrawal_bal_to_account_dict(
+                            account_num=account_number,
+                            withdrawal_balance=with_bal if with_bal is not None else 0.0,
+                            overwrite=True
+                        )
+                        self.add_nickname_to_account_dict(
+                            account_num=account_number,
+                            nickname=nickname,
+                            overwrite=True
+                        )
+                else:
+                    local_dict[account_number] = {
+                        "balance": 0.0,
+                        "withdrawal_balance": with_bal if with_bal is not None else 0.0,
+                        "nickname": nickname,
+                        "stocks": []
+                    }
+            if not set_flag:
+                return local_dict
+
+            return self.account_dict
+
+        except Exception as e:
+            print(f"An error occurred in get_list_of_accounts: {str(e)}")
+            return None
+        finally:
+            if listening:
+                page.remove_listener("response", capture)
+
+    @timed()
+    async def getAccountInfo(self, page: Page = None):
+        """
+        Gets account numbers, account names, and account totals by downloading the csv of positions
+        from fidelity. See `FidelityAutomation.getAccountInfo`
+
+        Returns
+        -------
+        account_dict (dict)
+        """
+        page = page or self.page
+        await page.goto("https://digital.fidelity.com/ftgw/digital/portfolio/positions")
+        await self.wait_for_loading_sign(page=page)
+
+        # Download the positions as a csv
+        async with page.expect_download() as download_info:
+            await page.get_by_label("Download Positions").click()
+        download = await download_info.value
+        # Stream the rows straight out of playwright's copy of the download
+        self.add_positions_from_csv(await download.path())
+        await download.delete()
+
+        return self.account_dict
+
+    @timed()
+    async def transaction(self, stock: str, quantity: float, action: str, account: str, dry: bool = True, page: Page = None, reuse_ticket: bool = False, limit_price: float = None) -> bool:
+        """
+        Process an order (transaction) using the dedicated trading page.
+        See `FidelityAutomation.transaction`
+
+        Parameters
+        ----------
+        page (Page)
+            The page to place the order on. Defaults to `self.page`.
+            Use a different page for each order being placed at the same time.
+        reuse_ticket (bool)
+            Keep the symbol, action and order type from the last order placed on this page with reuse_ticket=True
+            and only change the account and quantity. Falls back to filling the whole ticket if it changed.
+        limit_price (float)
+            Place a limit order at this price instead of choosing the order type from the last price.
+
+        Returns
+        -------
+        (Success (bool), Error_message (str))
+        """
+        page = page or self.page
+        try:
+            # See if the last ticket on this page can be used as is
+            fast = reuse_ticket and await self._ticket_ready(stock, action, page)
+            if not fast:
+                self._tickets.pop(page, None)
+                if page.url != "https://digital.fidelity.com/ftgw/digital/trade-equity/index/orderEntry":
+                    await page.goto("https://digital.fidelity.com/ftgw/digital/trade-equity/index/orderEntry")
+
+            # Click on the drop down
+            await page.locator("#dest-acct-dropdown").click()
+            if not await page.get_by_role("option").filter(has_text=account.upper()).is_visible():
+                # Rare case where the drop down is empty
+                print("Reloading...")
+                await page.reload()
+                fast = False
+                await page.locator("#dest-acct-dropdown").click()
+            await page.get_by_role("option").filter(has_text=account.upper()).click()
+
+            # Switching accounts can clear the ticket
+            if fast and not await self._ticket_ready(stock, action, page):
+                fast = False
+
+            if fast:
+                ticket = self._tickets[page]
+                extended = ticket["extended"]
+                precision = ticket["precision"]
+                last_price = await self._get_last_price(stock, page)
+            else:
+                # Enter the symbol
+                await page.get_by_label("Symbol").click()
+                await page.get_by_label("Symbol").fill(stock)
+                await page.get_by_label("Symbol").press("Enter")
+
+                # Wait for quote panel to show up
+                await page.locator("#quote-panel").wait_for(timeout=5000)
+                last_price = await self._get_last_price(stock, page)
+
+                # Ensure we are in the expanded ticket
+                if await page.get_by_role("button", name="View expanded ticket").is_visible():
+                    await page.get_by_role("button", name="View expanded ticket").click()
+                    await page.get_by_role("button", name="Calculate shares").wait_for(timeout=5000)
+
+                # Enable extended hours trading if available
+                extended = False
+                precision = 3
+                if await page.get_by_text("Extended hours trading").is_visible():
+                    if await page.get_by_text("Extended hours trading: OffUntil 8:00 PM ET").is_visible():
+                        await page.get_by_text("Extended hours trading: OffUntil 8:00 PM ET").check()
+                    extended = True
+                    precision = 2
+
+                # Press the buy or sell button
+                await page.locator(".eq-ticket-action-label").click()
+                await page.get_by_role("option", name=action.lower().title(), exact=True).wait_for()
+                await page.get_by_role("option", name=action.lower().title(), exact=True).click()
+
+            # Enter the quantity
+            await page.locator("#eqt-mts-stock-quatity div").filter(has_text="Quantity").click()
+            await page.get_by_text("Quantity", exact=True).fill(str(quantity))
+
+            # If it should be limit
+            limit = limit_price is not None or float(last_price) < 1 or extended
+            if limit:
+                difference_price = 0.01 if float(last_price) > 0.1 else 0.0001
+                if limit_price is not None:
+                    wanted_price = limit_price
+                elif action.lower() == "buy":
+                    wanted_price = round(float(last_price) + difference_price, precision)
+                else:
+                    wanted_price = round(float(last_price) - difference_price, precision)
+
+                # The order type is already limit on a reused ticket
+                if not fast or not self._tickets[page]["limit"]:
+                    await page.locator("#dest-dropdownlist-button-ordertype > span:nth-child(1)").click()
+                    await page.get_by_role("option", name="Limit", exact=True).click()
+                await page.get_by_text("Limit price", exact=True).click()
+                await page.get_by_label("Limit price").fill(str(wanted_price))
+            elif not fast or self._tickets[page]["limit"]:
+                await page.locator("#order-type-container-id").click()
+                await page.get_by_role("option", name="Market", exact=True).click()
+
+            # The ticket is set up for this stock and action now
+            self._tickets.pop(page, None)
+            if reuse_ticket:
+                self._tickets[page] = {
+                    "stock": stock.upper(),
+                    "action": action.lower(),
+                    "limit": limit,
+                    "extended": extended,
+                    "precision": precision,
+                }
+
+            # Continue with the order
+            await page.get_by_role("button", name="Preview order").click()
+            await self.wait_for_loading_sign(page=page)
+
+            try:
+                await page.get_by_role("button", name="Place order", exact=False).wait_for(timeout=5000, state="visible")
+            except PlaywrightTimeoutError:
+                # A reused ticket is checked again before the next order, so it's fine to leave it
+                return (False, await self._get_order_error(page))
+
+            # Check the order preview
+            if (not await page.locator("preview").filter(has_text=account.upper()).is_visible()
+                or not await page.get_by_text(f"Symbol{stock.upper()}", exact=True).is_visible()
+                or not await page.get_by_text(f"Action{action.lower().title()}").is_visible()
+                or not await page.get_by_text(f"Quantity{quantity}").is_visible()
+            ):
+                return (False, "Order preview is not what is expected")
+
+            if not dry:
+                return await self.place_previewed_order(page)
+            return (True, None)
+        except PlaywrightTimeoutError as toe:
+            self._tickets.pop(page, None)
+            return (False, f"Driver timed out. Order not complete: {toe}")
+        except Exception as e:
+            self._tickets.pop(page, None)
+            return (False, f"Some error occurred: {e}")
+
+    @timed()
+    async def place_previewed_order(self, page: Page = None):
+        """
+        Places the order whose preview is open on a page. See `FidelityAutomation.place_previewed_order`
+
+        Returns
+        -------
+        (Success (bool), Error_message (str))
+        """
+        page = page or self.page
+        try:
+            await page.get_by_role("button", name="Place order", exact=False).first.click()
+            await self.wait_for_loading_sign(page=page)
+            await page.get_by_text("Order received", exact=True).wait_for(timeout=10000, state="visible")
+            return (True, None)
+        except PlaywrightTimeoutError as toe:
+            return (False, f"Timed out waiting for 'Order received': {toe}")
+        except Exception as e:
+            return (False, f"Some error occurred: {e}")
+
+    @timed()
+    async def batch_orders(self, legs: list, dry: bool = False, confirm=None, max_pages: int = 4) -> list:
+        """
+        Places a batch of orders in two passes across up to `max_pages` pages. See `FidelityAutomation.batch_orders`
+
+        A preview that can still be trusted when the second pass comes is kept open and placed as it is: one
+        with a limit price, or any when `confirm` is None since nothing waits between the passes. Each one
+        kept takes its page out of the first pass and a new page carries on, up to `max_pages` extra pages.
+        The rest are filled in and previewed again before they are placed.
+
+        Returns
+        -------
+        results (list)
+            A dict for each leg, in the order they were run. See `orders.new_order_result`
+        """
+        legs = plan_orders(legs)
+        results = [new_order_result(leg) for leg in legs]
+        if not results:
+            return results
+
+        def keepable(result: dict) -> bool:
+            # A market order's preview goes stale while confirm waits, a limit order's price doesn't
+            return result["previewed"] and (confirm is None or result["leg"].limit is not None)
+
+        # Use the main page plus as many extra as needed
+        pages = [self.page]
+        for _ in range(min(max_pages, len(results)) - 1):
+            pages.append(await self.new_page())
+        # The result whose preview is still open on each page
+        parked = {}
+        # How many more pages can be opened to keep previews on
+        spare = [max_pages]
+
+        async def preview(page: Page, queue: asyncio.Queue):
+            while not queue.empty():
+                result = queue.get_nowait()
+                leg = result["leg"]
+                result["previewed"], result["error"] = await self.transaction(
+                    leg.symbol, leg.quantity, leg.side, leg.account, dry=True, page=page, reuse_ticket=True, limit_price=leg.limit
+                )
+                parked[page] = result if keepable(result) else None
+                # Leave the preview open and go on with a new page
+                if parked[page] is not None and spare[0] > 0 and not queue.empty():
+                    spare[0] -= 1
+                    page = await self.new_page()
+                    pages.append(page)
+
+        async def commit(page: Page, queue: asyncio.Queue):
+            if parked.get(page) is not None:
+                result = parked[page]
+                result["placed"], result["error"] = await self.place_previewed_order(page)
+            while not queue.empty():
+                result = queue.get_nowait()
+                leg = result["leg"]
+                result["placed"], result["error"] = await self.transaction(
+                    leg.symbol, leg.quantity, leg.side, leg.account, dry=False, page=page, reuse_ticket=True, limit_price=leg.limit
+                )
+
+        try:
+            queue = asyncio.Queue()
+            for result in results:
+                queue.put_nowait(result)
+            await asyncio.gather(*(preview(page, queue) for page in list(pages)))
+
+            if dry or not any(result["previewed"] for result in results):
+                return results
+            if confirm is not None and not confirm(results):
+                return results
+
+            # Everything that passed and isn't open on a page is filled in again
+            open_previews = [id(result) for result in parked.values() if result is not None]
+            queue = asyncio.Queue()
+            for result in results:
+                if result["previewed"] and id(result) not in open_previews:
+                    queue.put_nowait(result)
+            await asyncio.gather(*(commit(page, queue) for page in pages))
+        finally:
+            for page in pages[1:]:
+                self._tickets.pop(page, None)
+                await page.close()
+
+        return results
+
+    async def _get_last_price(self, stock: str, page: Page) -> float:
+        """
+        Gets the last price of a stock from `self.quotes`, or reads it off the order ticket on a page.
+        See `FidelityAutomation._get_last_price`
+        """
+        last_price = self.quotes.get(stock)
+        if last_price is None:
+            last_price = parse_balance(await page.locator("#eq-ticket__last-price > span.last-price").text_content())
+            self.quotes.put(stock, last_price)
+        return last_price
+
+    async def _ticket_ready(self, stock: str, action: str, page: Page) -> bool:
+        """
+        Checks if the order ticket on a page still has the symbol and action of the last order placed on it with
+        reuse_ticket=True. See `FidelityAutomation._ticket_ready`
+        """
+        ticket = self._tickets.get(page)
+        if ticket is None or ticket["stock"] != stock.upper() or ticket["action"] != action.lower():
+            return False
+        if page.url != "https://digital.fidelity.com/ftgw/digital/trade-equity/index/orderEntry":
+            return False
+        try:
+            # Leave the preview of the last order
+            edit = page.get_by_role("button", name="Edit order")
+            if await edit.is_visible():
+                await edit.click()
+                await page.get_by_label("Symbol").wait_for(timeout=5000)
+            # Check what the ticket shows
+            return (
+                await page.locator("#quote-panel").is_visible()
+                and (await page.get_by_label("Symbol").input_value(timeout=1000)).strip().upper() == ticket["stock"]
+                and action.lower().title() in (await page.locator(".eq-ticket-action-label").text_content(timeout=1000) or "")
+            )
+        except Exception:
+            # Anything missing or unexpected means a full reset
+            return False
+
+    @timed()
+    async def bulk_transaction(self, stock: str, quantity: float, action: str, accounts: list, dry: bool = True, max_pages: int = 4, journal: JournalRun = None) -> dict:
+        """
+        Places the same order in every account given, spread across up to `max_pages` pages of this context.
+        Each page works through the remaining accounts one at a time.
+
+        Parameters
+        ----------
+        stock (str)
+            The ticker that represents the security to be traded
+        quantity (float)
+            The amount to buy or sell of the security in each account
+        action (str)
+            'buy' or 'sell'
+        accounts (list)
+            The account numbers to trade under
+        dry (bool)
+            True for dry (test) run, False for real run.
+        max_pages (int)
+            The max number of orders to work on at the same time
+        journal (JournalRun)
+            If given, each order's intent and outcome are recorded in it. See `OperationJournal`
+
+        Returns
+        -------
+        results (dict)
+            `(Success (bool), Error_message (str))` from `transaction` for each account, keyed by account number
+            in the same order as `accounts`
+        """
+        journal = journal or JournalRun.disabled()
+        queue = asyncio.Queue()
+        for account in accounts:
+            queue.put_nowait(account)
+        results = {}
+
+        async def worker(page: Page):
+            while not queue.empty():
+                account = queue.get_nowait()
+                journal.intent(account)
+                results[account] = await self.transaction(stock, quantity, action, account, dry=dry, page=page, reuse_ticket=True)
+                journal.record(account, *results[account])
+
+        # Use the main page plus as many extra as needed
+        pages = [self.page]
+        for _ in range(min(max_pages, len(accounts)) - 1):
+            pages.append(await self.new_page())
+        try:
+            await asyncio.gather(*(worker(page) for page in pages))
+        finally:
+            for page in pages[1:]:
+                self._tickets.pop(page, None)
+                await page.close()
+
+        return {account: results[account] for account in accounts}
+
+    async def _get_order_error(self, page: Page) -> str:
+        """
+        Reads the error popup shown after previewing an order. Reloads the page if the popup couldn't be closed.
+        """
+        error_message = ""
+        error_box_closed = False
+        try:
+            error_message = await page.get_by_label("Error").locator("div").filter(has_text="critical").nth(2).text_content(timeout=2000)
+            await page.get_by_role("button", name="Close dialog").click()
+            error_box_closed = True
+        except Exception:
+            pass
+        if error_message == "":
+            try:
+                element = await page.wait_for_selector('.pvd-inline-alert__content font[color="red"]', timeout=2000)
+                error_message = await element.text_content()
+                await page.get_by_role("button", name="Close dialog").click()
+                error_box_closed = True
+            except Exception:
+                pass
+        if not error_box_closed:
+            await page.reload()
+        if error_message != "":
+            return clean_error_message(error_message)
+        return "Could not retrieve error message from popup"
+
+    async def _select_transfer_account(self, page: Page, label: str, account: str, exact: bool = False):
+        """
+        Selects the option containing `account` in the transfer page dropdown with the given label.
+
+        Returns
+        -------
+        value (str)
+            The value of the selected option. None if not found
+        """
+        select = page.get_by_label(label, exact=exact)
+        for option in await select.locator("option").all():
+            if account in await option.inner_text():
+                value = await option.get_attribute("value")
+                await select.select_option(value)
+                await self.wait_for_loading_sign(page=page)
+                return value
+        return None
+
+    async def _submit_transfer(self, page: Page, transfer_amount: float) -> bool:
+        """
+        Enters the amount on the transfer page and submits it.
+
+        Returns
+        -------
+        bool
+            If 'Request submitted' was shown
+        """
+        await page.locator("#transfer-amount").fill(str(transfer_amount))
+        await page.get_by_role("button", name="Continue").click()
+        await self.wait_for_loading_sign(page=page)
+        await page.get_by_role("button", name="Submit").click()
+        await self.wait_for_loading_sign(page=page)
+        try:
+            await page.get_by_text("Request submitted").wait_for(state='visible')
+        except PlaywrightTimeoutError:
+            return False
+        return True
+
+    @timed()
+    async def transfer_acc_to_acc(self, source_account: str, destination_account: str, transfer_amount: float, page: Page = None) -> bool:
+        """
+        Transfers requested amount from source account to destination account.
+        See `FidelityAutomation.transfer_acc_to_acc`
+
+        Returns
+        -------
+        bool
+            True if the transfer was successful, False otherwise.
+        """
+        page = page or self.page
+        try:
+            await page.goto(url="https://digital.fidelity.com/ftgw/digital/transfer/?quicktransfer=cash-shares")
+            await self.wait_for_loading_sign(page=page)
+
+            if await self._select_transfer_account(page, "From", source_account) is None:
+                print(f"Source account {source_account} not found in dropdown")
+                return False
+            if await self._select_transfer_account(page, "To", destination_account, exact=True) is None:
+                print(f"Account {destination_account} not found in 'To' dropdown")
+                return False
+
+            available_balance = parse_balance(await page.locator("tr.pvd-table__row:nth-child(2) > td:nth-child(2)").inner_text())
+            if transfer_amount > available_balance:
+                print(f"Insufficient funds. Available: ${available_balance}, Attempted transfer: ${transfer_amount}")
+                return False
+
+            if not await self._submit_transfer(page, transfer_amount):
+                print("Transfer submission failed")
+                return False
+            return True
+
+        except Exception as e:
+            print(f"An error occurred during the transfer: {str(e)}")
+            return False
+
+    @timed()
+    async def transfer_from_source_to_all_acc(self, source_account: str, transfer_amount: float, page: Page = None, max_pages: int = 1, journal: JournalRun = None) -> bool:
+        """
+        Transfers specified amount from source account to all eligible destination accounts.
+        See `FidelityAutomation.transfer_from_source_to_all_acc`
+
+        With max_pages > 1 the transfers are submitted from that many pages at the same time. A `BalanceLedger`
+        of the source account's available balance is shared by the pages so they can't overdraw it together.
+
+        Parameters
+        ----------
+        page (Page)
+            The page to start on. Defaults to `self.page`
+        max_pages (int)
+            The max number of transfers to work on at the same time
+        journal (JournalRun)
+            If given, each transfer is recorded in it and the accounts it already funded are left out.
+            See `OperationJournal`
+
+        Returns
+        -------
+        bool
+            True if all transfers were successful
+        """
+        page = page or self.page
+        journal = journal or JournalRun.disabled()
+        try:
+            source_value = await self._open_transfer_from(page, source_account)
+            if source_value is None:
+                print(f"Source account {source_account} not found in dropdown")
+                return False
+
+            available_balance = parse_balance(await page.locator("tr.pvd-table__row:nth-child(2) > td:nth-child(2)").inner_text())
+
+            dest_accounts = []
+            for option in await page.get_by_label("To", exact=True).locator("option").all():
+                acc_num = await option.get_attribute("value")
+                if acc_num and acc_num != source_value:
+                    dest_accounts.append((acc_num, await option.inner_text()))
+            # Leave out the accounts funded by an earlier run that didn't finish
+            pending = journal.pending([acc_num for acc_num, _ in dest_accounts])
+            dest_accounts = [(acc_num, acc_text) for acc_num, acc_text in dest_accounts if acc_num in pending]
+
+            total_needed = transfer_amount * len(dest_accounts)
+            if total_needed > available_balance:
+                print(f"Insufficient funds. Need: ${total_needed:.2f}, Available: ${available_balance:.2f}")
+                return False
+
+            ledger = BalanceLedger(available_balance)
+            queue = asyncio.Queue()
+            for dest in dest_accounts:
+                queue.put_nowait(dest)
+            results = {}
+
+            async def worker(worker_page: Page, ready: bool):
+                while not queue.empty():
+                    acc_num, acc_text = queue.get_nowait()
+                    if not ledger.reserve(transfer_amount):
+                        print(f"\n✗ Skipping {acc_text}: not enough left in {source_account}")
+                        results[acc_num] = False
+                        continue
+                    # Nothing has been submitted yet, so a failure here gives the reservation back.
+                    # Errors are kept to this account so they don't cancel the other pages mid-submit
+                    try:
+                        # Every page but the first one starts fresh, and a page has to start over after each transfer
+                        if not ready and await self._open_transfer_from(worker_page, source_account) is None:
+                            raise Exception("Source account not found")
+                        await worker_page.get_by_label("To", exact=True).select_option(acc_num)
+                        await self.wait_for_loading_sign(page=worker_page)
+                    except Exception as e:
+                        ledger.release(transfer_amount)
+                        print(f"\n✗ Failed {acc_text}: {e}")
+                        journal.failed(acc_num, str(e))
+                        results[acc_num] = False
+                        ready = False
+                        continue
+                    journal.intent(acc_num)
+                    try:
+                        success = await self._submit_transfer(worker_page, transfer_amount)
+                    except Exception as e:
+                        print(f"An error occurred during the transfer: {str(e)}")
+                        success = False
+                    # A failure after submitting may have gone through, so only successes get an outcome
+                    if success:
+                        ledger.commit(transfer_amount)
+                        journal.done(acc_num)
+                        print(f"\n✓ Transferred to account {acc_text}")
+                    else:
+                        ledger.release(transfer_amount)
+                        print(f"\n✗ Failed to transfer to account {acc_text}")
+                    results[acc_num] = success
+                    ready = False
+
+            # Use the given page plus as many extra as needed
+            pages = [page]
+            for _ in range(min(max_pages, len(dest_accounts)) - 1):
+                pages.append(await self.new_page())
+            try:
+                await asyncio.gather(*(worker(worker_page, worker_page is page) for worker_page in pages))
+            finally:
+                for extra_page in pages[1:]:
+                    await extra_page.close()
+
+            success_count = sum(1 for success in results.values() if success)
+            fail_count = len(results) - success_count
+            print(f"\nTransfer Summary:")
+            print(f"Successful: {success_count}")
+            print(f"Failed: {fail_count}")
+            print(f"Transferred: ${ledger.committed:.2f} of ${available_balance:.2f} available")
+            return fail_count == 0
+
+        except Exception as e:
+            print(f"An error occurred during transfers: {str(e)}")
+            return False
+
+    async def _open_transfer_from(self, page: Page, source_account: str) -> str:
+        """
+        Loads the transfer page and selects the account to transfer from.
+
+        Returns
+        -------
+        value (str)
+            The value of the source account's option. None if not found
+        """
+        await page.goto(url="https://digital.fidelity.com/ftgw/digital/transfer/?quicktransfer=cash-shares")
+        await self.wait_for_loading_sign(page=page, profile="transfer")
+        return await self._select_transfer_account(page, "From", source_account)
+
+    @timed()
+    async def transfer_from_all_to_source(self, source_account: str, transfer_amount: float, page: Page = None, max_pages: int = 1) -> bool:
+        """
+        Transfers specified amount from every account with enough available balance to the source account.
+        Unlike `FidelityAutomation.transfer_from_all_to_source` this does not ask for confirmation.
+
+        Parameters
+        ----------
+        page (Page)
+            The page to start on. Defaults to `self.page`
+        max_pages (int)
+            The max number of transfers to work on at the same time
+
+        Returns
+        -------
+        bool
+            True if all transfers were successful
+        """
+        page = page or self.page
+        try:
+            accounts = await self.get_list_of_accounts(set_flag=False, get_withdrawal_bal=True, page=page)
+            if accounts is None:
+                return False
+            eligible = [
+                acc_num for acc_num, info in accounts.items()
+                if acc_num != source_account and info["withdrawal_balance"] >= transfer_amount
+            ]
+
+            results = await self.sweep_to_account(eligible, source_account, transfer_amount, page=page, max_pages=max_pages)
+            success_count = sum(1 for success in results.values() if success)
+            fail_count = len(results) - success_count
+
+            print(f"\nFinal Transfer Summary:")
+            print(f"Successful transfers: {success_count}")
+            print(f"Failed transfers: {fail_count}")
+            return fail_count == 0
+
+        except Exception as e:
+            print(f"An error occurred during transfers: {str(e)}")
+            return False
+
+    @timed()
+    async def sweep_to_account(self, from_accounts: list, to_account: str, transfer_amount: float, page: Page = None, max_pages: int = 1) -> dict:
+        """
+        Transfers the same amount from each account given into one account, from up to `max_pages` pages at once.
+        Balances are not checked here, pick the accounts beforehand.
+
+        Parameters
+        ----------
+        from_accounts (list)
+            The account numbers to transfer from
+        to_account (str)
+            The account number to transfer to
+        transfer_amount (float)
+            The amount to transfer from each account
+        page (Page)
+            The page to start on. Defaults to `self.page`
+        max_pages (int)
+            The max number of transfers to work on at the same time
+
+        Returns
+        -------
+        results (dict)
+            If each transfer was submitted, keyed by the account it came from in the same order as `from_accounts`
+        """
+        page = page or self.page
+        queue = asyncio.Queue()
+        for acc_num in from_accounts:
+            queue.put_nowait(acc_num)
+        results = {}
+
+        async def worker(worker_page: Page):
+            while not queue.empty():
+                acc_num = queue.get_nowait()
+                results[acc_num] = await self.transfer_acc_to_acc(acc_num, to_account, transfer_amount, page=worker_page)
+                if results[acc_num]:
+                    print(f"\n✓ Transferred ${transfer_amount:.2f} from account {acc_num}")
+                else:
+                    print(f"\n✗ Failed to transfer from account {acc_num}")
+
+        # Use the given page plus as many extra as needed
+        pages = [page]
+        for _ in range(min(max_pages, len(from_accounts)) - 1):
+            pages.append(await self.new_page())
+        try:
+            await asyncio.gather(*(worker(worker_page) for worker_page in pages))
+        finally:
+            for extra_page in pages[1:]:
+                await extra_page.close()
+
+        return {acc_num: results[acc_num] for acc_num in from_accounts}
+
+    @timed()
+    async def enable_pennystock_trading_for(self, accounts: list, selection_url: str = None, max_pages: int = 4, journal: JournalRun = None) -> dict:
+        """
+        Enables penny stock trading for every account given, spread across up to `max_pages` pages of this context.
+        A failed account doesn't stop the others. See `FidelityAutomation.enable_all_pennystock_trading`
+
+        Parameters
+        ----------
+        accounts (list)
+            The account numbers to enable
+        selection_url (str)
+            The url of the account selection page, if known. Each account starts there instead of going
+            through the features page
+        max_pages (int)
+            The max number of accounts to work on at the same time
+        journal (JournalRun)
+            If given, each account's intent and outcome are recorded in it. See `OperationJournal`
+
+        Returns
+        -------
+        results (dict)
+            `(Success (bool), Error_message (str))` for each account, keyed by account number in the same order as `accounts`
+        """
+        journal = journal or JournalRun.disabled()
+        queue = asyncio.Queue()
+        for account in accounts:
+            queue.put_nowait(account)
+        results = {}
+
+        async def worker(page: Page):
+            while not queue.empty():
+                account = queue.get_nowait()
+                journal.intent(account)
+                results[account] = await self._enable_pennystock_for(account, selection_url, page)
+                journal.record(account, *results[account])
+
+        # Use the main page plus as many extra as needed
+        pages = [self.page]
+        for _ in range(min(max_pages, len(accounts)) - 1):
+            pages.append(await self.new_page())
+        try:
+            await asyncio.gather(*(worker(page) for page in pages))
+        finally:
+            for page in pages[1:]:
+                await page.close()
+
+        return {account: results[account] for account in accounts}
+
+    async def _open_pennystock_selection(self, page: Page) -> str:
+        """
+        Goes from the features page to the penny stock account selection page. See `FidelityAutomation._open_pennystock_selection`
+
+        Returns
+        -------
+        selection_url (str)
+        """
+        await page.goto(url=FEATURES_URL)
+        await self.wait_for_loading_sign(profile="features", page=page)
+        await page.get_by_label("Manage Penny Stock Trading").click()
+        await page.wait_for_load_state(state="load", timeout=30000)
+        await self.wait_for_loading_sign(profile="pennystock", page=page)
+
+        # Either the Start button or the accounts show up
+        start = page.get_by_role("button", name="Start")
+        title = page.get_by_role("heading", name="Select an account")
+        await start.or_(title).first.wait_for(timeout=30000, state="visible")
+        if await start.is_visible():
+            await start.click()
+            # The accounts only show after a reload
+            await page.reload()
+            await self.wait_for_loading_sign(profile="pennystock", page=page)
+        await title.wait_for(timeout=30000, state="visible")
+        return page.url
+
+    async def _enable_pennystock_for(self, account: str, selection_url: str, page: Page) -> tuple:
+        """
+        Enables penny stock trading for one account on the given page. See `FidelityAutomation._enable_pennystock_for`
+
+        Returns
+        -------
+        (Success (bool), Error_message (str))
+        """
+        try:
+            # Go straight to the account selection page if it is known
+            opened = False
+            if selection_url is not None:
+                try:
+                    await page.goto(url=selection_url)
+                    await self.wait_for_loading_sign(profile="pennystock", page=page)
+                    await page.get_by_role("heading", name="Select an account").wait_for(timeout=10000, state="visible")
+                    opened = True
+                except PlaywrightTimeoutError:
+                    pass
+            if not opened:
+                await self._open_pennystock_selection(page)
+
+            # Checkbox version
+            if await page.locator("label").filter(has_text=account).is_visible():
+                await page.locator("label").filter(has_text=account).click()
+            # Dropdown version
+            elif await page.get_by_label("Your eligible accounts").is_visible():
+                await page.get_by_label("Your eligible accounts").select_option(account)
+            else:
+                return (False, "Account selection not found")
+
+            # Continue with enabling
+            await page.get_by_role("button", name="Continue").click()
+            await self.wait_for_loading_sign(timeout=60000, page=page)
+            await page.wait_for_load_state(state="load")
+            await self.wait_for_loading_sign(page=page)
+            # Verify we're on terms page
+            if not any(url in page.url for url in PENNYSTOCK_TERMS_URLS):
+                return (False, "Terms page not shown")
+
+            # Accept the risks
+            await page.locator(".pvd-checkbox__label").first.click()
+            await page.get_by_role("button", name="Submit").click()
+            await self.wait_for_loading_sign(page=page)
+            await page.wait_for_load_state(state="load")
+            await self.wait_for_loading_sign(page=page)
+
+            # Verify success
+            await page.get_by_text("Your account is now enabled.").wait_for(state="visible", timeout=15000)
+            print(f"Successfully enabled penny stock trading for account {account}")
+            return (True, None)
+        except PlaywrightTimeoutError as toe:
+            return (False, f"Timed out: {toe}")
+        except Exception as e:
+            return (False, f"Some error occurred: {e}")
+
+    @timed()
+    async def open_account(self, type: str, page: Page = None, known_accounts: set = None) -> bool:
+        """
+        Opens either a brokerage or roth account. The new account number is stored in `self.new_account_number`
+        and added to `self.account_dict`. See `FidelityAutomation.open_account`
+
+        Parameters
+        ----------
+        type (str)
+            'roth' or 'brokerage'
+        page (Page)
+            The page to use. Defaults to `self.page`
+        known_accounts (set)
+            Every account number that existed before, as listed by the transfer dropdown. It must be complete,
+            since the new account is one that isn't in here. For a brokerage account a fresh list is taken
+            if not given. `self.account_dict` won't do, since accounts without positions can be missing from it
+
+        Returns
+        -------
+        success (bool)
+            If the account was opened and its number found
+        """
+        page = page or self.page
+        self.new_account_number = None
+        if type not in ("roth", "brokerage"):
+            return False
+        try:
+            # A complete list of the accounts from before. Only needed for brokerage accounts, whose
+            # confirmation page may not show the number
+            if known_accounts is None and type == "brokerage":
+                before = await self.get_list_of_accounts(set_flag=False, page=page)
+                if before is None:
+                    print("Could not list the accounts before opening one")
+                    return False
+                known_accounts = set(before)
+
+            if type == "roth":
+                await page.goto(url="https://digital.fidelity.com/ftgw/digital/aox/RothIRAccountOpening/PersonalInformation")
+                await self.wait_for_loading_sign(page=page)
+            else:
+                await page.goto(url="https://digital.fidelity.com/ftgw/digital/aox/BrokerageAccountOpening/JointSelectionPage")
+                await self.wait_for_loading_sign(page=page)
+
+                # First section (This won't be present if an application was already started)
+                if await page.get_by_role("heading", name="Account ownership").is_visible():
+                    await page.get_by_role("button", name="Next").click()
+                    await self.wait_for_loading_sign(page=page)
+                await page.get_by_role("button", name="Next").click()
+                await self.wait_for_loading_sign(page=page)
+
+            # Keep the JSON responses sent while the account is opened
+            responses = []
+            def capture(response):
+                if "json" in response.headers.get("content-type", "") and ACCOUNT_OPENING_PATTERN.search(response.url):
+                    responses.append(response)
+
+            page.on("response", capture)
+            try:
+                # Open account. Can take a while
+                await page.get_by_role("button", name="Open account").click()
+                await self.wait_for_loading_sign(timeout=60000, page=page)
+                if type == "roth":
+                    await page.get_by_role("heading", name="Congratulations, your account").wait_for(state="visible")
+                else:
+                    await page.wait_for_load_state(state="load")
+                    await self.wait_for_loading_sign(page=page)
+            finally:
+                page.remove_listener("response", capture)
+
+            # Read the number from the confirmation page or the responses
+            payloads = []
+            for response in responses:
+                try:
+                    payloads.append(await response.json())
+                except Exception:
+                    pass
+            self.new_account_number = find_new_account_number(payloads, await page.locator("body").inner_text(), known_accounts)
+
+            # Otherwise the new account is the one that wasn't there before
+            if self.new_account_number is None and type == "brokerage":
+                for account_number in await self.get_list_of_accounts(set_flag=False, page=page) or {}:
+                    if account_number not in known_accounts:
+                        self.new_account_number = account_number
+                        break
+
+            if self.new_account_number is None:
+                return False
+            self.set_account_dict(account_num=self.new_account_number)
+            return True
+        except Exception as e:
+            print(f"Error opening {type} account: {e}")
+            return False
+
+    @timed()
+    async def nickname_account(self, account_number: str, nickname: str, page: Page = None) -> bool:
+        """
+        Nicknames an account with the provided string. See `FidelityAutomation.nickname_account`
+
+        Returns
+        -------
+        success (bool)
+        """
+        results = await self.nickname_accounts({account_number: nickname}, page=page)
+        success, error = results[account_number]
+        if not success:
+            print(f"Error nicknaming {account_number}: {error}")
+        return success
+
+    @timed()
+    async def nickname_accounts(self, mapping: dict, page: Page = None) -> dict:
+        """
+        Nicknames several accounts in one visit to the customize accounts window.
+        See `FidelityAutomation.nickname_accounts`
+
+        Returns
+        -------
+        results (dict)
+            `(success, error)` for each account number, in the order given
+        """
+        page = page or self.page
+        items = page.locator(".custom-modal__accounts-item")
+        try:
+            new_view = await self._open_customize_accounts(page)
+            index = index_account_texts(await items.all_inner_texts(), mapping)
+        except Exception as e:
+            return {account_number: (False, str(e)) for account_number in mapping}
+
+        results = {}
+        for account_number, nickname in mapping.items():
+            try:
+                # Saving can close the window. Its list is read again in case it changed
+                if not await page.get_by_text("Display preferences").is_visible():
+                    new_view = await self._open_customize_accounts(page, navigate=False)
+                    index = index_account_texts(await items.all_inner_texts(), mapping)
+                # Make sure the entry is still this account, the list can change after a rename
+                if account_number in index and account_number not in await items.nth(index[account_number]).inner_text():
+                    index = index_account_texts(await items.all_inner_texts(), mapping)
+                if account_number not in index:
+                    results[account_number] = (False, "Account not found")
+                    continue
+
+                # Rename it
+                await items.nth(index[account_number]).click()
+                await page.get_by_role("button", name="Rename").click()
+                if new_view:
+                    await page.get_by_test_id("ap143528-account-customize-account-input").get_by_role("textbox").fill(nickname)
+                else:
+                    await page.get_by_label("Accounts", exact=True).get_by_role("textbox").fill(nickname)
+                await page.get_by_role("button", name="save").click()
+                # 2 loading signs follow this
+                await self.wait_for_loading_sign(page=page)
+                await self.wait_for_loading_sign(page=page)
+
+                if account_number in self.account_dict:
+                    self.add_nickname_to_account_dict(account_number, nickname, overwrite=True)
+                results[account_number] = (True, None)
+            except Exception as e:
+                results[account_number] = (False, str(e))
+        return results
+
+    async def _open_customize_accounts(self, page: Page, navigate: bool = True) -> bool:
+        """
+        Opens the customize accounts window on the summary page. See `FidelityAutomation._open_customize_accounts`
+
+        Returns
+        -------
+        new_view (bool)
+            If the newer layout of the window is shown
+        """
+        if navigate:
+            await page.goto(url="https://digital.fidelity.com/ftgw/digital/portfolio/summary")
+            await self.wait_for_loading_sign(page=page)
+        await page.get_by_label("Customize Accounts", exact=True).wait_for(state="visible")
+        new_view = await page.get_by_test_id("ap143528-account-customize-open-button").get_by_label("Customize Accounts").is_visible()
+        await page.get_by_label("Customize Accounts", exact=True).click()
+        await page.get_by_text("Display preferences").wait_for(state="visible")
+        await page.locator(".custom-modal__accounts-item").first.wait_for(state="visible")
+        return new_view
+
+    @timed()
+    async def provision_accounts(self, type: str, count: int, transfer_amount: float = None, source_account: str = None, nicknames: list = None, known_accounts: set = None) -> list:
+        """
+        Opens `count` new accounts and sets each one up: funds it from the source account, enables penny stock
+        trading and nicknames it. Each stage runs on its own page and hands the account on to the next, so one
+        account is being opened while the one before it is being funded, and so on.
+
+        Parameters
+        ----------
+        type (str)
+            'roth' or 'brokerage'
+        count (int)
+            How many accounts to open
+        transfer_amount (float)
+            How much to move into each new account. None or 0 skips funding
+        source_account (str)
+            The account to fund from. Defaults to `self.source_account`
+        nicknames (list)
+            The nickname for each new account in the order they are opened. None skips nicknaming
+        known_accounts (set)
+            Every account number there is now. See `open_account`. Listed from the transfer dropdown if not given
+
+        Returns
+        -------
+        results (list)
+            One dict per account opening that was tried, in order
+            ```
+            {
+                'account': str: The new account number. None if it couldn't be opened
+                'opened': bool
+                'funded': bool: None if funding was skipped
+                'enabled': bool
+                'nicknamed': bool: None if nicknaming was skipped
+                'timings': dict: Seconds spent in each stage. Ex: {'open': 40.1, 'fund': 6.2}
+            }
+            ```
+        """
+        source_account = source_account or self.source_account
+        fund = bool(transfer_amount) and source_account is not None
+        if transfer_amount and source_account is None:
+            print("No source account given, new accounts won't be funded")
+        results = []
+        # Every account there is now, from the transfer dropdown. Accounts opened here are added as they
+        # open, so one listing serves every opening
+        if known_accounts is None:
+            before = await self.get_list_of_accounts(set_flag=False)
+            if before is None:
+                print("Could not list the accounts before opening any")
+                return results
+            known_accounts = set(before)
+        else:
+            known_accounts = set(known_accounts)
+
+        async def timed_stage(result: dict, stage: str, work):
+            start = asyncio.get_running_loop().time()
+            try:
+                return await work
+            finally:
+                result["timings"][stage] = asyncio.get_running_loop().time() - start
+
+        async def opener(page: Page, out: asyncio.Queue):
+            # Nicknames go to the accounts that opened, in order
+            opened = 0
+            for i in range(count):
+                result = {"account": None, "opened": False, "funded": None, "enabled": False, "nicknamed": None, "timings": {}}
+                results.append(result)
+                print(f"\nOpening {type} account {i + 1} of {count}...")
+                if await timed_stage(result, "open", self.open_account(type, page=page, known_accounts=known_accounts)):
+                    result["opened"] = True
+                    result["account"] = self.new_account_number
+                    known_accounts.add(self.new_account_number)
+                    print(f"Opened {result['account']}")
+                    await out.put((opened, result))
+                    opened += 1
+            await out.put(None)
+
+        async def funder(page: Page, inbox: asyncio.Queue, out: asyncio.Queue):
+            while (item := await inbox.get()) is not None:
+                _, result = item
+                if fund:
+                    result["funded"] = await timed_stage(result, "fund", self.transfer_acc_to_acc(
+                        source_account, result["account"], transfer_amount, page=page
+                    ))
+                await out.put(item)
+            await out.put(None)
+
+        async def enabler(page: Page, inbox: asyncio.Queue, out: asyncio.Queue):
+            selection_url = None
+            while (item := await inbox.get()) is not None:
+                _, result = item
+                async def enable():
+                    nonlocal selection_url
+                    if selection_url is None:
+                        selection_url = await self._open_pennystock_selection(page)
+                    success, error = await self._enable_pennystock_for(result["account"], selection_url, page)
+                    if not success:
+                        print(f"Penny stock trading not enabled for {result['account']}: {error}")
+                    return success
+                try:
+                    result["enabled"] = await timed_stage(result, "enable", enable())
+                except Exception as e:
+                    print(f"Penny stock trading not enabled for {result['account']}: {e}")
+                await out.put(item)
+            await out.put(None)
+
+        async def nicknamer(page: Page, inbox: asyncio.Queue):
+            while (item := await inbox.get()) is not None:
+                i, result = item
+                if nicknames is not None and i < len(nicknames):
+                    result["nicknamed"] = await timed_stage(result, "nickname", self.nickname_account(
+                        result["account"], nicknames[i], page=page
+                    ))
+
+        queues = [asyncio.Queue() for _ in range(3)]
+        pages = [self.page] + [await self.new_page() for _ in range(3)]
+        try:
+            await asyncio.gather(
+                opener(pages[0], queues[0]),
+                funder(pages[1], queues[0], queues[1]),
+                enabler(pages[2], queues[1], queues[2]),
+                nicknamer(pages[3], queues[2]),
+            )
+        finally:
+            for page in pages[1:]:
+                await page.close()
+        return results
+
+class BackgroundSession:
+    """
+    An `AsyncFidelityAutomation` kept running on its own thread and event loop, so sync code can hand it work
+    again and again without launching a browser each time. `FidelityAutomation.run_async` keeps one of these
+    for the life of the sync session.
+
+    Parameters
+    ----------
+    storage_state (dict)
+        The storage state of a logged in context to start from. Ex: `FidelityAutomation.context.storage_state()`
+    headless (bool)
+        If False the browser will be shown.
+    quote_cache (QuoteCache)
+        If given, the async browser shares these last prices
+    profiler (Profiler)
+        If given, the async browser records its step times here
+    block_resources (str)
+        What the async browser keeps pages from loading. See `FidelityAutomation`
+    """
+
+    def __init__(self, storage_state: dict, headless: bool = True, quote_cache: QuoteCache = None, profiler: Profiler = None, block_resources: str = "none") -> None:
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="fidelity-async", daemon=True)
+        self.thread.start()
+        self.browser = AsyncFidelityAutomation(
+            headless=headless,
+            save_state=False,
+            storage_state=storage_state,
+            block_resources=block_resources,
+            quote_cache=quote_cache,
+            profiler=profiler,
+        )
+        try:
+            self._call(self.browser.start())
+        except Exception:
+            self._stop_loop()
+            raise
+
+    def _call(self, coro):
+        """Runs a coroutine on the session's loop and waits for its result"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def _stop_loop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+    def run(self, fn, cookies: list = None, account_dict: dict = None, portfolio: PortfolioIndex = None):
+        """
+        Returns the result of `await fn(browser)`.
+
+        Parameters
+        ----------
+        fn (async callable)
+            Takes the `AsyncFidelityAutomation` and does the work
+        cookies (list)
+            Cookies to bring the context up to date with first, like the ones the sync session picked up since
+        account_dict (dict)
+            If given, the async browser uses this as its `account_dict` so anything it learns is kept
+        portfolio (PortfolioIndex)
+            The index that goes with `account_dict`. Should be given along with it
+        """
+        async def runner():
+            if cookies:
+                await self.browser.context.add_cookies(cookies)
+            if account_dict is not None:
+                self.browser.account_dict = account_dict
+                self.browser.portfolio = portfolio if portfolio is not None else PortfolioIndex()
+                if portfolio is None:
+                    self.browser.portfolio.rebuild(account_dict)
+            return await fn(self.browser)
+
+        return self._call(runner())
+
+    def cookies(self) -> list:
+        """The cookies of the async context, to hand back to the sync session"""
+        return self._call(self.browser.context.cookies())
+
+    def close(self):
+        """Closes the browser and stops the thread"""
+        try:
+            self._call(self.browser.close_browser())
+        finally:
+            self._stop_loop()
+
+
+def run_in_session(storage_state: dict, fn, headless: bool = True, account_dict: dict = None, portfolio: PortfolioIndex = None, quote_cache: QuoteCache = None, profiler: Profiler = None, block_resources: str = "none"):
+    """
+    Starts an `AsyncFidelityAutomation` in a new browser seeded with an already logged in storage state and returns
+    the result of `await fn(browser)`. The browser runs on its own thread and event loop so this can be called from
+    sync code, including code that is driving a sync playwright browser on the calling thread. Each call launches
+    and closes its own browser.
+
+    Parameters
+    ----------
+    storage_state (dict)
+        The storage state of a logged in context. Ex: `FidelityAutomation.context.storage_state()`
+    fn (async callable)
+        Takes the started `AsyncFidelityAutomation` and does the work
+    headless (bool)
+        If False the browser will be headless.
+    account_dict (dict)
+        If given, the async browser uses this as its `account_dict` so anything it learns is kept
+    portfolio (PortfolioIndex)
+        The index that goes with `account_dict`. Should be given along with it
+    quote_cache (QuoteCache)
+        If given, the async browser shares these last prices
+    profiler (Profiler)
+        If given, the async browser records its step times here
+    block_resources (str)
+        What the async browser keeps pages from loading. See `FidelityAutomation`
+
+    Returns
+    -------
+    The return value of `fn`
+    """
+    async def runner():
+        async with AsyncFidelityAutomation(headless=headless, save_state=False, storage_state=storage_state, block_resources=block_resources, quote_cache=quote_cache, profiler=profiler) as browser:
+            if account_dict is not None:
+                browser.account_dict = account_dict
+                browser.portfolio = portfolio if portfolio is not None else PortfolioIndex()
+                if portfolio is None:
+                    browser.portfolio.rebuild(account_dict)
+            return await fn(browser)
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, runner()).result()
@@ -1,6 +1,14 @@
 from fidelityAPI import FidelityAutomation
+from account_cache import AccountCache
+from session_manager import SessionManager
+from orders import read_order_legs, format_order_preview
+from quote_cache import QuoteCache
+from operation_journal import OperationJournal
+from plans import run_plan, format_plan_results
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import os
 import re
+import time
 
 def print_menu():
     """Prints the main menu with categories"""
@@ -68,7 +76,8 @@ def print_quick_actions():
     print("-"*40)
     print("1. The Big Three (Roth)")
     print("2. The Big Three (Brokerage)")
-    print("3. Back to Main Menu")
+    print("3. Provision Many Accounts")
+    print("4. Back to Main Menu")
     print("Enter a number to select category: ", end="")
 
 
@@ -79,7 +88,78 @@ def get_source_account():
         return creds[3] if len(creds) > 3 else None
     return None
 
-def execute_bulk_transaction(browser: FidelityAutomation, action: str, stock: str, quantity: float) -> bool:
+def plan_nicknames(account_dict: dict, acc_type: str, count: int) -> list:
+    """
+    Works out nicknames for new accounts that continue the numbering of existing ones of the same type.
+    Ex: if the highest is `Roth 7`, the next 2 are `Roth 8` and `Roth 9`
+
+    Parameters
+    ----------
+    account_dict (dict)
+        The accounts of the login. See `FidelityAutomation.account_dict`
+    acc_type (str)
+        'roth' or 'brokerage'
+    count (int)
+        How many nicknames to make
+
+    Returns
+    -------
+    nicknames (list)
+        The nicknames in order. None if no existing account of that type has a numbered nickname
+    """
+    regex_str = r'^\d{9}$' if acc_type == 'roth' else r'Z\d{8}$'
+    counter = 0
+    regular_name = None
+
+    # Find highest numbered account of this type
+    for key in account_dict:
+        # Check if account matches the type
+        match = re.search(regex_str, key)
+        # Look for number in existing nicknames
+        nickname_number = re.search(r'\d{1,}', str(account_dict[key]['nickname']))
+
+        if match and nickname_number:
+            # Update counter if we find a higher number
+            if counter <= int(nickname_number.group(0)):
+                counter = int(nickname_number.group(0)) + 1
+                # Get the base name (without number)
+                name_match = re.search(r'[^\d]+', account_dict[key]['nickname'])
+                if name_match:
+                    regular_name = name_match.group(0)
+
+    if regular_name is None:
+        return None
+    return [regular_name + str(counter + i) for i in range(count)]
+
+def execute_provisioning(browser: FidelityAutomation, acc_type: str, count: int, transfer_amount: float = None) -> bool:
+    """
+    Opens, funds, enables penny stock trading on and nicknames several new accounts at once.
+    See `FidelityAutomation.provision_accounts`
+
+    Returns
+    -------
+    success (bool)
+        If every account was opened and set up
+    """
+    # Nicknames continue from the existing accounts
+    browser.get_list_of_accounts()
+    nicknames = plan_nicknames(browser.account_dict, acc_type, count)
+    if nicknames is None:
+        print("No numbered nicknames found, new accounts won't be nicknamed")
+
+    results = browser.provision_accounts(
+        acc_type,
+        count,
+        transfer_amount=transfer_amount,
+        source_account=browser.source_account,
+        nicknames=nicknames
+    )
+    return len(results) == count and all(
+        result["opened"] and result["funded"] is not False and result["enabled"] and result["nicknamed"] is not False
+        for result in results
+    )
+
+def execute_bulk_transaction(browser: FidelityAutomation, action: str, stock: str, quantity: float, max_pages: int = 1) -> bool:
     """
         Execute buy/sell transactions across all eligible accounts.
         
@@ -93,6 +173,8 @@ def execute_bulk_transaction(browser: FidelityAutomation, action: str, stock: st
             Stock symbol to trade
         quantity : float
             Quantity to trade per account
+        max_pages : int
+            Number of orders to place at the same time on separate pages. 1 places them one at a time
             
         Returns
         -------
@@ -113,18 +195,19 @@ def execute_bulk_transaction(browser: FidelityAutomation, action: str, stock: st
     print(f"Stock: {stock}")
     print(f"Quantity per account: {quantity}")
     print("\nProcessing accounts:")
+
+    results = browser.bulk_transaction(
+        stock=stock,
+        quantity=quantity,
+        action=action,
+        accounts=list(accounts),
+        dry=False,
+        max_pages=max_pages
+    )
     
-    # Process each account
-    for acc_num, acc_info in accounts.items():
-        print(f"\nAccount {acc_num} ({acc_info['nickname']}):")
-        success, error = browser.transaction(
-            stock=stock,
-            quantity=quantity,
-            action=action,
-            account=acc_num,
-            dry=False
-        )
-        
+    # Report on each account
+    for acc_num, (success, error) in results.items():
+        print(f"\nAccount {acc_num} ({accounts[acc_num]['nickname']}):")
         if success:
             print(f"✓ Success")
             success_count += 1
@@ -139,6 +222,52 @@ def execute_bulk_transaction(browser: FidelityAutomation, action: str, stock: st
     
     return fail_count == 0
 
+def confirm_order_preview(results: list) -> bool:
+    """Shows the previews of a batch of orders and asks if the ones that passed should be placed"""
+    print("\nOrder previews:")
+    print(format_order_preview(results))
+    ready = sum(1 for result in results if result["previewed"])
+    return input(f"\nPlace these {ready} orders? (y/n): ").lower() == 'y'
+
+def confirm_unknown_steps(kind: str, steps: list) -> bool:
+    """Asks if the steps of an earlier run that may or may not have gone through should be tried again"""
+    return input(f"\nTry these {len(steps)} again anyway? Check the accounts first, they could be done twice (y/n): ").lower() == 'y'
+
+def execute_batch_orders(browser: FidelityAutomation, path: str, max_pages: int = 1) -> bool:
+    """
+        Previews every order in a csv of order legs, then places the ones that passed if confirmed.
+
+        Parameters
+        ----------
+        browser : FidelityAutomation
+            The browser instance
+        path : str
+            Path to a csv with columns account,symbol,side,quantity and an optional limit
+        max_pages : int
+            Number of orders to work on at the same time on separate pages
+
+        Returns
+        -------
+        bool
+            True if every order was placed
+    """
+    try:
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            legs = read_order_legs(f)
+    except Exception as e:
+        print(f"Could not read order legs: {e}")
+        return False
+    if not legs:
+        print("No orders found")
+        return False
+
+    print(f"\nPreviewing {len(legs)} orders...")
+    results = browser.batch_orders(legs, confirm=confirm_order_preview, max_pages=max_pages)
+
+    print("\nBatch results:")
+    print(format_order_preview(results))
+    return all(result["placed"] for result in results)
+
 def get_user_actions(action_list: list = None)  -> list:
   
     """
@@ -258,9 +387,16 @@ def get_user_actions(action_list: list = None)  -> list:
                     break
 
         elif main_choice == '3':  # Trading Operations
-            action = input("\nEnter action (buy/sell): ").lower()
+            action = input("\nEnter action (buy/sell/batch): ").lower()
+            if action == 'batch':
+                path = input("Enter path to order legs csv (account,symbol,side,quantity,limit): ").strip()
+                if not os.path.isfile(path):
+                    print("File not found")
+                    continue
+                action_list.extend(['batch_orders', path])
+                return action_list
             if action not in ['buy', 'sell']:
-                print("Invalid action. Please enter 'buy' or 'sell'")
+                print("Invalid action. Please enter 'buy', 'sell' or 'batch'")
                 continue
             
             stock = input("Enter stock symbol: ").upper()
@@ -307,7 +443,22 @@ def get_user_actions(action_list: list = None)  -> list:
                     action_list.append('123B')
                     return action_list
                 
-                elif sub_choice == '3':  # Back
+                elif sub_choice == '3':  # Provision many accounts
+                    account_type = input("\nEnter account type (roth/brokerage): ").lower()
+                    if account_type not in ['roth', 'brokerage']:
+                        print("Invalid account type")
+                        continue
+                    try:
+                        count = int(input("How many accounts to open? "))
+                        amount = float(input("How much to transfer to each (0 for none)? ") or 0)
+                    except ValueError:
+                        print("Please enter a valid number")
+                        continue
+                    if count > 0:
+                        action_list.extend(['provision', account_type, str(count), str(amount)])
+                        return action_list
+
+                elif sub_choice == '4':  # Back
                     break
 
         elif main_choice == '6':  # Pause Browser
@@ -353,7 +504,7 @@ def execute_user_action(action_list: list, browser: FidelityAutomation, index: i
             index += 2
 
         elif action_list[index] == 'enable_all':  # Enable all penny stock
-            browser.enable_all_pennystock_trading()
+            browser.enable_all_pennystock_trading(max_pages=int(os.getenv("FIDELITY_MAX_PAGES", "1")))
             index += 1
             
         elif action_list[index] == '4':  # List positions
@@ -371,14 +522,16 @@ def execute_user_action(action_list: list, browser: FidelityAutomation, index: i
         elif action_list[index] == 'source_to_all':  # Transfer from all accounts
             browser.transfer_from_source_to_all_acc(
                 action_list[index + 1],  # source account
-                float(action_list[index + 2])  # amount
+                float(action_list[index + 2]),  # amount
+                max_pages=int(os.getenv("FIDELITY_MAX_PAGES", "1"))
             )
             index += 3
 
         elif action_list[index] == 'all_to_source':  # Transfer from all accounts to source
             browser.transfer_from_all_to_source(
                 action_list[index + 1],  # destination account
-                float(action_list[index + 2])  # amount
+                float(action_list[index + 2]),  # amount
+                max_pages=int(os.getenv("FIDELITY_MAX_PAGES", "1"))
             )
             index += 3
             
@@ -387,14 +540,31 @@ def execute_user_action(action_list: list, browser: FidelityAutomation, index: i
                 browser=browser,
                 action=action_list[index + 1],
                 stock=action_list[index + 2],
-                quantity=float(action_list[index + 3])
+                quantity=float(action_list[index + 3]),
+                max_pages=int(os.getenv("FIDELITY_MAX_PAGES", "1"))
+            )
+            index += 4
+
+        elif action_list[index] == 'batch_orders':  # Batch of orders from a csv
+            execute_batch_orders(
+                browser=browser,
+                path=action_list[index + 1],
+                max_pages=int(os.getenv("FIDELITY_MAX_PAGES", "1"))
+            )
+            index += 2
+
+        elif action_list[index] == 'provision':  # Open and set up several accounts
+            execute_provisioning(
+                browser=browser,
+                acc_type=action_list[index + 1],
+                count=int(action_list[index + 2]),
+                transfer_amount=float(action_list[index + 3])
             )
             index += 4
             
         elif action_list[index] in ['123R', '123B']:  # Big Three
             # Determine account type
             acc_type = 'roth' if action_list[index] == '123R' else 'brokerage'
-            regex_str = '^\d{9}$' if acc_type == 'roth' else 'Z\d{8}$'
             
             # Ask about transfer
             choice_xfr = input("Transfer money? (y/n)\n").lower()
@@ -437,28 +607,11 @@ def execute_user_action(action_list: list, browser: FidelityAutomation, index: i
             
             # Nickname the account
             print("\nSetting account nickname...")
-            counter = 0
-            regular_name = None
-            
-            # Find highest numbered account of this type
-            for key in browser.account_dict:
-                # Check if account matches the type we just created
-                match = re.search(regex_str, key)
-                # Look for number in existing nicknames
-                nickname_number = re.search('\d{1,}', str(browser.account_dict[key]['nickname']))
-                
-                if match and nickname_number:
-                    # Update counter if we find a higher number
-                    if counter <= int(nickname_number.group(0)):
-                        counter = int(nickname_number.group(0)) + 1
-                        # Get the base name (without number)
-                        name_match = re.search('[^\d]+', browser.account_dict[key]['nickname'])
-                        if name_match:
-                            regular_name = name_match.group(0)
+            nicknames = plan_nicknames(browser.account_dict, acc_type, 1)
             
             # Set the nickname
-            if regular_name is not None:
-                new_nickname = regular_name + str(counter)
+            if nicknames is not None:
+                new_nickname = nicknames[0]
                 browser.nickname_account(
                     account_number=browser.new_account_number,
                     nickname=new_nickname
@@ -477,3 +630,187 @@ def execute_user_action(action_list: list, browser: FidelityAutomation, index: i
             index += 1
             
     return index
+
+
+# Actions that prompt for input while executing. These can't run inside a worker process
+INTERACTIVE_ACTIONS = ['123R', '123B', 'all_to_source', 'pause', 'batch_orders']
+
+# How many list entries each action takes up, counting itself. See execute_user_action
+ACTION_LENGTHS = {
+    '1': 2, '2': 4, '3': 2, 'enable_all': 1, '4': 1, '5': 1, '6': 3, 'source_to_all': 3, 'all_to_source': 3,
+    'bulk_trade': 4, 'batch_orders': 2, 'provision': 4, '123R': 1, '123B': 1, 'pause': 1,
+}
+
+def action_tokens(action_list: list) -> list:
+    """
+    Returns the actions in an action list without their arguments, walking it the way `execute_user_action` does.
+    """
+    actions = []
+    index = 0
+    while index < len(action_list):
+        actions.append(action_list[index])
+        index += ACTION_LENGTHS.get(action_list[index], 1)
+    return actions
+
+def mask_username(username: str) -> str:
+    """Returns the first quarter (plus 2 characters) of a username for identification in output"""
+    quarter = round(len(username) * 0.25) + 2
+    return username[:quarter]
+
+def run_account_actions(account: str, action_list: list, headless: bool = True, plan: list = None) -> dict:
+    """
+    Logs into a single Fidelity login and executes an action list, or the steps of a plan, for it.
+    This is meant to be run by a worker process so several logins can be processed at the same time.
+    Each call creates and closes its own browser.
+
+    Parameters
+    ----------
+    account (str)
+        The credential string for the login. Format of `username:password:totp_secret`
+    action_list (list)
+        The list of actions to execute. See `execute_user_action`
+    headless (bool)
+        If the browser should be headless
+    plan (list)
+        If given, these `PlanStep` are run with `run_plan` instead of the action list
+
+    Returns
+    -------
+    result (dict)
+        ```
+        {
+            'login': str: The masked username
+            'success': bool: If the login and all actions ran without raising
+            'error': str: The error message if not successful, None otherwise
+            'elapsed': float: The number of seconds it took to process this login
+        }
+        ```
+    """
+    creds = account.split(':')
+    result = {
+        "login": mask_username(creds[0]),
+        "success": False,
+        "error": None,
+        "elapsed": 0.0,
+    }
+    start = time.perf_counter()
+    browser = None
+    try:
+        sessions = SessionManager(os.getenv("FIDELITY_SESSION_DIR", "sessions"))
+        browser = FidelityAutomation(
+            headless=headless,
+            save_state=False,
+            cache=AccountCache(os.getenv("FIDELITY_CACHE_PATH", "fidelity_cache.db")),
+            storage_state=sessions.load(creds[0]),
+            block_resources=os.getenv("FIDELITY_BLOCK_RESOURCES", "none"),
+            quote_cache=QuoteCache(ttl=float(os.getenv("FIDELITY_QUOTE_TTL", "5"))),
+            # Nobody is there to ask, so steps with an unknown outcome are left out
+            journal=OperationJournal(
+                os.getenv("FIDELITY_JOURNAL_PATH", "fidelity_journal.jsonl"),
+                resume=os.getenv("FIDELITY_RESUME", "0") == "1",
+                max_age=float(os.getenv("FIDELITY_JOURNAL_MAX_AGE", "24")) * 3600,
+            ),
+            profile_dir=os.getenv("FIDELITY_PROFILE_DIR"),
+        )
+        step_1, step_2 = sessions.login_or_resume(
+            browser,
+            username=creds[0],
+            password=creds[1],
+            totp_secret=creds[2] if len(creds) > 2 else None,
+            save_device=False,
+        )
+        if step_1 and step_2:
+            print(f"\nSuccessfully logged in as: {result['login']}...")
+            if plan is not None:
+                steps = run_plan(browser, plan, max_sessions=int(os.getenv("FIDELITY_MAX_SESSIONS", "2")))
+                print(f"\n[{result['login']}...] Plan results:")
+                print(format_plan_results(steps))
+                failed = [step["id"] for step in steps if step["status"] != "done"]
+                if failed:
+                    result["error"] = f"Steps not done: {', '.join(failed)}"
+            else:
+                execute_user_action(action_list, browser)
+            sessions.save(creds[0], browser.context.storage_state())
+            result["success"] = result["error"] is None
+        else:
+            result["error"] = "Login failed"
+    except Exception as e:
+        result["error"] = str(e)
+    finally:
+        # Always try to close the browser
+        if browser is not None:
+            try:
+                browser.close_browser()
+            except Exception:
+                pass
+        result["elapsed"] = time.perf_counter() - start
+
+    return result
+
+def run_accounts_parallel(accounts: list, action_list: list, max_workers: int = 4, headless: bool = True, plan: list = None) -> list:
+    """
+    Runs the same action list, or plan, for every login, each in its own worker process.
+    At most `max_workers` logins are processed at once.
+
+    Parameters
+    ----------
+    accounts (list)
+        List of credential strings. Format of `username:password:totp_secret`
+    action_list (list)
+        The list of actions to execute for each login. Must not contain any `INTERACTIVE_ACTIONS`
+    max_workers (int)
+        The max number of logins to process at the same time
+    headless (bool)
+        If the browsers should be headless
+    plan (list)
+        If given, these `PlanStep` are run for each login instead of the action list
+
+    Returns
+    -------
+    results (list)
+        List of result dicts in the same order as `accounts`. See `run_account_actions`
+    """
+    for action in action_tokens(action_list):
+        if action in INTERACTIVE_ACTIONS:
+            raise Exception(f"Action '{action}' needs user input and can't be run in parallel")
+
+    max_workers = max(1, min(max_workers, len(accounts)))
+    results = [None] * len(accounts)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(run_account_actions, account, action_list, headless, plan): i
+            for i, account in enumerate(accounts)
+        }
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                results[i] = future.result()
+            except Exception as e:
+                # Worker process itself died
+                results[i] = {
+                    "login": mask_username(accounts[i].split(':')[0]),
+                    "success": False,
+                    "error": f"Worker failed: {e}",
+                    "elapsed": 0.0,
+                }
+            status = "✓ Done" if results[i]["success"] else f"✗ Failed: {results[i]['error']}"
+            print(f"\n[{results[i]['login']}...] {status}")
+
+    return results
+
+def print_run_summary(results: list, elapsed: float = None):
+    """Prints the consolidated summary of a multi-login run. See `run_accounts_parallel`"""
+    print("\n" + "="*60)
+    print("                       RUN SUMMARY")
+    print("="*60)
+    for result in results:
+        status = "✓" if result["success"] else "✗"
+        line = f"{status} {result['login']}... ({result['elapsed']:.1f}s)"
+        if result["error"] is not None:
+            line += f" - {result['error']}"
+        print(line)
+    success_count = sum(1 for result in results if result["success"])
+    print(f"\nSuccessful: {success_count}")
+    print(f"Failed: {len(results) - success_count}")
+    if elapsed is not None:
+        print(f"Total time: {elapsed:.1f}s")
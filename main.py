@@ -1,14 +1,44 @@
-import sqlite3
 import os
+import argparse
 import csv
 import re
+import time
 from fidelityAPI import FidelityAutomation
+from browser_pool import BrowserPool
+from account_cache import AccountCache
+from session_manager import SessionManager
+from quote_cache import QuoteCache
+from operation_journal import OperationJournal
+from plans import load_plan, parse_step_args
 from helper import *
 from dotenv import load_dotenv
 
 
+def parse_args():
+    """Reads the command line. Without a plan or steps the interactive menu is used"""
+    parser = argparse.ArgumentParser(
+        description="Fidelity automation. Give a plan or steps to run them for every login without any prompts."
+    )
+    parser.add_argument("--plan", help="A json (or yaml) plan file. See plans.load_plan")
+    parser.add_argument(
+        "--step",
+        nargs="+",
+        action="append",
+        metavar="ACTION [NAME=VALUE ...]",
+        help="A step to run, after the steps given before it. Ex: --step transaction stock=AAPL quantity=1 action=buy account=Z12345678"
+    )
+    parser.add_argument("--headed", action="store_true", help="Show the browsers when running a plan")
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue bulk orders, transfers and penny stock enablement that didn't finish last time. Same as FIDELITY_RESUME=1"
+    )
+    return parser.parse_args()
+
+
 def main():
     """Main function to run the automation"""
+    args = parse_args()
     try:
         # Delete old variable in environment
         if os.getenv("FIDELITY"):
@@ -16,6 +46,8 @@ def main():
             
         # Initialize .env file
         load_dotenv()
+        if args.resume:
+            os.environ["FIDELITY_RESUME"] = "1"
         
         # Import Fidelity account
         if not os.getenv("FIDELITY"):
@@ -29,77 +61,158 @@ def main():
             if len(creds) < 3:
                 raise Exception("Error: Incomplete credentials. Format should be username:password:totp_secret")
 
+        # Run a plan without asking anything
+        if args.plan or args.step:
+            run_plan_for_all(accounts, args.plan, args.step, headless=not args.headed)
+            return
+
         print("\nWelcome to Fidelity Automation!")
+
+        # Run the same actions for every login at once if requested
+        if len(accounts) > 1:
+            parallel = input(f"\nRun the same actions for all {len(accounts)} logins in parallel? (y/n): ")
+            if parallel.lower() == 'y':
+                run_parallel(accounts)
+                print("\nThank you for using Fidelity Automation!")
+                return
+
+        # Keep one browser running for every batch and login below
+        browser_pool = BrowserPool(headless=False)
+        # Accounts and positions carry over between batches and runs
+        cache = AccountCache(os.getenv("FIDELITY_CACHE_PATH", "fidelity_cache.db"))
+        # Logged in sessions are saved so later runs can skip the login
+        sessions = SessionManager(os.getenv("FIDELITY_SESSION_DIR", "sessions"))
+        # Last prices shared by the orders of every batch
+        quotes = QuoteCache(ttl=float(os.getenv("FIDELITY_QUOTE_TTL", "5")))
+        # Bulk operations that die halfway can pick up where they left off when resuming
+        journal = OperationJournal(
+            os.getenv("FIDELITY_JOURNAL_PATH", "fidelity_journal.jsonl"),
+            resume=os.getenv("FIDELITY_RESUME", "0") == "1",
+            max_age=float(os.getenv("FIDELITY_JOURNAL_MAX_AGE", "24")) * 3600,
+            confirm_unknown=confirm_unknown_steps,
+        )
         
-        for account in accounts:
-            creds = account.split(':')
-            # Print partial username for identification
-            quarter = round(len(creds[0]) * 0.25) + 2
-            print(f"\nProcessing account: {creds[0][:quarter]}...")
+        try:
+            for account in accounts:
+                creds = account.split(':')
+                # Print partial username for identification
+                print(f"\nProcessing account: {mask_username(creds[0])}...")
 
-            # Initialize action list
-            action_list = []
+                # Initialize action list
+                action_list = []
             
-            while True:
-                # Get user actions
-                action_list = get_user_actions(action_list)
+                while True:
+                    # Get user actions
+                    action_list = get_user_actions(action_list)
                 
-                if not action_list:
-                    continue
+                    if not action_list:
+                        continue
                     
-                # Initialize browser if we have actions to perform
-                if action_list and action_list[-1] == '7':
-                    print("\nExiting program...")
-                    break
+                    # Initialize browser if we have actions to perform
+                    if action_list and action_list[-1] == '7':
+                        print("\nExiting program...")
+                        break
                 
-                if action_list:
-                    try:
-                        # Create browser instance
-                        browser = FidelityAutomation(
-                            headless=False,
-                            save_state=False,
-                        )
+                    if action_list:
+                        try:
+                            # Create browser instance
+                            browser = FidelityAutomation(
+                                headless=False,
+                                # Keeps each login's context apart in the pool without using the username itself
+                                title=AccountCache.login_key(creds[0]),
+                                save_state=False,
+                                browser_pool=browser_pool,
+                                cache=cache,
+                                storage_state=sessions.load(creds[0]),
+                                block_resources=os.getenv("FIDELITY_BLOCK_RESOURCES", "none"),
+                                quote_cache=quotes,
+                                journal=journal,
+                                profile_dir=os.getenv("FIDELITY_PROFILE_DIR"),
+                            )
                         
-                        # Login
-                        step_1, step_2 = browser.login(
-                            username=creds[0],
-                            password=creds[1],
-                            totp_secret=creds[2] if len(creds) > 2 else None,
-                            save_device=False,
-                        )
+                            # Login, or keep using the saved session if it's still alive
+                            step_1, step_2 = sessions.login_or_resume(
+                                browser,
+                                username=creds[0],
+                                password=creds[1],
+                                totp_secret=creds[2] if len(creds) > 2 else None,
+                                save_device=False,
+                            )
                         
-                        if step_1 and step_2:
-                            print(f"\nSuccessfully logged in as: {creds[0][:31]}...")
+                            if step_1 and step_2:
+                                print(f"\nSuccessfully logged in as: {creds[0][:31]}...")
                             
-                            # Execute the actions
-                            execute_user_action(action_list, browser)
+                                # Execute the actions
+                                execute_user_action(action_list, browser)
+                                # Keep the refreshed cookies for next time
+                                sessions.save(creds[0], browser.context.storage_state())
                             
-                        else:
-                            print("\nLogin failed!")
+                            else:
+                                print("\nLogin failed!")
                             
-                    except Exception as e:
-                        print(f"\nError during execution: {str(e)}")
+                        except Exception as e:
+                            print(f"\nError during execution: {str(e)}")
                         
-                    finally:
-                        # Always try to close the browser
-                        try:
-                            browser.close_browser()
-                        except:
-                            pass
+                        finally:
+                            # Always try to close the browser
+                            try:
+                                browser.close_browser()
+                            except:
+                                pass
                 
                 
-            # Ask if user wants to continue to next account
-            if len(accounts) > 1:
-                cont = input("\nContinue to next account? (y/n): ")
-                if cont.lower() != 'y':
-                    break
-
+                # Ask if user wants to continue to next account
+                if len(accounts) > 1:
+                    cont = input("\nContinue to next account? (y/n): ")
+                    if cont.lower() != 'y':
+                        break
+        finally:
+            # Don't leave the pooled browser running after an error or Ctrl+C
+            browser_pool.close()
         print("\nThank you for using Fidelity Automation!")
 
     except Exception as e:
         print(f"\nError: {str(e)}")
         return
 
+def run_parallel(accounts: list):
+    """
+    Collects one list of actions and runs it for every login in separate worker processes.
+    The number of logins processed at once is capped by FIDELITY_MAX_WORKERS (default 4).
+    """
+    print("\nSelect the actions to run for every login. Choose Exit when done.")
+    print(f"Actions that need input while running are not allowed here: {', '.join(INTERACTIVE_ACTIONS)}")
+    action_list = []
+    while not action_list or action_list[-1] != '7':
+        action_list = get_user_actions(action_list)
+    # Drop the exit
+    action_list = action_list[:-1]
+    if not action_list:
+        print("\nNo actions selected")
+        return
+
+    max_workers = int(os.getenv("FIDELITY_MAX_WORKERS", "4"))
+    print(f"\nProcessing {len(accounts)} logins with up to {max_workers} at a time...")
+    start = time.perf_counter()
+    results = run_accounts_parallel(accounts, action_list, max_workers=max_workers)
+    print_run_summary(results, elapsed=time.perf_counter() - start)
+
+def run_plan_for_all(accounts: list, plan_path: str = None, step_args: list = None, headless: bool = True):
+    """
+    Runs a plan file, or steps from the command line, for every login in separate worker processes.
+    The number of logins processed at once is capped by FIDELITY_MAX_WORKERS (default 4).
+    """
+    plan = load_plan(plan_path) if plan_path else parse_step_args(step_args)
+    if not plan:
+        print("\nThe plan has no steps")
+        return
+
+    max_workers = int(os.getenv("FIDELITY_MAX_WORKERS", "4"))
+    print(f"\nRunning {len(plan)} steps for {len(accounts)} logins with up to {max_workers} at a time...")
+    start = time.perf_counter()
+    results = run_accounts_parallel(accounts, [], max_workers=max_workers, headless=headless, plan=plan)
+    print_run_summary(results, elapsed=time.perf_counter() - start)
+
 if __name__ == "__main__":
     main()
 
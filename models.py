@@ -0,0 +1,204 @@
+class Position:
+    """
+    A single stock held in an account. Types are checked once here so positions don't need to be
+    validated again each time they are added to an account.
+
+    Supports `position["ticker"]` style access so code written for the stock dictionaries from
+    `create_stock_dict` keeps working.
+
+    Parameters
+    ----------
+    ticker (str)
+        The ticker of the stock held
+    quantity (float)
+        The quantity of stocks with 'ticker' held
+    last_price (float)
+        The last price of the stock
+    value (float)
+        The total value of the position
+    """
+
+    __slots__ = ("ticker", "quantity", "last_price", "value")
+
+    def __init__(self, ticker: str, quantity: float, last_price: float, value: float) -> None:
+        if type(ticker) is not str:
+            raise ValueError(f"ticker must be a str, got {type(ticker).__name__}")
+        self.ticker: str = ticker
+        self.quantity: float = _to_float("quantity", quantity)
+        self.last_price: float = _to_float("last_price", last_price)
+        self.value: float = _to_float("value", value)
+
+    @classmethod
+    def from_dict(cls, stock: dict) -> "Position":
+        """
+        Creates a position from a stock dictionary. See `create_stock_dict`
+        """
+        if isinstance(stock, Position):
+            return stock
+        return cls(stock["ticker"], stock["quantity"], stock["last_price"], stock["value"])
+
+    def to_dict(self) -> dict:
+        """Returns the position as a stock dictionary. See `create_stock_dict`"""
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def __getitem__(self, key: str):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key: str, value):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        if key == "ticker":
+            if type(value) is not str:
+                raise ValueError(f"ticker must be a str, got {type(value).__name__}")
+            self.ticker = value
+        else:
+            setattr(self, key, _to_float(key, value))
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.__slots__
+
+    def get(self, key: str, default=None):
+        return getattr(self, key) if key in self.__slots__ else default
+
+    def keys(self):
+        return self.__slots__
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (Position, dict)):
+            return all(self[field] == other.get(field) for field in self.__slots__)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"Position(ticker={self.ticker!r}, quantity={self.quantity}, last_price={self.last_price}, value={self.value})"
+
+
+class Account:
+    """
+    An account and its positions. Supports `account["stocks"]` style access so code written for the
+    dictionaries in `account_dict` keeps working.
+
+    Parameters
+    ----------
+    balance (float)
+        Total account balance
+    withdrawal_balance (float)
+        The available balance that can be withdrawn from the account as cash
+    nickname (str)
+        The account nickname or default name
+    stocks (list)
+        List of `Position`
+    """
+
+    __slots__ = ("balance", "withdrawal_balance", "nickname", "stocks")
+
+    def __init__(self, balance: float = 0.0, withdrawal_balance: float = 0.0, nickname: str = None, stocks: list = None) -> None:
+        self.balance: float = _to_float("balance", balance)
+        self.withdrawal_balance: float = _to_float("withdrawal_balance", withdrawal_balance)
+        self.nickname: str = nickname
+        self.stocks: list = stocks if stocks is not None else []
+
+    def to_dict(self) -> dict:
+        """Returns the account as the plain dictionary `account_dict` used to hold"""
+        return {
+            "balance": self.balance,
+            "withdrawal_balance": self.withdrawal_balance,
+            "nickname": self.nickname,
+            "stocks": [stock.to_dict() for stock in self.stocks],
+        }
+
+    def __getitem__(self, key: str):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key: str, value):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        if key in ("balance", "withdrawal_balance"):
+            value = _to_float(key, value)
+        setattr(self, key, value)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.__slots__
+
+    def get(self, key: str, default=None):
+        return getattr(self, key) if key in self.__slots__ else default
+
+    def keys(self):
+        return self.__slots__
+
+    def __repr__(self) -> str:
+        return f"Account(balance={self.balance}, withdrawal_balance={self.withdrawal_balance}, nickname={self.nickname!r}, stocks={self.stocks!r})"
+
+
+class OrderLeg:
+    """
+    One order of a batch. See `FidelityAutomation.batch_orders`
+
+    Parameters
+    ----------
+    account (str)
+        The account number to trade under
+    symbol (str)
+        The ticker to trade. Stored in upper case
+    side (str)
+        'buy' or 'sell' in any case. Stored in lower case
+    quantity (float)
+        The amount to buy or sell. Must be more than 0
+    limit (float)
+        The limit price. None lets `transaction` pick market or limit from the last price
+    """
+
+    __slots__ = ("account", "symbol", "side", "quantity", "limit")
+
+    def __init__(self, account: str, symbol: str, side: str, quantity: float, limit: float = None) -> None:
+        if type(account) is not str or not account:
+            raise ValueError("account must be a non empty str")
+        if type(symbol) is not str or not symbol:
+            raise ValueError("symbol must be a non empty str")
+        if type(side) is not str or side.lower() not in ("buy", "sell"):
+            raise ValueError(f"side must be 'buy' or 'sell', got {side!r}")
+        self.account: str = account.upper()
+        self.symbol: str = symbol.upper()
+        self.side: str = side.lower()
+        self.quantity: float = _to_float("quantity", quantity)
+        if self.quantity <= 0:
+            raise ValueError("quantity must be more than 0")
+        self.limit: float = None
+        if limit is not None:
+            self.limit = _to_float("limit", limit)
+            if self.limit <= 0:
+                raise ValueError("limit must be more than 0")
+
+    @classmethod
+    def from_dict(cls, leg: dict) -> "OrderLeg":
+        """Creates a leg from a dictionary with the same keys as the parameters"""
+        if isinstance(leg, OrderLeg):
+            return leg
+        return cls(leg["account"], leg["symbol"], leg["side"], leg["quantity"], leg.get("limit"))
+
+    def to_dict(self) -> dict:
+        """Returns the leg as a dictionary"""
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, OrderLeg):
+            return all(getattr(self, field) == getattr(other, field) for field in self.__slots__)
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(tuple(getattr(self, field) for field in self.__slots__))
+
+    def __repr__(self) -> str:
+        return f"OrderLeg(account={self.account!r}, symbol={self.symbol!r}, side={self.side!r}, quantity={self.quantity}, limit={self.limit})"
+
+
+def _to_float(name: str, value) -> float:
+    """Checks a number field and returns it as a float"""
+    if type(value) is float:
+        return value
+    if type(value) is int:
+        return float(value)
+    raise ValueError(f"{name} must be a float, got {type(value).__name__}")
@@ -0,0 +1,256 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+
+from account_cache import AccountCache
+
+
+class OperationJournal:
+    """
+    An append-only JSONL log of the per-account steps of bulk operations (orders, transfers, penny stock
+    enablement). Each step is written as an intent before it is tried and an outcome after, so a run that
+    dies halfway can be picked up again without repeating the steps that already finished.
+    Runs are only picked up again when asked to, and only while they are younger than `max_age`.
+
+    Every line is one json object:
+    ```
+    {
+        'op': str: Identifies the operation. The same kind, login and parameters give the same op
+        'run': str: Identifies one attempt at the operation
+        'kind': str: Ex: 'bulk_transaction'
+        'step': str: Usually the account number. None for the run's own start and finish lines
+        'status': str: 'started', 'intent', 'done', 'failed' or 'finished'
+        'error': str: Why the step failed. Only on 'failed'
+        'time': float: When it was written
+    }
+    ```
+
+    Parameters
+    ----------
+    path (str)
+        Path of the journal file. Created if missing.
+    resume (bool)
+        Pick up the unfinished earlier run of an operation instead of starting over. Off by default
+    max_age (float)
+        Seconds after its start that an unfinished run can still be picked up
+    confirm_unknown (callable)
+        Called as `confirm_unknown(kind, steps)` with the steps an earlier run started but never wrote an
+        outcome for. They are tried again only if it returns True. With None they are never tried again
+    """
+
+    def __init__(self, path: str = "fidelity_journal.jsonl", resume: bool = False, max_age: float = 86400.0, confirm_unknown=None) -> None:
+        self.path: str = path
+        self.resume: bool = resume
+        self.max_age: float = max_age
+        self.confirm_unknown = confirm_unknown
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def operation_key(kind: str, username: str, params: dict) -> str:
+        """Returns the key an operation is journaled under. The username is stored as a hash"""
+        text = json.dumps(
+            {"kind": kind, "login": AccountCache.login_key(username or ""), "params": params},
+            sort_keys=True,
+            default=str
+        )
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+    def append(self, entry: dict) -> None:
+        """Writes one line and makes sure it is on disk before returning"""
+        line = json.dumps(entry, default=str) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def read(self, op: str) -> list:
+        """
+        Gets every line written for an operation, oldest first. Lines cut off by a crash are ignored.
+        """
+        entries = []
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    # Skip lines that can't be ours before parsing
+                    if op not in line:
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if entry.get("op") == op:
+                        entries.append(entry)
+        except FileNotFoundError:
+            pass
+        return entries
+
+    def begin(self, kind: str, username: str, resume: bool = None, **params) -> "JournalRun":
+        """
+        Starts journaling an operation. If the last run of the same operation never finished, is younger
+        than `max_age` and resume is True, that run is continued and the steps it finished are reported as done.
+
+        Parameters
+        ----------
+        kind (str)
+            The kind of operation. Ex: 'bulk_transaction'
+        username (str)
+            The login it runs under
+        resume (bool)
+            Pick up an unfinished earlier run. Defaults to the journal's `resume`
+        params
+            What makes this operation different from others of the same kind. Ex: the stock and quantity
+
+        Returns
+        -------
+        run (JournalRun)
+        """
+        if resume is None:
+            resume = self.resume
+        op = self.operation_key(kind, username, params)
+        entries = self.read(op)
+
+        # Find the last run and see if it finished
+        run_id = None
+        started = None
+        for entry in entries:
+            if entry["status"] == "started":
+                run_id = entry["run"]
+                started = entry["time"]
+            elif entry["status"] == "finished" and entry["run"] == run_id:
+                run_id = None
+
+        # Start over unless asked to pick it up and it isn't too old
+        if run_id is not None and not resume:
+            print(f"An earlier {kind} with the same details never finished. Starting over, use --resume or FIDELITY_RESUME=1 to continue it instead")
+            run_id = None
+        elif run_id is not None and time.time() - started > self.max_age:
+            print(f"An earlier {kind} with the same details never finished but is too old to continue. Starting over")
+            run_id = None
+
+        completed = set()
+        unknown = set()
+        if run_id is not None:
+            # Work out where each step of that run ended up
+            for entry in entries:
+                if entry["run"] != run_id or entry["step"] is None:
+                    continue
+                if entry["status"] == "done":
+                    completed.add(entry["step"])
+                    unknown.discard(entry["step"])
+                elif entry["status"] == "intent":
+                    unknown.add(entry["step"])
+                elif entry["status"] == "failed":
+                    unknown.discard(entry["step"])
+        else:
+            run_id = uuid.uuid4().hex
+            self.append({"op": op, "run": run_id, "kind": kind, "step": None, "status": "started", "time": time.time()})
+
+        return JournalRun(self, op, run_id, kind, completed, unknown, self.confirm_unknown)
+
+
+class JournalRun:
+    """
+    One run of a journaled operation. See `OperationJournal.begin`
+    Create with `JournalRun.disabled()` when there is no journal, every method then does nothing.
+    """
+
+    def __init__(self, journal: OperationJournal, op: str, run: str, kind: str, completed: set, unknown: set, confirm_unknown=None) -> None:
+        self.journal: OperationJournal = journal
+        self.op: str = op
+        self.run: str = run
+        self.kind: str = kind
+        # Steps an earlier attempt finished
+        self.completed: set = completed
+        # Steps an earlier attempt started but never wrote an outcome for
+        self.unknown: set = unknown
+        # Steps with an unknown outcome that this run leaves alone
+        self.held: set = set()
+        self.confirm_unknown = confirm_unknown
+
+    @classmethod
+    def disabled(cls) -> "JournalRun":
+        """A run that records nothing"""
+        return cls(None, None, None, None, set(), set())
+
+    @property
+    def resumed(self) -> bool:
+        """If this continues an earlier run"""
+        return bool(self.completed or self.unknown)
+
+    def pending(self, steps: list, retry_unknown: bool = False) -> list:
+        """
+        Returns the steps that still need to run, in the given order.
+        Steps with an unknown outcome may have gone through, so they are left out unless retry_unknown is True
+        or `confirm_unknown` says to try them again. The ones left out are in `held`.
+
+        Parameters
+        ----------
+        steps (list)
+            Every step of the operation
+        retry_unknown (bool)
+            Try steps with an unknown outcome again without asking. Only for steps that are safe to repeat
+        """
+        if self.completed:
+            print(f"Resuming {self.kind}: skipping {len([step for step in steps if step in self.completed])} steps already done")
+        unknown = [step for step in steps if step in self.unknown]
+        if unknown and not retry_unknown:
+            print(f"The outcome of {len(unknown)} steps from the last {self.kind} is unknown, they may have gone through:")
+            for step in unknown:
+                print(f"  {step}")
+            if self.confirm_unknown is None or not self.confirm_unknown(self.kind, unknown):
+                print("Leaving them out. Check them and run again to retry")
+                self.held = set(unknown)
+        elif unknown:
+            print(f"The outcome of {len(unknown)} steps from the last {self.kind} is unknown, trying them again")
+        return [step for step in steps if step not in self.completed and step not in self.held]
+
+    def earlier_outcome(self, step: str) -> tuple:
+        """
+        Returns `(Success (bool), Error_message (str))` for a step that `pending` left out
+        """
+        if step in self.held:
+            return (False, "The outcome of an earlier attempt is unknown, check it before trying again")
+        return (True, "Done in an earlier run")
+
+    def _write(self, step, status: str, error: str = None):
+        if self.journal is None:
+            return
+        entry = {"op": self.op, "run": self.run, "kind": self.kind, "step": step, "status": status, "time": time.time()}
+        if error is not None:
+            entry["error"] = error
+        self.journal.append(entry)
+
+    def intent(self, step: str) -> None:
+        """Records that a step is about to be tried"""
+        self._write(step, "intent")
+
+    def done(self, step: str) -> None:
+        """Records that a step succeeded"""
+        self.completed.add(step)
+        self.unknown.discard(step)
+        self._write(step, "done")
+
+    def failed(self, step: str, error: str = None) -> None:
+        """Records that a step failed. It is tried again on resume"""
+        self.unknown.discard(step)
+        self._write(step, "failed", error)
+
+    def record(self, step: str, success: bool, error: str = None) -> None:
+        """Records the outcome of a step"""
+        if success:
+            self.done(step)
+        else:
+            self.failed(step, error)
+
+    def finish(self) -> None:
+        """
+        Marks the run as over. The next run of the same operation starts fresh.
+        Does nothing while steps are held, so they can still be picked up.
+        """
+        if self.held:
+            return
+        self._write(None, "finished")
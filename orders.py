@@ -0,0 +1,116 @@
+import csv
+import typing
+
+from models import OrderLeg
+
+# Columns an order legs csv must have. A "limit" column is optional
+REQUIRED_ORDER_COLUMNS = ["account", "symbol", "side", "quantity"]
+
+
+def read_order_legs(lines: typing.Iterable[str]) -> list:
+    """
+    Reads order legs from csv text with a header row of `account,symbol,side,quantity[,limit]`.
+    Empty limits mean no limit.
+
+    Parameters
+    ----------
+    lines (Iterable[str])
+        The csv text. An open file (with newline="") or any iterable of lines.
+
+    Returns
+    -------
+    legs (list)
+        List of `OrderLeg`
+    """
+    reader = csv.DictReader(lines)
+    if reader.fieldnames is None:
+        raise Exception("Order legs csv is empty")
+    header = [name.strip().lower() for name in reader.fieldnames]
+    missing = [name for name in REQUIRED_ORDER_COLUMNS if name not in header]
+    if missing:
+        raise Exception(f"Order legs csv is missing columns: {', '.join(missing)}")
+    reader.fieldnames = header
+
+    legs = []
+    # The header is line 1
+    for line, row in enumerate(reader, start=2):
+        try:
+            limit = (row.get("limit") or "").strip()
+            legs.append(OrderLeg(
+                account=row["account"].strip(),
+                symbol=row["symbol"].strip(),
+                side=row["side"].strip(),
+                quantity=float(row["quantity"]),
+                limit=float(limit) if limit else None,
+            ))
+        except (ValueError, TypeError, AttributeError) as e:
+            raise Exception(f"Invalid order leg on line {line}: {e}")
+    return legs
+
+
+def plan_orders(legs: list) -> list:
+    """
+    Validates the legs and orders them so legs with the same symbol and side are next to each other.
+    This lets `transaction` reuse the order ticket between them. Otherwise the given order is kept.
+
+    Parameters
+    ----------
+    legs (list)
+        `OrderLeg` or dictionaries that `OrderLeg.from_dict` accepts
+
+    Returns
+    -------
+    legs (list)
+        List of `OrderLeg`
+    """
+    legs = [OrderLeg.from_dict(leg) for leg in legs]
+    first_seen = {}
+    for i, leg in enumerate(legs):
+        first_seen.setdefault((leg.symbol, leg.side), i)
+    return sorted(legs, key=lambda leg: first_seen[(leg.symbol, leg.side)])
+
+
+def new_order_result(leg: OrderLeg) -> dict:
+    """
+    The result of one leg of a batch. Filled in as the batch runs.
+    ```
+    {
+        'leg': OrderLeg: The order
+        'previewed': bool: If the preview showed no errors
+        'placed': bool: If the order was received by fidelity
+        'error': str: The error from the preview or placing the order. None if there wasn't one
+    }
+    ```
+    """
+    return {"leg": leg, "previewed": False, "placed": False, "error": None}
+
+
+def format_order_preview(results: list) -> str:
+    """
+    Makes a table of the results of a batch for printing.
+
+    Parameters
+    ----------
+    results (list)
+        The results from `batch_orders`. See `new_order_result`
+
+    Returns
+    -------
+    table (str)
+    """
+    lines = [f"{'Account':<12} {'Side':<5} {'Symbol':<8} {'Quantity':>10} {'Limit':>10}  Status"]
+    for result in results:
+        leg = result["leg"]
+        if result["placed"]:
+            status = "Placed"
+        elif result["error"] is not None:
+            status = f"Error: {result['error']}"
+        elif result["previewed"]:
+            status = "Ready"
+        else:
+            status = "Not run"
+        limit = f"{leg.limit:.4f}" if leg.limit is not None else "-"
+        lines.append(f"{leg.account:<12} {leg.side:<5} {leg.symbol:<8} {leg.quantity:>10g} {limit:>10}  {status}")
+    ready = sum(1 for result in results if result["previewed"])
+    lines.append(f"{ready} of {len(results)} orders passed preview")
+    return "\n".join(lines)
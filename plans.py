@@ -0,0 +1,449 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+from fidelityAPI import FidelityAutomation
+from orders import read_order_legs
+
+
+def _read_legs(path: str) -> list:
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        return read_order_legs(f)
+
+
+def _all_accounts(browser: FidelityAutomation) -> list:
+    accounts = browser.get_list_of_accounts()
+    if not accounts:
+        raise Exception("No accounts found")
+    return list(accounts)
+
+
+# What a plan step can do. Each action has the function that runs it on a logged in browser and the
+# types of the arguments it takes. Actions that ask for input while running are left out.
+PLAN_ACTIONS = {
+    "get_list_of_accounts": {
+        "run": lambda browser, **args: browser.get_list_of_accounts(**args),
+        "required": {},
+        "optional": {"get_withdrawal_bal": bool},
+    },
+    "get_account_info": {
+        "run": lambda browser, **args: browser.getAccountInfo(**args),
+        "required": {},
+        "optional": {"use_cache": bool},
+    },
+    "summary_holdings": {
+        "run": lambda browser: browser.summary_holdings(),
+        "required": {},
+        "optional": {},
+    },
+    "open_account": {
+        "run": lambda browser, type: browser.open_account(type=type),
+        "required": {"type": str},
+        "optional": {},
+    },
+    "provision_accounts": {
+        "run": lambda browser, **args: browser.provision_accounts(**args),
+        "required": {"type": str, "count": int},
+        "optional": {"transfer_amount": float, "source_account": str},
+    },
+    "nickname_account": {
+        "run": lambda browser, **args: browser.nickname_account(**args),
+        "required": {"account_number": str, "nickname": str},
+        "optional": {},
+    },
+    "nickname_accounts": {
+        "run": lambda browser, mapping: browser.nickname_accounts(mapping),
+        "required": {"mapping": dict},
+        "optional": {},
+    },
+    "enable_pennystock_trading": {
+        "run": lambda browser, account: browser.enable_pennystock_trading(account),
+        "required": {"account": str},
+        "optional": {},
+    },
+    "enable_all_pennystock_trading": {
+        "run": lambda browser, **args: browser.enable_all_pennystock_trading(**args),
+        "required": {},
+        "optional": {"max_pages": int},
+    },
+    "transfer_acc_to_acc": {
+        "run": lambda browser, **args: browser.transfer_acc_to_acc(**args),
+        "required": {"source_account": str, "destination_account": str, "transfer_amount": float},
+        "optional": {},
+    },
+    "transfer_from_source_to_all_acc": {
+        "run": lambda browser, **args: browser.transfer_from_source_to_all_acc(**args),
+        "required": {"source_account": str, "transfer_amount": float},
+        "optional": {"max_pages": int},
+    },
+    "transaction": {
+        "run": lambda browser, **args: browser.transaction(**args),
+        "required": {"stock": str, "quantity": float, "action": str, "account": str},
+        "optional": {"dry": bool, "limit_price": float},
+    },
+    # Leaving out the accounts trades in all of them
+    "bulk_transaction": {
+        "run": lambda browser, accounts=None, **args: browser.bulk_transaction(
+            accounts=accounts if accounts is not None else _all_accounts(browser), **args
+        ),
+        "required": {"stock": str, "quantity": float, "action": str},
+        "optional": {"accounts": list, "dry": bool, "max_pages": int},
+    },
+    # Orders from a csv of order legs. Everything that passes preview is placed
+    "batch_orders": {
+        "run": lambda browser, path, **args: browser.batch_orders(_read_legs(path), **args),
+        "required": {"path": str},
+        "optional": {"dry": bool, "max_pages": int},
+    },
+}
+
+
+def convert_arg(name: str, value, kind: type):
+    """
+    Converts a plan argument to the type its action takes. Text like the values given on the command line
+    is parsed. Ex: `"false"` -> `False`, `"Z1,Z2"` -> `["Z1", "Z2"]`, `"Z1=Roth 1,Z2=Roth 2"` -> `{"Z1": "Roth 1", "Z2": "Roth 2"}`
+    """
+    try:
+        if kind is bool:
+            if isinstance(value, bool):
+                return value
+            if str(value).strip().lower() in ("true", "yes", "y", "1"):
+                return True
+            if str(value).strip().lower() in ("false", "no", "n", "0"):
+                return False
+            raise ValueError(f"not a yes or no: {value!r}")
+        if kind is list:
+            if isinstance(value, str):
+                return [item.strip() for item in value.split(",") if item.strip()]
+            return [str(item) for item in value]
+        if kind is dict:
+            if isinstance(value, str):
+                pairs = [item.split("=", 1) for item in value.split(",") if item.strip()]
+                if any(len(pair) != 2 for pair in pairs):
+                    raise ValueError(f"not key=value pairs: {value!r}")
+                return {key.strip(): item.strip() for key, item in pairs}
+            return {str(key): str(item) for key, item in dict(value).items()}
+        if kind is str:
+            return str(value)
+        if isinstance(value, bool):
+            raise ValueError(f"not a number: {value!r}")
+        return kind(value)
+    except (TypeError, ValueError) as e:
+        raise Exception(f"Invalid value for {name}: {e}")
+
+
+class PlanStep:
+    """
+    One step of a plan. Arguments are checked against the action when the step is made.
+
+    Parameters
+    ----------
+    id (str)
+        The name other steps use to depend on this one
+    action (str)
+        One of `PLAN_ACTIONS`
+    args (dict)
+        The arguments of the action
+    after (list)
+        The ids of the steps that must succeed before this one starts
+    parallel (bool)
+        Run on a separate browser session, at the same time as other steps that are ready.
+        Steps without it run one after another on the main browser
+    """
+
+    __slots__ = ("id", "action", "args", "after", "parallel")
+
+    def __init__(self, id: str, action: str, args: dict = None, after: list = None, parallel: bool = False) -> None:
+        if action not in PLAN_ACTIONS:
+            raise Exception(f"Unknown action in step {id}: {action}")
+        spec = PLAN_ACTIONS[action]
+        args = dict(args or {})
+        missing = [name for name in spec["required"] if name not in args]
+        if missing:
+            raise Exception(f"Step {id} is missing arguments: {', '.join(missing)}")
+        kinds = {**spec["required"], **spec["optional"]}
+        unknown = [name for name in args if name not in kinds]
+        if unknown:
+            raise Exception(f"Step {id} has unknown arguments: {', '.join(unknown)}")
+
+        self.id: str = str(id)
+        self.action: str = action
+        self.args: dict = {name: convert_arg(name, value, kinds[name]) for name, value in args.items()}
+        self.after: list = [str(step_id) for step_id in (after or [])]
+        self.parallel: bool = convert_arg("parallel", parallel, bool)
+
+    @classmethod
+    def from_dict(cls, step: dict, default_id: str) -> "PlanStep":
+        """Creates a step from a plan file entry. Steps without an id get `default_id`"""
+        if not isinstance(step, dict) or "action" not in step:
+            raise Exception(f"Step {step.get('id', default_id) if isinstance(step, dict) else default_id} needs an action")
+        after = step.get("after", [])
+        return cls(
+            id=step.get("id", default_id),
+            action=step["action"],
+            args=step.get("args"),
+            after=[after] if isinstance(after, str) else after,
+            parallel=step.get("parallel", False),
+        )
+
+    def to_dict(self) -> dict:
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def __repr__(self) -> str:
+        return f"PlanStep(id={self.id!r}, action={self.action!r}, after={self.after}, parallel={self.parallel})"
+
+
+def order_steps(steps: list) -> list:
+    """
+    Checks the dependencies of a plan and puts the steps in an order where every step comes after the ones
+    it depends on. Steps keep their given order otherwise.
+
+    Returns
+    -------
+    steps (list)
+        List of `PlanStep`
+    """
+    by_id = {}
+    for step in steps:
+        if step.id in by_id:
+            raise Exception(f"Two steps have the id {step.id}")
+        by_id[step.id] = step
+    for step in steps:
+        for step_id in step.after:
+            if step_id not in by_id:
+                raise Exception(f"Step {step.id} depends on unknown step {step_id}")
+
+    ordered = []
+    placed = set()
+    while len(ordered) < len(steps):
+        ready = [step for step in steps if step.id not in placed and all(step_id in placed for step_id in step.after)]
+        if not ready:
+            stuck = [step.id for step in steps if step.id not in placed]
+            raise Exception(f"Steps depend on each other in a loop: {', '.join(stuck)}")
+        for step in ready:
+            ordered.append(step)
+            placed.add(step.id)
+    return ordered
+
+
+def load_plan(path: str) -> list:
+    """
+    Reads a plan from a json file, or a yaml file if PyYAML is installed. The plan is a list of steps,
+    or an object with the list under "steps". Each step looks like:
+    ```
+    {
+        'id': str: Optional. Defaults to 'step<number>'
+        'action': str: One of `PLAN_ACTIONS`
+        'args': dict: The arguments of the action
+        'after': list: Ids of steps that must succeed first
+        'parallel': bool: Run on a separate session alongside other steps
+    }
+    ```
+
+    Returns
+    -------
+    steps (list)
+        List of `PlanStep` in dependency order
+    """
+    with open(path, encoding="utf-8") as f:
+        if path.lower().endswith((".yaml", ".yml")):
+            if yaml is None:
+                raise Exception("Reading yaml plans needs PyYAML. Install it with: pip install pyyaml")
+            plan = yaml.safe_load(f)
+        else:
+            plan = json.load(f)
+    if isinstance(plan, dict):
+        plan = plan.get("steps")
+    if not isinstance(plan, list):
+        raise Exception("A plan must be a list of steps")
+    return order_steps([PlanStep.from_dict(step, f"step{i + 1}") for i, step in enumerate(plan)])
+
+
+def parse_step_args(step_args: list) -> list:
+    """
+    Makes a plan from steps given on the command line. Each step is a list of the action followed by
+    `name=value` arguments. Ex: `["transaction", "stock=AAPL", "quantity=1", "action=buy", "account=Z12345678"]`
+    Each step runs after the one before it.
+
+    Returns
+    -------
+    steps (list)
+        List of `PlanStep`
+    """
+    steps = []
+    for i, (action, *pairs) in enumerate(step_args):
+        args = {}
+        for pair in pairs:
+            name, sep, value = pair.partition("=")
+            if not sep:
+                raise Exception(f"Arguments must look like name=value, got {pair!r}")
+            args[name.strip()] = value
+        steps.append(PlanStep(f"step{i + 1}", action, args, after=[steps[-1].id] if steps else []))
+    return steps
+
+
+def step_succeeded(value) -> bool:
+    """
+    Works out if an action went through from what it returned. `False`, `None` and empty dictionaries or
+    lists are failures, `(success, error)` tuples are checked, and so are dictionaries of them like
+    `bulk_transaction` returns. Ex: `enable_all_pennystock_trading` returns `{}` if it couldn't get started
+    """
+    if value is None or value is False:
+        return False
+    if isinstance(value, (dict, list)) and not value:
+        return False
+    if isinstance(value, tuple) and value and isinstance(value[0], bool):
+        return value[0]
+    if isinstance(value, dict) and all(isinstance(item, tuple) for item in value.values()):
+        return all(step_succeeded(item) for item in value.values())
+    if isinstance(value, list) and all(isinstance(item, dict) and "placed" in item for item in value):
+        return all(item["placed"] or item["error"] is None for item in value)
+    if isinstance(value, list) and all(isinstance(item, dict) and "opened" in item for item in value):
+        return all(item["opened"] and item["enabled"] and item["funded"] is not False for item in value)
+    return True
+
+
+def run_step(browser: FidelityAutomation, step: PlanStep) -> dict:
+    """
+    Runs one step on a browser.
+
+    Returns
+    -------
+    result (dict)
+        ```
+        {
+            'id': str: The step id
+            'action': str: The step action
+            'status': str: 'done', 'failed' or 'skipped'
+            'error': str: What went wrong. None if done
+            'elapsed': float: Seconds the step took
+        }
+        ```
+    """
+    result = {"id": step.id, "action": step.action, "status": "failed", "error": None, "elapsed": 0.0}
+    start = time.perf_counter()
+    try:
+        value = PLAN_ACTIONS[step.action]["run"](browser, **step.args)
+        if step_succeeded(value):
+            result["status"] = "done"
+        else:
+            result["error"] = f"{step.action} did not succeed"
+    except Exception as e:
+        result["error"] = str(e)
+    result["elapsed"] = time.perf_counter() - start
+    return result
+
+
+def _run_on_side_session(browser: FidelityAutomation, storage_state: dict, step: PlanStep) -> dict:
+    """
+    Runs a step on a new browser that shares the logged in session, caches, journal and profiler of `browser`.
+    Made and closed on the calling thread.
+    """
+    side = FidelityAutomation(
+        headless=browser.headless,
+        save_state=False,
+        cache=browser.cache,
+        storage_state=storage_state,
+        block_resources=browser.resource_blocker.profile,
+        quote_cache=browser.quotes,
+        journal=browser.journal,
+        profiler=browser.profiler,
+    )
+    side.username = browser.username
+    side.source_account = browser.source_account
+    try:
+        return run_step(side, step)
+    finally:
+        side.close_browser()
+
+
+def run_plan(browser: FidelityAutomation, steps: list, max_sessions: int = 2) -> list:
+    """
+    Runs the steps of a plan on a logged in browser. A step starts as soon as every step it depends on is done,
+    and is skipped if one of them failed. Steps marked parallel run on separate sessions of their own (up to
+    `max_sessions` at once), at the same time as each other and as the other steps, which run one at a time
+    on `browser`.
+
+    Parameters
+    ----------
+    browser (FidelityAutomation)
+        The logged in browser
+    steps (list)
+        List of `PlanStep`. See `load_plan`
+    max_sessions (int)
+        The max number of parallel steps running at once
+
+    Returns
+    -------
+    results (list)
+        The result of each step, in the order from `order_steps`. See `run_step`
+    """
+    steps = order_steps(steps)
+    results = {}
+    running = {}
+
+    def ready(step):
+        return step.id not in results and step.id not in running.values() and all(
+            step_id in results for step_id in step.after
+        )
+
+    def collect(futures):
+        for future in futures:
+            step_id = running.pop(future)
+            try:
+                results[step_id] = future.result()
+            except Exception as e:
+                # The side session itself failed to start or close
+                results[step_id] = {"id": step_id, "action": None, "status": "failed", "error": str(e), "elapsed": 0.0}
+
+    with ThreadPoolExecutor(max_workers=max(1, max_sessions)) as executor:
+        while len(results) < len(steps):
+            # Pick up the side sessions that finished
+            collect([future for future in running if future.done()])
+            progressed = False
+            for step in steps:
+                if not ready(step):
+                    continue
+                # Don't start steps whose dependencies didn't go through
+                failed = [step_id for step_id in step.after if results[step_id]["status"] != "done"]
+                if failed:
+                    results[step.id] = {"id": step.id, "action": step.action, "status": "skipped",
+                                        "error": f"Depends on {', '.join(failed)}", "elapsed": 0.0}
+                    progressed = True
+                elif step.parallel and len(running) < max(1, max_sessions):
+                    print(f"\nStarting {step.id} ({step.action}) on its own session...")
+                    # The storage state has to be read on this thread
+                    running[executor.submit(_run_on_side_session, browser, browser.context.storage_state(), step)] = step.id
+                    progressed = True
+            if progressed:
+                continue
+
+            # Run one step on the main browser while the side sessions work
+            serial = next((step for step in steps if ready(step) and not step.parallel), None)
+            if serial is not None:
+                print(f"\nRunning {serial.id} ({serial.action})...")
+                results[serial.id] = run_step(browser, serial)
+                continue
+
+            # Nothing else can start until a side session finishes
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            collect(done)
+
+    return [results[step.id] for step in steps]
+
+
+def format_plan_results(results: list) -> str:
+    """Makes a table of the results of `run_plan` for printing"""
+    lines = [f"{'Step':<16} {'Action':<32} {'Status':<8} {'Seconds':>8}  Error"]
+    for result in results:
+        lines.append(
+            f"{result['id']:<16} {str(result['action']):<32} {result['status']:<8} {result['elapsed']:>8.1f}  {result['error'] or ''}"
+        )
+    done = sum(1 for result in results if result["status"] == "done")
+    lines.append(f"{done} of {len(results)} steps done")
+    return "\n".join(lines)
@@ -0,0 +1,186 @@
+try:
+    import numpy as np
+except ImportError:
+    # NumPy is only needed for the array rollups
+    np = None
+
+
+class PortfolioIndex:
+    """
+    Running totals of every position in `account_dict`, kept up to date as positions are added so
+    lookups don't have to walk every account and every stock.
+
+    Kept by `FidelityAccountData`. Holds:
+        ticker -> account -> [quantity, value]
+        account -> ticker -> [quantity, value]
+        ticker -> [quantity, value, last_price] across all accounts
+    """
+
+    def __init__(self) -> None:
+        self._by_ticker: dict = {}
+        self._by_account: dict = {}
+        self._totals: dict = {}
+
+    def add(self, account_num: str, position) -> None:
+        """
+        Adds a position held in an account.
+
+        Parameters
+        ----------
+        account_num (str)
+            The account the position is in
+        position (Position)
+            The position to add. See `models.Position`
+        """
+        ticker = position.ticker
+        quantity = position.quantity
+        value = position.value
+
+        # Per account
+        held = self._by_account.setdefault(account_num, {})
+        if ticker in held:
+            held[ticker][0] += quantity
+            held[ticker][1] += value
+        else:
+            held[ticker] = [quantity, value]
+            self._by_ticker.setdefault(ticker, {})[account_num] = held[ticker]
+
+        # Across all accounts. The first price seen is kept, same as `summary_holdings` always has
+        if ticker in self._totals:
+            self._totals[ticker][0] += quantity
+            self._totals[ticker][1] += value
+        else:
+            self._totals[ticker] = [quantity, value, position.last_price]
+
+    def remove_account(self, account_num: str) -> None:
+        """
+        Removes every position held in an account. Used when an account's stocks are replaced.
+        """
+        held = self._by_account.pop(account_num, None)
+        if held is None:
+            return
+        for ticker, (quantity, value) in held.items():
+            holders = self._by_ticker[ticker]
+            del holders[account_num]
+            if not holders:
+                # Nobody holds it anymore
+                del self._by_ticker[ticker]
+                del self._totals[ticker]
+            else:
+                self._totals[ticker][0] -= quantity
+                self._totals[ticker][1] -= value
+
+    def clear(self) -> None:
+        """Removes everything"""
+        self._by_ticker.clear()
+        self._by_account.clear()
+        self._totals.clear()
+
+    def rebuild(self, account_dict: dict) -> None:
+        """
+        Rebuilds the index from scratch. Only needed if `account_dict` was changed without going through
+        `FidelityAccountData`.
+        """
+        self.clear()
+        for account_num, account in account_dict.items():
+            for position in account["stocks"]:
+                self.add(account_num, position)
+
+    def __contains__(self, ticker: str) -> bool:
+        return ticker in self._totals
+
+    def __len__(self) -> int:
+        return len(self._totals)
+
+    def tickers(self) -> list:
+        """Returns the tickers held in any account"""
+        return list(self._totals)
+
+    def accounts_holding(self, ticker: str) -> list:
+        """
+        Returns the account numbers that hold a ticker. Empty if none do.
+        """
+        return list(self._by_ticker.get(ticker, ()))
+
+    def exposure(self, ticker: str) -> dict:
+        """
+        Total exposure to a ticker across all accounts.
+
+        Returns
+        -------
+        exposure (dict)
+            `{'quantity': float, 'value': float, 'accounts': int}`. All zero if the ticker isn't held.
+        """
+        if ticker not in self._totals:
+            return {"quantity": 0.0, "value": 0.0, "accounts": 0}
+        quantity, value, _ = self._totals[ticker]
+        return {"quantity": quantity, "value": value, "accounts": len(self._by_ticker[ticker])}
+
+    def holdings(self, account_num: str) -> dict:
+        """
+        Returns the quantity of each ticker held in an account, or None if the account has no positions.
+        """
+        held = self._by_account.get(account_num)
+        if held is None:
+            return None
+        return {ticker: quantity for ticker, (quantity, _) in held.items()}
+
+    def summary(self) -> dict:
+        """
+        Every ticker held across all accounts, laid out the same as `FidelityAccountData.summary_holdings`.
+        """
+        return {
+            ticker: {"quantity": quantity, "last_price": last_price, "value": value}
+            for ticker, (quantity, value, last_price) in self._totals.items()
+        }
+
+    def to_arrays(self) -> tuple:
+        """
+        The book as dense NumPy arrays for vectorized rollups. Requires NumPy.
+
+        Returns
+        -------
+        accounts (list)
+            The account numbers, in row order
+        tickers (list)
+            The tickers, in column order
+        quantities (numpy.ndarray)
+            `len(accounts) x len(tickers)` array of the quantity held
+        values (numpy.ndarray)
+            `len(accounts) x len(tickers)` array of the value held
+        """
+        if np is None:
+            raise Exception("NumPy is required for array rollups. Install it with `pip install numpy`")
+        accounts = list(self._by_account)
+        tickers = list(self._totals)
+        column = {ticker: i for i, ticker in enumerate(tickers)}
+        quantities = np.zeros((len(accounts), len(tickers)))
+        values = np.zeros((len(accounts), len(tickers)))
+        for row, account_num in enumerate(accounts):
+            for ticker, (quantity, value) in self._by_account[account_num].items():
+                quantities[row, column[ticker]] = quantity
+                values[row, column[ticker]] = value
+        return accounts, tickers, quantities, values
+
+    def account_values(self, prices: dict = None) -> dict:
+        """
+        Total value of each account, computed with NumPy. Requires NumPy.
+
+        Parameters
+        ----------
+        prices (dict)
+            Optional ticker -> price. Tickers in here are revalued at this price instead of using their last value.
+
+        Returns
+        -------
+        account_values (dict)
+            account number -> total value of its positions
+        """
+        accounts, tickers, quantities, values = self.to_arrays()
+        if prices:
+            # Revalue the columns we have a price for in one go
+            columns = [i for i, ticker in enumerate(tickers) if ticker in prices]
+            if columns:
+                new_prices = np.array([prices[tickers[i]] for i in columns], dtype=float)
+                values[:, columns] = quantities[:, columns] * new_prices
+        return dict(zip(accounts, values.sum(axis=1).tolist()))
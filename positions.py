@@ -0,0 +1,113 @@
+import csv
+import re
+import typing
+
+# Columns the positions csv from fidelity must have
+REQUIRED_POSITION_COLUMNS = [
+    "Account Number",
+    "Account Name",
+    "Symbol",
+    "Description",
+    "Quantity",
+    "Last Price",
+    "Current Value",
+]
+
+# Everything that has to be removed from a number in the csv. Ex: `-$1,234.56` -> `1234.56`
+# The sign is dropped on purpose, positions are reported as absolute values
+_NUMERIC_CLEANER = re.compile(r"[$,\-]")
+
+
+class PositionRecord(typing.NamedTuple):
+    """
+    A single row of the positions csv after conversion
+    """
+    account_number: str
+    account_name: str
+    ticker: str
+    quantity: float
+    last_price: float
+    value: float
+
+
+def _to_float(text: str) -> float:
+    """Converts already cleaned text to a float. Anything that isn't a number is 0"""
+    try:
+        return float(text)
+    except ValueError:
+        return 0.0
+
+
+def parse_positions_csv(lines: typing.Iterable[str]) -> typing.Iterator[PositionRecord]:
+    """
+    Parses the positions csv downloaded from fidelity one row at a time.
+    Rows that aren't real positions are skipped the same way `getAccountInfo` always has:
+    empty rows, Fidelity managed accounts (starting with 'Y'), pending activity, and rows without a value.
+    Parsing stops at the disclaimers at the bottom of the file.
+
+    Parameters
+    ----------
+    lines (Iterable[str])
+        The csv text. An open file (with newline="") or any iterable of lines, read lazily.
+
+    Returns
+    -------
+    records (Iterator[PositionRecord])
+        A typed record for each position, yielded as soon as its row is read
+    """
+    reader = csv.reader(lines)
+    try:
+        header = next(reader)
+    except StopIteration:
+        raise Exception("Not enough elements in fidelity positions csv")
+    # Drop the byte order mark if the text wasn't decoded with utf-8-sig
+    if header:
+        header[0] = header[0].lstrip("\ufeff")
+
+    # Ensure all fields we want are present
+    columns = {name: i for i, name in enumerate(header)}
+    if any(name not in columns for name in REQUIRED_POSITION_COLUMNS):
+        raise Exception("Not enough elements in fidelity positions csv")
+    account_col = columns["Account Number"]
+    name_col = columns["Account Name"]
+    symbol_col = columns["Symbol"]
+    quantity_col = columns["Quantity"]
+    price_col = columns["Last Price"]
+    value_col = columns["Current Value"]
+    width = max(account_col, name_col, symbol_col, quantity_col, price_col, value_col) + 1
+
+    clean = _NUMERIC_CLEANER.sub
+    for row in reader:
+        # Skip empty rows
+        if not row or not row[account_col]:
+            continue
+        account_number = row[account_col]
+        # Last couple of rows have some disclaimers, filter those out
+        if "and" in account_number:
+            break
+        # Skip short rows and accounts that start with 'Y' (Fidelity managed)
+        if len(row) < width or account_number[0] == "Y":
+            continue
+
+        ticker = row[symbol_col]
+        # Don't include this if present
+        if "Pending" in ticker:
+            continue
+        val = clean("", row[value_col])
+        # If the value isn't present, move to next row
+        if len(val) == 0:
+            continue
+        last_price = clean("", row[price_col])
+        quantity = clean("", row[quantity_col])
+
+        value = _to_float(val)
+        yield PositionRecord(
+            account_number=account_number,
+            account_name=row[name_col],
+            ticker=ticker,
+            # If the quantity is missing set it to 1 (For SPAXX or any other cash position)
+            quantity=_to_float(quantity) if quantity else 1.0,
+            # If the last price isn't available, just use the current value
+            last_price=_to_float(last_price) if last_price else value,
+            value=value,
+        )
@@ -0,0 +1,178 @@
+import csv
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
+
+class Profiler:
+    """
+    Records how long each step of a session takes: how many times it ran, total, average and longest
+    duration, and how many times it timed out or raised. Steps are timed with `step` or the `timed`
+    decorator, and page navigations are timed from the browser's own request timing with `watch_navigations`.
+
+    Nested steps are timed separately, so a method's time includes the waits inside it.
+    """
+
+    def __init__(self) -> None:
+        self._steps: dict = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float, timed_out: bool = False, failed: bool = False) -> None:
+        """
+        Records one run of a step.
+
+        Parameters
+        ----------
+        name (str)
+            The name of the step
+        seconds (float)
+            How long it took
+        timed_out (bool)
+            If it ended with a playwright timeout
+        failed (bool)
+            If it ended with any other exception
+        """
+        with self._lock:
+            stats = self._steps.get(name)
+            if stats is None:
+                stats = self._steps[name] = {"count": 0, "total": 0.0, "max": 0.0, "timeouts": 0, "errors": 0}
+            stats["count"] += 1
+            stats["total"] += seconds
+            stats["max"] = max(stats["max"], seconds)
+            stats["timeouts"] += timed_out
+            stats["errors"] += failed
+
+    @contextmanager
+    def step(self, name: str):
+        """
+        Times the body of a `with` block as a step. Exceptions are counted and passed on.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        except PlaywrightTimeoutError:
+            self.add(name, time.perf_counter() - start, timed_out=True)
+            raise
+        except Exception:
+            self.add(name, time.perf_counter() - start, failed=True)
+            raise
+        self.add(name, time.perf_counter() - start)
+
+    def watch_navigations(self, context):
+        """
+        Times every page load (goto, reload, link) in a sync or async `BrowserContext` as the step
+        "navigation <path>", using the timing the browser measured for the document request.
+
+        Returns
+        -------
+        listener
+            The event handler. Pass it to `context.remove_listener("requestfinished", listener)` to stop timing,
+            like before a pooled context is handed to another session
+        """
+        def record(request):
+            if request.resource_type != "document":
+                return
+            timing = request.timing
+            # responseEnd is in milliseconds from the request's start
+            if timing and timing.get("responseEnd", -1) >= 0:
+                path = request.url.split("?")[0].split("fidelity.com")[-1]
+                self.add(f"navigation {path}", timing["responseEnd"] / 1000)
+
+        context.on("requestfinished", record)
+        return record
+
+    def to_dict(self) -> dict:
+        """
+        Returns the stats of every step, slowest total first.
+        ```
+        {
+            'step name': {'count': int, 'total': float, 'average': float, 'max': float, 'timeouts': int, 'errors': int}
+        }
+        ```
+        """
+        with self._lock:
+            steps = sorted(self._steps.items(), key=lambda item: item[1]["total"], reverse=True)
+            return {
+                name: {
+                    "count": stats["count"],
+                    "total": round(stats["total"], 4),
+                    "average": round(stats["total"] / stats["count"], 4),
+                    "max": round(stats["max"], 4),
+                    "timeouts": stats["timeouts"],
+                    "errors": stats["errors"],
+                }
+                for name, stats in steps
+            }
+
+    def summary(self) -> str:
+        """A table of every step, slowest total first"""
+        lines = [f"{'Step':<48} {'Count':>6} {'Total s':>9} {'Avg s':>8} {'Max s':>8} {'Timeouts':>9} {'Errors':>7}"]
+        for name, stats in self.to_dict().items():
+            lines.append(
+                f"{name[:48]:<48} {stats['count']:>6} {stats['total']:>9.2f} {stats['average']:>8.2f} "
+                f"{stats['max']:>8.2f} {stats['timeouts']:>9} {stats['errors']:>7}"
+            )
+        return "\n".join(lines)
+
+    def write(self, directory: str, name: str = "fidelity_profile") -> tuple:
+        """
+        Writes the stats as `<name>.json` and `<name>.csv` in a directory.
+
+        Returns
+        -------
+        paths (tuple)
+            The json path and csv path
+        """
+        os.makedirs(directory, exist_ok=True)
+        steps = self.to_dict()
+        json_path = os.path.join(directory, f"{name}.json")
+        with open(json_path, "w") as f:
+            json.dump(steps, f, indent=2)
+        csv_path = os.path.join(directory, f"{name}.csv")
+        with open(csv_path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["step", "count", "total", "average", "max", "timeouts", "errors"])
+            for step, stats in steps.items():
+                writer.writerow([step, stats["count"], stats["total"], stats["average"], stats["max"], stats["timeouts"], stats["errors"]])
+        return json_path, csv_path
+
+
+def timed(name: str = None):
+    """
+    Decorator that times a method (sync or async) as a step of `self.profiler`.
+    Methods of objects without a profiler run untimed.
+
+    Parameters
+    ----------
+    name (str)
+        The step name. Defaults to the method name
+    """
+    def decorator(method):
+        step_name = name or method.__name__
+
+        if inspect.iscoroutinefunction(method):
+            @functools.wraps(method)
+            async def async_wrapper(self, *args, **kwargs):
+                profiler = getattr(self, "profiler", None)
+                if profiler is None:
+                    return await method(self, *args, **kwargs)
+                with profiler.step(step_name):
+                    return await method(self, *args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            profiler = getattr(self, "profiler", None)
+            if profiler is None:
+                return method(self, *args, **kwargs)
+            with profiler.step(step_name):
+                return method(self, *args, **kwargs)
+        return wrapper
+
+    return decorator
@@ -0,0 +1,65 @@
+import threading
+import time
+
+
+class QuoteCache:
+    """
+    Last prices by symbol, kept for a short time so orders for the same symbol placed seconds apart
+    don't each have to wait for and read the quote on the order ticket.
+
+    Safe to share between a `FidelityAutomation` and the `AsyncFidelityAutomation` it runs work on.
+
+    Parameters
+    ----------
+    ttl (float)
+        Seconds a price is used for after it was read. 0 turns the cache off.
+    """
+
+    def __init__(self, ttl: float = 5.0) -> None:
+        self.ttl: float = ttl
+        self._quotes: dict = {}
+        self._lock = threading.Lock()
+        self.stats: dict = {
+            "hits": 0,
+            "misses": 0,
+            "stores": 0,
+        }
+
+    def get(self, symbol: str) -> float:
+        """
+        Gets the last price of a symbol if it was read within the ttl.
+
+        Returns
+        -------
+        last_price (float)
+            None if missing or stale
+        """
+        symbol = symbol.upper()
+        with self._lock:
+            quote = self._quotes.get(symbol)
+            if quote is not None and time.monotonic() - quote[1] <= self.ttl:
+                self.stats["hits"] += 1
+                return quote[0]
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, symbol: str, last_price: float) -> None:
+        """Saves the last price of a symbol"""
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._quotes[symbol.upper()] = (last_price, time.monotonic())
+            self.stats["stores"] += 1
+
+    def invalidate(self, symbol: str = None) -> None:
+        """Forgets the price of a symbol, or of every symbol if none is given"""
+        with self._lock:
+            if symbol is None:
+                self._quotes.clear()
+            else:
+                self._quotes.pop(symbol.upper(), None)
+
+    def hit_rate(self) -> float:
+        """The share of lookups that were answered from the cache"""
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / lookups if lookups else 0.0
@@ -0,0 +1,137 @@
+import itertools
+
+# Every kind of loading sign found on fidelity's pages
+SPINNER_SELECTORS = [
+    "div:nth-child(2) > .loading-spinner-mask-after",
+    ".pvd-spinner__mask-inner",
+    "pvd-loading-spinner",
+]
+
+# How each kind of page tells us it is ready. Every profile waits for all spinners to be hidden, then:
+#   load_state (str): A playwright load state to wait for first. "networkidle" waits for the XHRs to settle
+#   ready_any (list): At least one of these selectors must be present. Empty means no requirement
+#   ready_url (str): Being on a url containing this also counts as ready
+#   ready_text (list): [selector, text] pairs. An element matching the selector that contains the text
+#       also counts as ready. For things only their text tells apart, like a button or heading
+#   changed (str): A selector whose text must differ from the `previous` text given to the wait.
+#       For content that is already on the page and only gets replaced, like a balance
+#   settle_ms (int): How long the page must stay ready before returning. Catches spinners that
+#       disappear and then come right back
+READINESS_PROFILES = {
+    "default": {
+        "load_state": None,
+        "ready_any": [],
+        "ready_url": None,
+        "ready_text": [],
+        "changed": None,
+        "settle_ms": 0,
+    },
+    # After pressing log in there are two spinners in a row with a short gap, then either the summary
+    # or the 2FA widget. Settling for longer than the gap keeps us from returning between them
+    "login": {
+        "load_state": None,
+        "ready_any": ["#dom-widget div"],
+        "ready_url": "portfolio/summary",
+        "ready_text": [],
+        "changed": None,
+        "settle_ms": 500,
+    },
+    # The transfer page is ready when the dropdowns have their accounts
+    "transfer": {
+        "load_state": None,
+        "ready_any": ["select option[value]:not([value=''])"],
+        "ready_url": None,
+        "ready_text": [],
+        "changed": None,
+        "settle_ms": 0,
+    },
+    # After picking an account the balance of the last account is replaced with the new one's
+    "transfer_balance": {
+        "load_state": None,
+        "ready_any": ["tr.pvd-table__row:nth-child(2) > td:nth-child(2)"],
+        "ready_url": None,
+        "ready_text": [],
+        "changed": "tr.pvd-table__row:nth-child(2) > td:nth-child(2)",
+        "settle_ms": 100,
+    },
+    "features": {
+        "load_state": "domcontentloaded",
+        "ready_any": ["[aria-label='Manage Penny Stock Trading']"],
+        "ready_url": None,
+        "ready_text": [],
+        "changed": None,
+        "settle_ms": 0,
+    },
+    # The penny stock pages load the account list with an XHR after the spinners are gone. Ready once
+    # the Start button, the account selection or the terms to accept are shown
+    "pennystock": {
+        "load_state": "domcontentloaded",
+        "ready_any": [".pvd-checkbox__label"],
+        "ready_url": None,
+        "ready_text": [["button", "Start"], ["h1, h2, h3", "Select an account"]],
+        "changed": None,
+        "settle_ms": 250,
+    },
+}
+
+# Runs in the page. Returns true once no spinner is visible and the profile's ready condition
+# has held for settle_ms. State is kept per wait in window.__fidReady so waits don't share timers
+READY_PREDICATE = """
+(args) => {
+    const visible = (el) => {
+        if (!el) return false;
+        const style = window.getComputedStyle(el);
+        return style.visibility !== 'hidden' && el.getClientRects().length > 0;
+    };
+    const state = (window.__fidReady = window.__fidReady || {});
+    const busy = args.spinners.some((sel) => visible(document.querySelector(sel)));
+    const onUrl = args.readyUrl !== null && window.location.href.includes(args.readyUrl);
+    const hasText = ([sel, text]) => Array.from(document.querySelectorAll(sel)).some((el) => el.textContent.includes(text));
+    const required = args.readyAny.length + args.readyText.length > 0;
+    const found = !required || args.readyAny.some((sel) => document.querySelector(sel) !== null) || args.readyText.some(hasText);
+    const changedEl = args.changed === null ? null : document.querySelector(args.changed);
+    const changed = args.changed === null || (changedEl !== null && changedEl.innerText.trim() !== args.previous);
+    if (busy || !(found || onUrl) || !changed) {
+        delete state[args.token];
+        return false;
+    }
+    if (state[args.token] === undefined) {
+        state[args.token] = performance.now();
+    }
+    return performance.now() - state[args.token] >= args.settleMs;
+}
+"""
+
+_tokens = itertools.count()
+
+
+def get_readiness_profile(profile: str) -> dict:
+    """
+    Returns the readiness profile with the given name. See `READINESS_PROFILES`
+    """
+    if profile not in READINESS_PROFILES:
+        raise Exception(f"Unknown readiness profile: {profile}")
+    return READINESS_PROFILES[profile]
+
+
+def ready_predicate_args(profile: dict, previous: str = None) -> dict:
+    """
+    Builds the argument passed to `READY_PREDICATE` for one wait.
+
+    Parameters
+    ----------
+    profile (dict)
+        See `READINESS_PROFILES`
+    previous (str)
+        The text the profile's `changed` element had before the action being waited on. Ignored without one
+    """
+    return {
+        "spinners": SPINNER_SELECTORS,
+        "readyAny": profile["ready_any"],
+        "readyUrl": profile["ready_url"],
+        "readyText": profile["ready_text"],
+        "changed": profile["changed"] if previous is not None else None,
+        "previous": (previous or "").strip(),
+        "settleMs": profile["settle_ms"],
+        "token": f"wait{next(_tokens)}",
+    }
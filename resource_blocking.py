@@ -0,0 +1,175 @@
+from urllib.parse import urlsplit
+
+# Hosts that belong to fidelity. Anything else is third party
+FIRST_PARTY_HOST_SUFFIXES = ("fidelity.com", "fmr.com")
+
+# What each profile lets through. Pages (documents) and the XHRs that fill them are never blocked.
+#   block_types (list): Playwright resource types to abort
+#   block_third_party (bool): Abort everything not from a first party host (analytics, ads, chat widgets, etc.)
+#   allow_hosts (list): Third party hosts to let through anyway
+RESOURCE_PROFILES = {
+    # Route nothing. No handler is installed so there is no overhead at all
+    "none": {
+        "block_types": [],
+        "block_third_party": False,
+        "allow_hosts": [],
+    },
+    # Used while logging in. Third party scripts are kept since the login page's device checks may rely on them
+    "login": {
+        "block_types": ["image", "media", "font", "imageset", "texttrack"],
+        "block_third_party": False,
+        "allow_hosts": [],
+    },
+    # Everything the automation reads or clicks still loads. Pictures, fonts, media and trackers don't
+    "lean": {
+        "block_types": ["image", "media", "font", "imageset", "texttrack", "beacon", "csp_report", "ping"],
+        "block_third_party": True,
+        "allow_hosts": [],
+    },
+    # Also drops stylesheets. Smaller still, but visibility checks can act differently without css,
+    # so only use it for flows that have been tried with it
+    "strict": {
+        "block_types": ["image", "media", "font", "imageset", "texttrack", "beacon", "csp_report", "ping", "stylesheet"],
+        "block_third_party": True,
+        "allow_hosts": [],
+    },
+}
+
+# Rough size of each kind of resource, used to estimate how much wasn't downloaded
+ESTIMATED_BYTES = {
+    "image": 25_000,
+    "imageset": 25_000,
+    "media": 250_000,
+    "font": 40_000,
+    "stylesheet": 30_000,
+    "script": 60_000,
+}
+DEFAULT_ESTIMATED_BYTES = 2_000
+
+
+def get_resource_profile(profile: str) -> dict:
+    """
+    Returns the resource profile with the given name. See `RESOURCE_PROFILES`
+    """
+    if profile not in RESOURCE_PROFILES:
+        raise Exception(f"Unknown resource profile: {profile}")
+    return RESOURCE_PROFILES[profile]
+
+
+def is_first_party(url: str) -> bool:
+    """If the url is served by fidelity"""
+    host = urlsplit(url).hostname or ""
+    return any(host == suffix or host.endswith("." + suffix) for suffix in FIRST_PARTY_HOST_SUFFIXES)
+
+
+class ResourceBlocker:
+    """
+    Aborts requests a page doesn't need to work, according to a profile in `RESOURCE_PROFILES`.
+    Install it on a context with `install` (sync) or `install_async`. The profile can be changed at any time,
+    it applies to the next request. If it was installed with the "none" profile nothing is routed at all.
+
+    Note that playwright turns off the browser's http cache for a context once it has a route handler.
+
+    Parameters
+    ----------
+    profile (str)
+        The name of the profile to use. See `RESOURCE_PROFILES`
+    """
+
+    def __init__(self, profile: str = "none") -> None:
+        self.profile: str = profile
+        # Check the name early
+        get_resource_profile(profile)
+        self.stats: dict = {
+            "requests_allowed": 0,
+            "requests_blocked": 0,
+            "estimated_bytes_saved": 0,
+            "blocked_by_type": {},
+        }
+
+    @property
+    def enabled(self) -> bool:
+        """If the profile blocks anything"""
+        rules = get_resource_profile(self.profile)
+        return bool(rules["block_types"]) or rules["block_third_party"]
+
+    def should_block(self, resource_type: str, url: str) -> bool:
+        """
+        Decides if a request is aborted under the current profile.
+
+        Parameters
+        ----------
+        resource_type (str)
+            The playwright resource type of the request. Ex: "image"
+        url (str)
+            The url requested
+
+        Returns
+        -------
+        True
+            If the request should be aborted
+        """
+        # Never break navigation
+        if resource_type == "document":
+            return False
+        rules = get_resource_profile(self.profile)
+        if resource_type in rules["block_types"]:
+            return True
+        if rules["block_third_party"] and not is_first_party(url):
+            host = urlsplit(url).hostname or ""
+            return host not in rules["allow_hosts"]
+        return False
+
+    def _count(self, resource_type: str, blocked: bool):
+        if not blocked:
+            self.stats["requests_allowed"] += 1
+            return
+        self.stats["requests_blocked"] += 1
+        self.stats["estimated_bytes_saved"] += ESTIMATED_BYTES.get(resource_type, DEFAULT_ESTIMATED_BYTES)
+        self.stats["blocked_by_type"][resource_type] = self.stats["blocked_by_type"].get(resource_type, 0) + 1
+
+    def handle(self, route):
+        """Route handler for the sync api"""
+        request = route.request
+        blocked = self.should_block(request.resource_type, request.url)
+        self._count(request.resource_type, blocked)
+        if blocked:
+            route.abort()
+        else:
+            route.continue_()
+
+    async def handle_async(self, route):
+        """Route handler for the async api"""
+        request = route.request
+        blocked = self.should_block(request.resource_type, request.url)
+        self._count(request.resource_type, blocked)
+        if blocked:
+            await route.abort()
+        else:
+            await route.continue_()
+
+    def install(self, context):
+        """
+        Routes every request of a sync `BrowserContext` through this blocker.
+        Any handler installed earlier (like on a context reused from a pool) is replaced.
+        Nothing is installed if the profile doesn't block anything.
+        """
+        context.unroute("**/*")
+        if self.enabled:
+            context.route("**/*", self.handle)
+
+    async def install_async(self, context):
+        """
+        Same as `install` for an async `BrowserContext`
+        """
+        await context.unroute("**/*")
+        if self.enabled:
+            await context.route("**/*", self.handle_async)
+
+    def summary(self) -> str:
+        """A one line description of what was blocked"""
+        return (
+            f"Blocked {self.stats['requests_blocked']} of "
+            f"{self.stats['requests_blocked'] + self.stats['requests_allowed']} requests "
+            f"(~{self.stats['estimated_bytes_saved'] / 1_000_000:.1f} MB saved)"
+        )
@@ -0,0 +1,182 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+from playwright.sync_api import BrowserContext, Error as PlaywrightError
+
+# A page that needs a logged in session. Fidelity redirects to the login page when the session is gone
+SESSION_PROBE_URL = "https://digital.fidelity.com/ftgw/digital/portfolio/summary"
+
+
+def write_private_json(path: str, data) -> None:
+    """
+    Writes json to a file only the current user can read. The file is written next to the target
+    and moved into place so a crash never leaves a half written file behind.
+
+    Parameters
+    ----------
+    path (str)
+        Where to write the file
+    data
+        Anything `json.dump` can write
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".tmp_", suffix=".json")
+    try:
+        os.chmod(temp_path, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f)
+        os.replace(temp_path, path)
+    except Exception:
+        os.remove(temp_path)
+        raise
+
+
+class SessionManager:
+    """
+    Keeps the storage state (cookies and local storage) of each login on disk so the next run can skip
+    the full login when fidelity still considers the session alive.
+
+    Files are named after a hash of the username and are only readable by the current user.
+
+    Parameters
+    ----------
+    directory (str)
+        Folder the session files are kept in. Created if missing.
+    max_age (float)
+        Seconds a saved session is worth trying. Older sessions are treated as missing.
+    """
+
+    def __init__(self, directory: str = "sessions", max_age: float = 43200) -> None:
+        self.directory: str = os.path.abspath(directory)
+        self.max_age: float = max_age
+        self.stats: dict = {
+            "resumed": 0,
+            "logged_in": 0,
+        }
+
+    def path_for(self, username: str) -> str:
+        """Returns the path the session of a login is kept at"""
+        key = hashlib.sha256(username.encode("utf-8")).hexdigest()[:32]
+        return os.path.join(self.directory, f"Fidelity_{key}.json")
+
+    def load(self, username: str) -> dict:
+        """
+        Gets the saved storage state of a login if it looks usable.
+        It must be recent enough, readable, and still have fidelity cookies that haven't expired.
+
+        Returns
+        -------
+        storage_state (dict)
+            The storage state to create a context with. None if there isn't a usable one.
+        """
+        path = self.path_for(username)
+        try:
+            if time.time() - os.path.getmtime(path) > self.max_age:
+                return None
+            with open(path, "r") as f:
+                storage_state = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if not isinstance(storage_state, dict) or not isinstance(storage_state.get("cookies"), list):
+            return None
+        now = time.time()
+        for cookie in storage_state["cookies"]:
+            # Session cookies have an expiry of -1
+            if "fidelity.com" in cookie.get("domain", "") and (cookie.get("expires", -1) == -1 or cookie["expires"] > now):
+                return storage_state
+        return None
+
+    def save(self, username: str, storage_state: dict) -> None:
+        """
+        Saves the storage state of a login. See `write_private_json`
+
+        Parameters
+        ----------
+        username (str)
+            The login the session belongs to
+        storage_state (dict)
+            Ex: `browser.context.storage_state()`
+        """
+        write_private_json(self.path_for(username), storage_state)
+
+    def delete(self, username: str) -> None:
+        """Removes the saved session of a login, if there is one"""
+        try:
+            os.remove(self.path_for(username))
+        except FileNotFoundError:
+            pass
+
+    def is_alive(self, context: BrowserContext, timeout: int = 10000) -> bool:
+        """
+        Checks if a context is still logged in with a single request using its cookies.
+        No page is loaded.
+
+        Parameters
+        ----------
+        context (BrowserContext)
+            The context to check
+        timeout (int)
+            Milliseconds to wait for the response
+
+        Returns
+        -------
+        True
+            If fidelity served the page
+        False
+            If fidelity redirected away from it or the request failed
+        """
+        try:
+            response = context.request.get(SESSION_PROBE_URL, max_redirects=0, timeout=timeout)
+        except PlaywrightError:
+            return False
+        try:
+            return response.status == 200 and "login" not in response.url
+        finally:
+            response.dispose()
+
+    def login_or_resume(self, browser, username: str, password: str, totp_secret: str = None, save_device: bool = False) -> tuple:
+        """
+        Uses the browser's existing session if it is still logged in, otherwise runs `browser.login`.
+        The storage state is saved after a full login so the next run can resume it.
+        Create the browser with `storage_state=self.load(username)` for a saved session to be used.
+
+        Parameters
+        ----------
+        browser (FidelityAutomation)
+            The browser to log in with
+        username (str)
+            The username of the user.
+        password (str)
+            The password of the user.
+        totp_secret (str)
+            The totp secret, if using, of the user.
+        save_device (bool)
+            Flag to allow fidelity to remember this device.
+
+        Returns
+        -------
+        The same as `FidelityAutomation.login`
+        """
+        if self.is_alive(browser.context):
+            # Already logged in
+            browser.username = username
+            self.stats["resumed"] += 1
+            return (True, True)
+
+        # Don't try this session again
+        self.delete(username)
+        step_1, step_2 = browser.login(
+            username=username,
+            password=password,
+            totp_secret=totp_secret,
+            save_device=save_device,
+        )
+        if step_1 and step_2:
+            self.stats["logged_in"] += 1
+            self.save(username, browser.context.storage_state())
+        return (step_1, step_2)